@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -41,8 +42,21 @@ def get_user_profile(request) -> Response:
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def delete_user_account(request):
+    from hotels.models import Booking, Review, RoomType
+    from jobs.queue import enqueue
+
     user = request.user
-    user.delete()
+    with transaction.atomic():
+        # Отзывы удаляются каскадно - статистику затронутых отелей
+        # пересчитывает фоновая задача (ставится в той же транзакции)
+        hotel_ids = sorted(set(
+            Review.objects.filter(user=user).values_list('hotel_id', flat=True)
+        ))
+        # ночи броней - разом, до каскада (иначе pre_delete вернет их по одной)
+        RoomType.release_bookings(Booking.objects.filter(user=user))
+        user.delete()
+        if hotel_ids:
+            enqueue('hotels.tasks.rebuild_rating_stats', hotel_ids=hotel_ids)
     return Response(
         {"message": "Аккаунт успешно удален"},
         status=status.HTTP_200_OK
@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# каталог (отели, страны, города) - асинхронные представления, без потока на запрос
+os.environ.setdefault('ASYNC_CATALOGUE', '1')
+# синхронный код запроса (async ORM, middleware) идет в потоке, который живет
+# один запрос: постоянное соединение осталось бы открытым до сборки мусора
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
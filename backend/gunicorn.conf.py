@@ -0,0 +1,60 @@
+"""
+Настройки gunicorn для прода (entrypoint.sh):
+
+    gunicorn -c backend/gunicorn.conf.py
+
+Приложение загружается в мастере до форка (preload_app): Django, модели и
+URLconf со всеми представлениями импортируются один раз, воркеры стартуют
+уже прогретыми и делят эту память (copy-on-write). Там же, до форка,
+выполняется migrate_if_needed - холодный старт контейнера обходится одним
+запуском Django (MIGRATE_ON_START=0 - без миграций). Переменные окружения:
+WEB_CONCURRENCY - процессов (по умолчанию 2 на ядро), GUNICORN_THREADS -
+потоков в процессе, GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS, PORT.
+
+ASGI=1 - backend.asgi под воркерами uvicorn: каталог (отели, страны, города)
+отдают асинхронные представления (ASYNC_CATALOGUE), GUNICORN_THREADS не
+используется. Соединения с базой под ASGI не постоянные (backend/asgi.py).
+"""
+import glob
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2))
+asgi = os.getenv('ASGI', '0') == '1'
+wsgi_app = 'backend.asgi:application' if asgi else 'backend.wsgi:application'
+# потоки: запросы в основном ждут PostgreSQL
+worker_class = 'uvicorn.workers.UvicornWorker' if asgi else 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+# перезапуск воркера после N запросов (0 - никогда) - страховка от утечек памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+# heartbeat воркеров - в памяти, а не на overlayfs контейнера
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = '-'
+errorlog = '-'
+
+# снимки метрик воркеров (metrics/registry.py) - общий каталог для /metrics
+os.environ.setdefault('METRICS_DIR', '/tmp/metrics')
+
+
+def on_starting(server) -> None:
+    # снимки прошлого запуска: pid могли достаться новым воркерам
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+    if not server.cfg.preload_app:
+        return
+    from django.core.management import call_command
+    from django.db import connections
+    from django.urls import get_resolver
+
+    if os.getenv('MIGRATE_ON_START', '1') == '1':
+        call_command('migrate_if_needed')
+    # соединение мастера не должно достаться воркерам
+    connections.close_all()
+    # URLconf импортируется лениво, на первом запросе каждого воркера
+    get_resolver().url_patterns
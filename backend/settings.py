@@ -41,8 +41,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'hotels',
     'accounts',
+    'jobs',
+    'loadtest',
+    'metrics',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -50,12 +54,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'metrics.middleware.RequestMetricsMiddleware',
+    'metrics.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hotels.replicas.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,13 +93,17 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer на orjson, байт в байт тот же вывод
+        'hotels.api.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 9,
 }
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+# Асинхронные представления каталога (hotels/api/async_urls.py); backend/asgi.py включает по умолчанию
+ASYNC_CATALOGUE = os.getenv('ASYNC_CATALOGUE', '0') == '1'
 
 
 # Database
@@ -107,9 +118,115 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # постоянные соединения (секунды; 0 - новое на каждый запрос) с проверкой перед повторным использованием
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Реплики для чтения публичных API (hotels/replicas.py): DB_REPLICA_HOSTS=replica1:5432,replica2
+# Те же база и пользователь, что у основной; в тестах - зеркала основной базы
+DATABASE_REPLICAS = []
+for index, address in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['hotels.replicas.ReplicaRouter']
+# сколько секунд после записи пользователь читает с основной базы (задержка репликации)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+# через сколько секунд снова пробовать недоступную реплику
+REPLICA_RETRY_SECONDS = 30
+
+# Cache
+# По умолчанию - память процесса (разработка, тесты). CACHE_DIR - файловый кеш,
+# REDIS_URL - общий кеш для всех процессов (нужен пакет redis)
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Адрес для PURGE-запросов с заголовком Surrogate-Key (Varnish/Fastly), по умолчанию выключено.
+# Запросы отправляет воркер фоновых задач (hotels.tasks.purge_surrogate_keys)
+SURROGATE_PURGE_URL = os.getenv('SURROGATE_PURGE_URL')
+
+# Фоновые задачи (jobs): python manage.py run_workers
+JOBS_PROCESSES = int(os.getenv('JOBS_PROCESSES', '2'))
+JOBS_RETRY_BASE_DELAY = 5
+JOBS_RETRY_MAX_DELAY = 3600
+# задача в running дольше этого срока считается брошенной (воркер убит)
+JOBS_VISIBILITY_TIMEOUT = 600
+JOBS_KEEP_FINISHED_DAYS = 7
+JOBS_PERIODIC = {
+    'purge-finished-jobs': {'task': 'jobs.tasks.purge_finished_jobs', 'every': 24 * 3600},
+}
+
+# Метрики запросов (metrics): заголовок Server-Timing и /metrics для Prometheus
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1'
+# общий каталог снимков метрик процессов (gunicorn -w N); без него /metrics видит только свой процесс
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+# если задан, /metrics требует заголовок Authorization: Bearer <token>
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# Диагностика SQL: медленные запросы (0 - выключено) проверяются в каждом запросе,
+# N+1 - в доле запросов SQL_DIAGNOSTICS_SAMPLE_RATE; события - JSON lines в логгер metrics.diagnostics
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '0'))
+SQL_DIAGNOSTICS_SAMPLE_RATE = float(os.getenv('SQL_DIAGNOSTICS_SAMPLE_RATE', '1' if DEBUG else '0'))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+# Профилирование запросов по подписанному заголовку X-Profile-Token (manage.py profile_token)
+# или по доле запросов маршрута: PROFILE_SAMPLE_RATES=hotel-list=0.01,bookings=0.05
+PROFILE_SAMPLE_RATES = {
+    name: float(rate)
+    for name, _, rate in (item.partition('=') for item in os.getenv('PROFILE_SAMPLE_RATES', '').split(',') if item)
+}
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_MAX_PROFILES = int(os.getenv('PROFILE_MAX_PROFILES', '50'))
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOKEN_MAX_AGE = 3600
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_lines': {'format': '%(message)s'},
+    },
+    'handlers': {
+        # SQL_DIAGNOSTICS_LOG - файл JSON lines, иначе stderr
+        'sql_diagnostics': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': os.getenv('SQL_DIAGNOSTICS_LOG'),
+            'formatter': 'json_lines',
+        } if os.getenv('SQL_DIAGNOSTICS_LOG') else {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json_lines',
+        },
+    },
+    'loggers': {
+        'metrics.diagnostics': {'handlers': ['sql_diagnostics'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -165,6 +282,9 @@ SIMPLE_JWT = {
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# staticfiles собирается при сборке образа (collectstatic в Dockerfile). Без DEBUG
+# файлы из STATIC_ROOT отдает само приложение (admin, DRF); за nginx - SERVE_STATIC=0
+SERVE_STATIC = os.getenv('SERVE_STATIC', '1') == '1'
 
 # Media files
 MEDIA_URL = '/media/'
@@ -1,21 +1,33 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from django.views.static import serve
 from typing import List
 
+from metrics.views import healthz, metrics_view, readyz
+
 urlpatterns: List[path] = [
+    # Профили запросов (metrics.profiling) - до admin.site.urls
+    path('admin/profiles/', include('metrics.urls')),
     path('admin/', admin.site.urls),
 
+    # Метрики для Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
+    # Проверки для оркестратора
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
+
     # Frontend аутентификация
     path('api/auth/', include('accounts.urls')),
 
     # API аутентификация
     path('api/auth/', include('accounts.api.urls')),
 
-    # API отелей
-    path('api/', include('hotels.api.urls')),
+    # API отелей (под ASGI - с асинхронными представлениями каталога)
+    path('api/', include('hotels.api.async_urls' if settings.ASYNC_CATALOGUE else 'hotels.api.urls')),
 
     # Frontend страницы
     path('', include('hotels.urls')),
@@ -25,4 +37,15 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL,
         document_root=settings.MEDIA_ROOT
-    )
\ No newline at end of file
+    )
+
+if settings.SERVE_STATIC:
+    # под gunicorn нет обработчика статики runserver, а static() работает
+    # только при DEBUG: файлы из STATIC_ROOT (собраны при сборке образа)
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'),
+            serve,
+            {'document_root': settings.STATIC_ROOT}
+        ),
+    ]
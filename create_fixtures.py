@@ -1,31 +1,34 @@
-import os
 import subprocess
+import sys
 
 
 def create_fixtures():
-    fixtures = [
-        ('hotels.Country', 'countries.json'),
-        ('hotels.City', 'cities.json'),
-        ('hotels.Hotel', 'hotels.json'),
-        ('hotels.HotelImage', 'hotel_images.json'),
-        ('auth.User', 'users.json'),
-        ('hotels.Review', 'reviews.json'),
-        ('hotels.Booking', 'bookings.json'),
-        ('hotels.Favorite', 'favorites.json'),
+    models = [
+        'hotels.Country',
+        'hotels.City',
+        'hotels.Hotel',
+        'hotels.HotelImage',
+        'hotels.RoomType',
+        'accounts.CustomUser',
+        'hotels.Review',
+        'hotels.Booking',
+        'hotels.Favorite',
     ]
+    # dump_catalog пишет файлы потоково внутри контейнера (fixtures смонтирован),
+    # вывод не буферизуется в памяти; загрузка: manage.py fastload fixtures/dump/*.jsonl.gz
+    cmd = [
+        'docker-compose', 'exec', 'web', 'python', 'manage.py', 'dump_catalog',
+        *models, '--output', 'fixtures/dump', '--gzip',
+    ]
+    print("Creating fixtures/dump...")
+    result = subprocess.run(cmd)
 
-    for model, filename in fixtures:
-        print(f"Creating {filename}...")
-        cmd = f'docker-compose exec web python manage.py dumpdata {model} --indent 2'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-
-        if result.returncode == 0:
-            with open(f'fixtures/{filename}', 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
-            print(f"✅ {filename} created successfully!")
-        else:
-            print(f"❌ Error creating {filename}: {result.stderr}")
+    if result.returncode == 0:
+        print("✅ fixtures/dump created successfully!")
+    else:
+        print("❌ Error creating fixtures")
+        sys.exit(result.returncode)
 
 
 if __name__ == '__main__':
-    create_fixtures()
\ No newline at end of file
+    create_fixtures()
@@ -1,22 +1,14 @@
 #!/bin/bash
-
-
-echo "Waiting for database..."
-while ! nc -z db 5432; do
-  sleep 0.1
-done
-echo "Database started"
-
-echo "Applying migrations..."
-python manage.py migrate contenttypes
-python manage.py migrate auth
-python manage.py migrate accounts
-python manage.py migrate
-
-
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
-
-
-echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+set -e
+
+# Статика собрана при сборке образа (Dockerfile).
+if [ "$SERVER" = "runserver" ]; then
+  python manage.py migrate_if_needed --timeout 60
+  echo "Starting development server..."
+  exec python manage.py runserver 0.0.0.0:8000
+fi
+
+# gunicorn сам дождется базы и применит миграции до форка воркеров
+# (migrate_if_needed в backend/gunicorn.conf.py); ASGI=1 - backend.asgi под uvicorn
+echo "Starting gunicorn..."
+exec gunicorn -c backend/gunicorn.conf.py
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Country, City, Hotel, HotelImage, Review, Booking
+from .models import Country, City, Hotel, HotelImage, Review, Booking, RoomType
 
 
 class CityFilter(admin.SimpleListFilter):
@@ -38,7 +38,7 @@ class HotelImageInline(admin.TabularInline):
 
     model = HotelImage
     extra = 3
-    fields = ['image', 'preview']
+    fields = ['image', 'position', 'preview']
     readonly_fields = ['preview']
 
     def preview(self, obj: HotelImage) -> str:
@@ -51,6 +51,23 @@ class HotelImageInline(admin.TabularInline):
     preview.short_description = "Превью"
 
 
+class HotelImageAdmin(admin.ModelAdmin):
+    """Админка для изображений отелей"""
+
+    list_display = ['__str__', 'position']
+    # __str__ выводит название отеля
+    list_select_related = ['hotel']
+    list_per_page = 50
+
+
+class RoomTypeInline(admin.TabularInline):
+    """Inline для категорий номеров отеля"""
+
+    model = RoomType
+    extra = 1
+    fields = ['name', 'capacity', 'quantity']
+
+
 class HotelAdmin(admin.ModelAdmin):
     """Админка для отелей"""
 
@@ -60,13 +77,17 @@ class HotelAdmin(admin.ModelAdmin):
         'city',
         'stars',
         'price_per_night',
+        'rating_avg',
+        'rating_count',
         'created_at',
     ]
     list_display_links = ['name']
+    # city необязателен и сам в select_related не попадает
+    list_select_related = ['country', 'city']
     list_filter = ['country', 'city', 'stars', 'created_at']
     search_fields = ['name', 'description', 'address']
-    readonly_fields = ['created_at']
-    inlines = [HotelImageInline]
+    readonly_fields = ['created_at', 'rating_avg', 'rating_count'] + Hotel.RATING_FIELDS
+    inlines = [RoomTypeInline, HotelImageInline]
     list_per_page = 20
 
 
@@ -92,6 +113,7 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = [
         'hotel',
         'user',
+        'room_type',
         'check_in',
         'check_out',
         'guests',
@@ -99,6 +121,8 @@ class BookingAdmin(admin.ModelAdmin):
         'created_at',
     ]
     list_display_links = ['hotel']
+    # room_type необязателен и сам в select_related не попадает
+    list_select_related = ['hotel', 'user', 'room_type']
     list_filter = ['check_in', 'check_out', 'created_at']
     search_fields = [
         'hotel__name',
@@ -113,6 +137,6 @@ class BookingAdmin(admin.ModelAdmin):
 admin.site.register(Country, CountryAdmin)
 admin.site.register(City)
 admin.site.register(Hotel, HotelAdmin)
-admin.site.register(HotelImage)
+admin.site.register(HotelImage, HotelImageAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Booking, BookingAdmin)
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Маршруты API для ASGI (settings.ASYNC_CATALOGUE): те же пути и имена, что в
+hotels/api/urls.py, но список и карточка отеля, страны и города -
+асинхронные представления (hotels/api/async_views.py).
+"""
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'hotel-list': async_views.hotel_list,
+    'hotel-detail-api': async_views.hotel_detail,
+    'country-list': async_views.country_list,
+    'city-list': async_views.city_list,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
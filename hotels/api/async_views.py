@@ -0,0 +1,142 @@
+"""
+Асинхронные версии публичных представлений каталога для ASGI: список и
+карточка отеля, страны, города. URL, имена маршрутов, тела ответов и
+заголовки (ETag, Cache-Control, Surrogate-Key) те же, что у
+hotels/api/views.py; маршруты - hotels/api/async_urls.py.
+
+Queryset, фильтры, сортировка, пагинация, сериализатор и ключи кеша
+берутся из синхронных представлений: построение запроса не обращается к
+базе. Асинхронно выполняется ввод-вывод: SQL через async ORM (acount,
+aget, async for), кеш через aget / aset, чтение пользователя JWT и выбор
+реплики - в sync_to_async. Сериализация идет в цикле событий по заранее
+загруженным данным (select_related / prefetch_related): ленивый запрос в
+сериализаторе вызовет SynchronousOnlyOperation, а не скрытый блокирующий SQL.
+"""
+from typing import Any, Callable, Optional, Type
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.generics import GenericAPIView
+from rest_framework.response import Response
+
+from ..cache import CachedListMixin, aget_or_compute
+from ..replicas import read_alias
+from .views import CityListView, CountryListView, HotelDetailView, HotelListView
+
+
+class AsyncCatalogueView:
+    """Асинхронный GET для синхронного представления view_class (list или retrieve)"""
+
+    def __init__(self, view_class: Type[GenericAPIView], action: str) -> None:
+        self.view_class = view_class
+        self.action = action
+
+    def as_view(self) -> Callable:
+        async def view(request, *args, **kwargs) -> HttpResponse:
+            return await self.dispatch(request, *args, **kwargs)
+
+        view.view_class = self.view_class
+        # как у APIView.as_view: CSRF проверяет только SessionAuthentication
+        # (csrf_exempt в Django 4.2 оборачивает синхронной функцией)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs) -> HttpResponse:
+        view = self.view_class()
+        view.setup(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        view.request = request = view.initialize_request(request, *args, **kwargs)
+        token = None
+        try:
+            alias = await self.initial(view, request, **kwargs)
+            if alias is not None:
+                token = read_alias.set(alias)
+            if request.method == 'OPTIONS':
+                response = view.options(request, *args, **kwargs)
+            else:
+                response = await self.get(view, request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        finally:
+            if token is not None:
+                read_alias.reset(token)
+        response = view.finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            return response  # 304 Not Modified
+        response.render()
+        # готовый HttpResponse: Django не переходит в поток ради response.render()
+        return HttpResponse(response.content, status=response.status_code, headers=response.headers)
+
+    async def initial(self, view: GenericAPIView, request, **kwargs) -> Optional[str]:
+        """APIView.initial; возвращает алиас реплики для чтения (ReplicaReadMixin)"""
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = view.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = view.determine_version(request, **kwargs)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            raise MethodNotAllowed(request.method)
+
+        def authenticate() -> Optional[str]:
+            view.perform_authentication(request)
+            view.check_permissions(request)
+            view.check_throttles(request)
+            return view.choose_read_alias(request)
+
+        # без заголовка и реплик аутентификация не читает ни базу, ни кеш
+        if 'HTTP_AUTHORIZATION' in request.META or settings.DATABASE_REPLICAS:
+            return await sync_to_async(authenticate)()
+        return authenticate()
+
+    async def get(self, view: GenericAPIView, request) -> Response:
+        """ConditionalGetMixin.get: валидаторы по версиям и updated_at, 304 без сериализации"""
+        versions = await view.aget_validator_versions()
+        etag, last_modified = view.build_validators(request, versions)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(await self.get_data(view, request))
+            served = getattr(view, 'served_versions', versions)
+            if served != versions:
+                etag, last_modified = view.build_validators(request, served)
+        return view.add_validators(response, etag, last_modified)
+
+    async def get_data(self, view: GenericAPIView, request) -> Any:
+        if self.action == 'retrieve':
+            return await self.retrieve(view, request)
+        if isinstance(view, CachedListMixin):
+            data, view.served_versions = await aget_or_compute(
+                view.get_list_cache_key(request),
+                view.get_cache_dependencies(),
+                lambda: self.list(view, request),
+                view.cache_timeout,
+                view.cache_stale_timeout,
+                await view.aget_modified_timestamps(),
+            )
+            return data
+        return await self.list(view, request)
+
+    @staticmethod
+    async def list(view: GenericAPIView, request) -> Any:
+        queryset = view.filter_queryset(view.get_queryset())
+        if view.paginator is None:
+            return view.get_serializer([row async for row in queryset], many=True).data
+        rows = await view.paginator.apaginate_queryset(queryset, request, view=view)
+        return view.get_paginated_response(view.get_serializer(rows, many=True).data).data
+
+    @staticmethod
+    async def retrieve(view: GenericAPIView, request) -> Any:
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        view.check_object_permissions(request, instance)
+        return view.get_serializer(instance).data
+
+
+hotel_list = AsyncCatalogueView(HotelListView, 'list').as_view()
+hotel_detail = AsyncCatalogueView(HotelDetailView, 'retrieve').as_view()
+country_list = AsyncCatalogueView(CountryListView, 'list').as_view()
+city_list = AsyncCatalogueView(CityListView, 'list').as_view()
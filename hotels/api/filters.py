@@ -1,5 +1,9 @@
+from django.contrib.postgres.search import SearchHeadline, SearchRank
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
-from ..models import Hotel
+from rest_framework.exceptions import ValidationError
+from ..models import Hotel, Review, RoomNight, RoomType
+from ..search import HEADLINE_OPTIONS, SEARCH_CONFIG, build_search_query
 
 
 class HotelFilter(filters.FilterSet):
@@ -14,19 +18,79 @@ class HotelFilter(filters.FilterSet):
     min_price = filters.NumberFilter(field_name='price_per_night', lookup_expr='gte')
     max_price = filters.NumberFilter(field_name='price_per_night', lookup_expr='lte')
     
-    # Поиск по названию и описанию
+    # Наличие мест на даты (применяется в filter_queryset, когда заданы обе даты)
+    check_in = filters.DateFilter(method='filter_availability_param')
+    check_out = filters.DateFilter(method='filter_availability_param')
+    guests = filters.NumberFilter(method='filter_availability_param')
+
+    # Полнотекстовый поиск по названию, городу и описанию
     search = filters.CharFilter(method='filter_search')
     
     def filter_search(self, queryset, name, value):
-        """Поиск по названию, описанию и городу"""
-        from django.db.models import Q
-        return queryset.filter(
-            Q(name__icontains=value) |
-            Q(description__icontains=value) |
-            Q(city__name__icontains=value)
+        """Поиск по GIN-индексу search_vector с рангом и подсветкой фрагмента описания"""
+        query = build_search_query(value)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                'description',
+                query,
+                config=SEARCH_CONFIG,
+                **HEADLINE_OPTIONS
+            ),
         )
     
+    def filter_availability_param(self, queryset, name, value):
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        check_in = self.form.cleaned_data.get('check_in')
+        check_out = self.form.cleaned_data.get('check_out')
+        if check_in and check_out:
+            if check_in >= check_out:
+                raise ValidationError({'check_out': 'Дата выезда должна быть после даты заезда'})
+            guests = int(self.form.cleaned_data.get('guests') or 1)
+            queryset = self.filter_available(queryset, check_in, check_out, guests)
+        return queryset
+
+    @staticmethod
+    def filter_available(queryset, check_in, check_out, guests):
+        """
+        Отель доступен, если есть категория номеров подходящей вместимости,
+        у которой нет ни одной распроданной ночи в диапазоне. Проверяется по
+        календарю RoomNight (частичный индекс по распроданным ночам),
+        таблица Booking не читается. Отели без категорий номеров бронируются
+        без учета загрузки и считаются доступными.
+        """
+        sold_out_night = RoomNight.objects.filter(
+            room_type=OuterRef('pk'),
+            date__gte=check_in,
+            date__lt=check_out,
+            booked__gte=F('total'),
+        )
+        available_room_type = RoomType.objects.filter(
+            hotel=OuterRef('pk'),
+            capacity__gte=guests,
+        ).exclude(Exists(sold_out_night))
+        any_room_type = RoomType.objects.filter(hotel=OuterRef('pk'))
+        return queryset.filter(Exists(available_room_type) | ~Exists(any_room_type))
+
     class Meta:
         model = Hotel
-        fields = ['country', 'city', 'stars', 'min_price', 'max_price', 'search']
+        fields = [
+            'country', 'city', 'stars', 'min_price', 'max_price', 'search',
+            'check_in', 'check_out', 'guests',
+        ]
+
 
+
+
+class ReviewFilter(filters.FilterSet):
+    """Фильтры для отзывов отеля"""
+
+    rating = filters.NumberFilter(field_name='rating')
+    min_rating = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+
+    class Meta:
+        model = Review
+        fields = ['rating', 'min_rating']
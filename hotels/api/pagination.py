@@ -0,0 +1,284 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Field, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """Оценка количества строк по плану запроса (без COUNT(*))"""
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по произвольной сортировке queryset.
+
+    Позиция кодируется значениями всех полей сортировки последней строки,
+    поэтому глубокие страницы стоят столько же, сколько первая, а результаты
+    не "прыгают" при добавлении новых строк. Поле id добавляется в конец
+    сортировки как стабильный тайбрейкер.
+    """
+
+    cursor_query_param = 'cursor'
+    estimate_query_param = 'estimate'
+    page_size: Optional[int] = None
+    tiebreaker = 'id'
+
+    def __init__(self) -> None:
+        if self.page_size is None:
+            self.page_size = PageNumberPagination.page_size
+
+    def get_ordering(self, queryset: QuerySet) -> List[Tuple[str, bool]]:
+        """Список (поле, по убыванию) с тайбрейкером в конце"""
+        order_by = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        ordering: List[Tuple[str, bool]] = []
+        for field in order_by:
+            if not isinstance(field, str):
+                raise ValueError('Keyset pagination supports only field-name ordering')
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = self.tiebreaker
+            ordering.append((name, descending))
+        if self.tiebreaker not in [name for name, _ in ordering]:
+            ordering.append((self.tiebreaker, False))
+        return ordering
+
+    @staticmethod
+    def get_ordering_fields(queryset: QuerySet, ordering: List[Tuple[str, bool]]) -> List[Field]:
+        """Поля модели (или аннотации) сортировки - по ним приводятся значения курсора"""
+        fields = []
+        for name, _ in ordering:
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                fields.append(annotation.output_field)
+                continue
+            opts = queryset.model._meta
+            for part in name.split('__'):
+                field = opts.get_field(part)
+                if field.is_relation:
+                    opts = field.related_model._meta
+            fields.append(field)
+        return fields
+
+    @staticmethod
+    def _encode_value(value: Any) -> Any:
+        # даты - с полной точностью (DjangoJSONEncoder обрезает микросекунды)
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, values: List[Any], reverse: bool) -> str:
+        payload = {
+            'v': [self._encode_value(v) for v in values],
+            'r': int(reverse),
+        }
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return b64encode(data).decode('ascii')
+
+    def decode_cursor(self, request, fields: List[Field]) -> Optional[Dict[str, Any]]:
+        """
+        Курсор из запроса; значения приводятся к типам полей сортировки.
+        Испорченный или подделанный курсор - 404, а не ошибка в filter()
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            reverse = bool(payload.get('r', 0))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound('Неверный курсор')
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise NotFound('Неверный курсор')
+        try:
+            values = [self._decode_value(field, value) for field, value in zip(fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный курсор')
+        return {'values': values, 'reverse': reverse}
+
+    @staticmethod
+    def _decode_value(field: Field, value: Any) -> Any:
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError(value)
+        return field.to_python(value)
+
+    @staticmethod
+    def keyset_filter(ordering: List[Tuple[str, bool]], values: List[Any]) -> Q:
+        """
+        (a, b, c) "после" (x, y, z) с учетом направления каждого поля:
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z).
+        Дополнительное условие a >= x позволяет начать индексный скан с позиции.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(ordering, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        leading_name, leading_desc = ordering[0]
+        leading = Q(**{f"{leading_name}__{'lte' if leading_desc else 'gte'}": values[0]})
+        return leading & condition
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        ordered = self.prepare(queryset, request)
+        self.estimated_count = estimate_count(ordered) if self.estimate else None
+        return self.finish(list(self.page_queryset(ordered)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        """paginate_queryset для асинхронных представлений"""
+        ordered = self.prepare(queryset, request)
+        self.estimated_count = await sync_to_async(estimate_count)(ordered) if self.estimate else None
+        return self.finish([row async for row in self.page_queryset(ordered)])
+
+    def prepare(self, queryset: QuerySet, request) -> QuerySet:
+        """Разобрать курсор; queryset в порядке обхода (без условия курсора)"""
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = self.decode_cursor(request, self.get_ordering_fields(queryset, self.ordering))
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        self.estimate = request.query_params.get(self.estimate_query_param) in ('1', 'true')
+
+        # для перехода назад идем по обратной сортировке и разворачиваем страницу
+        self.effective = [(name, desc != self.reverse) for name, desc in self.ordering]
+        return queryset.order_by(
+            *[f"{'-' if desc else ''}{name}" for name, desc in self.effective]
+        )
+
+    def page_queryset(self, queryset: QuerySet) -> QuerySet:
+        if self.cursor:
+            queryset = queryset.filter(self.keyset_filter(self.effective, self.cursor['values']))
+        return queryset[:self.page_size + 1]
+
+    def finish(self, rows: List[Any]) -> List[Any]:
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not self.reverse else self.cursor is not None
+        self.has_previous = self.cursor is not None if not self.reverse else has_more
+        self.first_values = self._row_values(rows[0], self.ordering) if rows else None
+        self.last_values = self._row_values(rows[-1], self.ordering) if rows else None
+        return rows
+
+    @staticmethod
+    def _row_values(row: Any, ordering: List[Tuple[str, bool]]) -> List[Any]:
+        if isinstance(row, dict):
+            # строки values(): поля сортировки должны быть в проекции
+            return [row[name] for name, _ in ordering]
+        values = []
+        for name, _ in ordering:
+            value = row
+            for part in name.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or self.last_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last_values, False)
+        )
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.first_values is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.first_values, True)
+        )
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.estimated_count is not None:
+            payload['estimated_count'] = self.estimated_count
+        payload['results'] = data
+        return Response(payload)
+
+
+class HotelPagination(BasePagination):
+    """
+    Пагинация списка отелей: по умолчанию - номера страниц,
+    с ?pagination=cursor (или при наличии ?cursor=) - keyset.
+    """
+
+    mode_query_param = 'pagination'
+
+    def __init__(self) -> None:
+        self.page_number = PageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.active: BasePagination = self.page_number
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> Optional[List[Any]]:
+        self.choose(request)
+        return self.active.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        """paginate_queryset для асинхронных представлений (COUNT и страница - async ORM)"""
+        if self.choose(request) is self.keyset:
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        pagination = self.page_number
+        paginator = pagination.django_paginator_class(queryset, pagination.get_page_size(request))
+        # count - cached_property: заранее посчитанное значение не запрашивается повторно
+        paginator.count = await queryset.acount()
+        page_number = pagination.get_page_number(request, paginator)
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        page.object_list = [row async for row in page.object_list]
+        pagination.page = page
+        pagination.request = request
+        return list(page)
+
+    def choose(self, request) -> BasePagination:
+        params = request.query_params
+        if params.get(self.mode_query_param) == 'cursor' or self.keyset.cursor_query_param in params:
+            self.active = self.keyset
+        else:
+            self.active = self.page_number
+        return self.active
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        return self.active.get_paginated_response(data)
+
+
+class ReviewCursorPagination(KeysetPagination):
+    """Курсорная пагинация отзывов отеля (от новых к старым)"""
+
+    page_size = 10
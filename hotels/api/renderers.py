@@ -0,0 +1,57 @@
+import re
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# числа, которые orjson пишет не так, как json: экспонента (orjson - 1e-7 и
+# 1e16, json - 1e-07 и 1e+16) и модуль меньше 1e-4 (orjson - 0.00005, json -
+# 5e-05). Проверяются байты готового ответа; ложное срабатывание на текст
+# вроде "1e5" только включает стандартный рендерер
+EXPONENT = re.compile(rb'\de[-\d]|(?<!\d)0\.0000')
+SEPARATORS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson - те же байты, что у стандартного рендерера DRF
+    (компактный JSON без экранирования не-ASCII, U+2028/U+2029 экранированы).
+    Даты, Decimal и ленивые строки кодирует encoder_class DRF. Стандартный
+    рендерер используется при Accept: application/json; indent=N, при
+    UNICODE_JSON=False или COMPACT_JSON=False, для чисел вне int64, Decimal
+    NaN / Infinity (стандартный выбрасывает ValueError) и если в ответе
+    встретилось число, которое orjson пишет иначе (EXPONENT). NaN и
+    бесконечность типа float orjson пишет как null - поля API их не содержат.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> bytes:
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_default(), option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # как JSONRenderer: JSON остается подмножеством JavaScript
+        for separator, escaped in SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
+
+    def encoder_default(self) -> Any:
+        """default для orjson: encoder_class DRF, Decimal NaN / Infinity - ошибка кодирования"""
+        encode = self.encoder_class().default
+
+        def default(obj: Any) -> Any:
+            if isinstance(obj, Decimal) and not obj.is_finite():
+                raise TypeError(obj)
+            return encode(obj)
+
+        return default
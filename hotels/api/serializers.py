@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.utils import timezone
-from typing import Any, Dict, Optional
-from ..models import Country, City, Hotel, HotelImage, Review, Booking, Favorite
+from typing import Any, Dict, Iterable, Optional
+from ..images import build_sources
+from ..models import Country, City, Hotel, HotelImage, Review, Booking, Favorite, RoomType
+from .sparse import SparseFieldsSerializerMixin, ordering_paths
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -23,14 +25,26 @@ class CitySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'country', 'country_name')
 
 
+class RoomTypeSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = RoomType
+        fields = ('id', 'name', 'capacity', 'quantity')
+
+
 class HotelImageSerializer(serializers.ModelSerializer):
 
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = HotelImage
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'position', 'srcset')
+
+    def get_srcset(self, obj: HotelImage) -> Optional[Dict[str, str]]:
+        return build_sources(obj.variants)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(
         source='user.username',
         read_only=True
@@ -57,9 +71,12 @@ class ReviewSerializer(serializers.ModelSerializer):
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
         """Проверка, что пользователь не оставлял уже отзыв на этот отель"""
         user = self.context['request'].user
-        hotel = attrs.get('hotel')
+        hotel = attrs.get('hotel', getattr(self.instance, 'hotel', None))
 
-        if Review.objects.filter(user=user, hotel=hotel).exists():
+        reviews = Review.objects.filter(user=user, hotel=hotel)
+        if self.instance is not None:
+            reviews = reviews.exclude(pk=self.instance.pk)
+        if reviews.exists():
             raise serializers.ValidationError(
                 "Вы уже оставляли отзыв на этот отель"
             )
@@ -78,8 +95,10 @@ class HotelListSerializer(serializers.ModelSerializer):
         read_only=True
     )
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+    search_headline = serializers.SerializerMethodField()
 
     class Meta:
         model = Hotel
@@ -91,26 +110,113 @@ class HotelListSerializer(serializers.ModelSerializer):
             'stars',
             'price_per_night',
             'main_image',
+            'main_image_srcset',
             'average_rating',
             'review_count',
+            'search_headline',
         )
 
     def get_main_image(self, obj: Hotel) -> Optional[str]:
-        first_image = obj.images.first()
-        return first_image.image.url if first_image else None
+        # обложка денормализована и подгружается select_related('cover_image')
+        cover = obj.cover_image
+        return cover.image.url if cover and cover.image else None
+
+    def get_main_image_srcset(self, obj: Hotel) -> Optional[Dict[str, str]]:
+        return build_sources(obj.cover_image.variants) if obj.cover_image else None
 
     def get_average_rating(self, obj: Hotel) -> float:
-        reviews = obj.reviews.all()
-        return (
-            sum(review.rating for review in reviews) / len(reviews)
-            if reviews else 0
-        )
+        return obj.rating_avg
 
     def get_review_count(self, obj: Hotel) -> int:
-        return obj.reviews.count()
+        return obj.rating_count
+
+    def get_search_headline(self, obj: Hotel) -> Optional[str]:
+        # Фрагмент описания с <mark> - только при ?search=
+        return getattr(obj, 'search_headline', None)
 
 
-class HotelDetailSerializer(serializers.ModelSerializer):
+class HotelCardSerializer(serializers.BaseSerializer):
+    """
+    Карточка отеля в списке - тот же JSON, что у HotelListSerializer, но из
+    строки values() (project), без модели и полей DRF: название страны и
+    города и обложка приходят тем же запросом через JOIN. fields - подмножество
+    полей (?fields= / ?omit=): в values() попадают только их столбцы и JOIN.
+    """
+
+    class Meta:
+        fields = (
+            'id',
+            'name',
+            'country_name',
+            'city_name',
+            'stars',
+            'price_per_night',
+            'main_image',
+            'main_image_srcset',
+            'average_rating',
+            'review_count',
+            'search_headline',
+        )
+        # поле карточки -> столбцы values()
+        field_sources = {
+            'id': ('id',),
+            'name': ('name',),
+            'country_name': ('country__name',),
+            'city_name': ('city__name',),
+            'stars': ('stars',),
+            'price_per_night': ('price_per_night',),
+            'main_image': ('cover_image__image',),
+            'main_image_srcset': ('cover_image__variants',),
+            'average_rating': ('rating_avg',),
+            'review_count': ('rating_count',),
+            'search_headline': (),
+        }
+
+    price_field = serializers.DecimalField(
+        max_digits=Hotel._meta.get_field('price_per_night').max_digits,
+        decimal_places=Hotel._meta.get_field('price_per_night').decimal_places,
+    )
+    image_storage = HotelImage._meta.get_field('image').storage
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.keep = None if fields is None else set(fields)
+
+    @classmethod
+    def project(cls, queryset, fields: Optional[Iterable[str]] = None):
+        """values() для карточек плюс поля сортировки (курсор keyset) и подсветка поиска"""
+        fields = cls.Meta.fields if fields is None else fields
+        values = [path for name in fields for path in cls.Meta.field_sources[name]]
+        extra = [name for name in ordering_paths(queryset) if name not in values]
+        if 'search_headline' in fields and 'search_headline' in queryset.query.annotations:
+            extra.append('search_headline')
+        return queryset.values(*values, *extra)
+
+    def to_representation(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        image = row.get('cover_image__image')
+        price = row.get('price_per_night')
+        card = {
+            'id': row.get('id'),
+            'name': row.get('name'),
+            'country_name': row.get('country__name'),
+            'city_name': row.get('city__name'),
+            'stars': row.get('stars'),
+            'price_per_night': self.price_field.to_representation(price) if price is not None else None,
+            'main_image': self.image_storage.url(image) if image else None,
+            'main_image_srcset': build_sources(row.get('cover_image__variants')),
+            'average_rating': row.get('rating_avg'),
+            'review_count': row.get('rating_count'),
+            'search_headline': row.get('search_headline'),
+        }
+        if card['city_name'] is None:
+            # как CharField(source='city.name'): у отеля без города ключа нет
+            del card['city_name']
+        if self.keep is not None:
+            return {name: value for name, value in card.items() if name in self.keep}
+        return card
+
+
+class HotelDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     country_name = serializers.CharField(
         source='country.name',
         read_only=True
@@ -120,9 +226,12 @@ class HotelDetailSerializer(serializers.ModelSerializer):
         read_only=True
     )
     images = HotelImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    # Только последние отзывы (см. HotelDetailView), все - в /hotels/<id>/reviews/
+    reviews = ReviewSerializer(source='latest_reviews', many=True, read_only=True)
+    room_types = RoomTypeSerializer(many=True, read_only=True)
     average_rating = serializers.ReadOnlyField()
     review_count = serializers.ReadOnlyField()
+    rating_histogram = serializers.ReadOnlyField()
 
     class Meta:
         model = Hotel
@@ -140,12 +249,21 @@ class HotelDetailSerializer(serializers.ModelSerializer):
             'created_at',
             'images',
             'reviews',
+            'room_types',
             'average_rating',
-            'review_count'
+            'review_count',
+            'rating_histogram',
         )
+        # поля не из модели -> пути для проекции (?fields= / ?omit=)
+        field_sources = {
+            'reviews': ('reviews',),
+            'average_rating': ('rating_avg', 'rating_count'),
+            'review_count': ('rating_count',),
+            'rating_histogram': tuple(f'rating_{i}' for i in range(1, 6)),
+        }
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
 
     hotel_name = serializers.CharField(
         source='hotel.name',
@@ -164,23 +282,36 @@ class BookingSerializer(serializers.ModelSerializer):
             'hotel_name',
             'user',
             'user_name',
+            'room_type',
             'check_in',
             'check_out',
             'guests',
             'total_price',
             'created_at'
         )
-        read_only_fields = ('user', 'total_price', 'created_at')
+        read_only_fields = ('user', 'room_type', 'total_price', 'created_at')
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Booking
-        fields = ('hotel', 'check_in', 'check_out', 'guests')
+        fields = ('id', 'hotel', 'room_type', 'check_in', 'check_out', 'guests')
 
     def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Валидация данных бронирования"""
+        if self.instance is not None:
+            # Изменение брони: недостающие поля берем из нее, категория другого отеля сбрасывается
+            hotel = data.get('hotel', self.instance.hotel)
+            data = {
+                'hotel': hotel,
+                'room_type': self.instance.room_type if hotel.pk == self.instance.hotel_id else None,
+                'check_in': self.instance.check_in,
+                'check_out': self.instance.check_out,
+                'guests': self.instance.guests,
+                **data,
+            }
+
         # Проверка, что дата выезда после даты заезда
         if data['check_in'] >= data['check_out']:
             raise serializers.ValidationError(
@@ -193,10 +324,22 @@ class BookingCreateSerializer(serializers.ModelSerializer):
                 "Нельзя бронировать на прошедшие даты"
             )
 
+        # Категория номеров (необязательна) должна принадлежать отелю и вмещать гостей
+        room_type = data.get('room_type')
+        if room_type is not None:
+            if room_type.hotel_id != data['hotel'].id:
+                raise serializers.ValidationError(
+                    "Категория номеров не относится к выбранному отелю"
+                )
+            if data.get('guests', 1) > room_type.capacity:
+                raise serializers.ValidationError(
+                    "Количество гостей превышает вместимость номера"
+                )
+
         return data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     hotel_name = serializers.CharField(source='hotel.name', read_only=True)
     hotel_price = serializers.DecimalField(
         source='hotel.price_per_night',
@@ -207,6 +350,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
     hotel_city = serializers.CharField(source='hotel.city.name', read_only=True)
     hotel_country = serializers.CharField(source='hotel.country.name', read_only=True)
     hotel_image = serializers.SerializerMethodField()
+    hotel_image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Favorite
@@ -218,10 +362,19 @@ class FavoriteSerializer(serializers.ModelSerializer):
             'hotel_city',
             'hotel_country',
             'hotel_image',
+            'hotel_image_srcset',
             'created_at'
         )
         read_only_fields = ('user', 'created_at')
+        field_sources = {
+            'hotel_image': ('hotel__cover_image__image',),
+            'hotel_image_srcset': ('hotel__cover_image__variants',),
+        }
 
     def get_hotel_image(self, obj):
-        first_image = obj.hotel.images.first()
-        return first_image.image.url if first_image and first_image.image else None
\ No newline at end of file
+        cover = obj.hotel.cover_image
+        return cover.image.url if cover and cover.image else None
+
+    def get_hotel_image_srcset(self, obj):
+        cover = obj.hotel.cover_image
+        return build_sources(cover.variants) if cover else None
\ No newline at end of file
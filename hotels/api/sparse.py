@@ -0,0 +1,155 @@
+"""
+Частичные ответы: ?fields=id,name - только эти поля, ?omit=description - все,
+кроме этих (GET списков и карточек). Проекция доходит до SQL: выбираются
+только столбцы оставшихся полей (only()), ненужные JOIN (select_related) и
+prefetch_related отбрасываются. Неизвестное имя поля - 400.
+
+Поле сериализатора сопоставляется с путем в модели по source
+(source='hotel.name' -> hotel__name). Для полей, которых нет в модели
+(SerializerMethodField, свойства, to_attr у Prefetch), пути задаются в
+Meta.field_sources; поле без известного пути отключает проекцию SQL - ответ
+все равно урезается.
+"""
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(value: Optional[str]) -> Optional[Set[str]]:
+    """'id, name' -> {'id', 'name'}; пустое значение - параметра нет"""
+    names = {name.strip() for name in (value or '').split(',')} - {''}
+    return names or None
+
+
+def select_fields(
+    available: Iterable[str], fields: Optional[Set[str]], omit: Optional[Set[str]]
+) -> Tuple[str, ...]:
+    """Поля ответа в порядке сериализатора"""
+    available = tuple(available)
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = sorted((names or set()) - set(available))
+        if unknown:
+            errors[param] = f'Неизвестные поля: {", ".join(unknown)}'
+    if errors:
+        raise ValidationError(errors)
+    return tuple(
+        name for name in available
+        if (fields is None or name in fields) and (omit is None or name not in omit)
+    )
+
+
+def resolve_path(model, path: str, columns: Set[str], relations: Set[str], prefetched: Set[str]) -> bool:
+    """
+    Разложить путь поля на столбцы (only), прямые связи (select_related) и
+    обратные / многие-ко-многим (prefetch_related верхнего уровня).
+    False - путь не ведет к полю модели.
+    """
+    opts = model._meta
+    parts = path.split('__')
+    for index, part in enumerate(parts):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        prefix = '__'.join(parts[:index + 1])
+        if field.many_to_many or field.one_to_many:
+            if index:
+                return False  # prefetch через связь - без проекции
+            prefetched.add(part)
+            return True
+        columns.add(prefix)
+        if not field.is_relation or index == len(parts) - 1:
+            return True
+        relations.add(prefix)
+        opts = field.related_model._meta
+    return True
+
+
+def ordering_paths(queryset: QuerySet) -> List[str]:
+    """Поля сортировки (курсор keyset читает их у последней строки)"""
+    order_by = queryset.query.order_by or queryset.model._meta.ordering
+    return [field.lstrip('-') for field in order_by if isinstance(field, str) and field != '?']
+
+
+def project(queryset: QuerySet, paths: Iterable[str]) -> QuerySet:
+    """only() по путям полей; select_related и prefetch_related - только нужные"""
+    model = queryset.model
+    columns: Set[str] = {model._meta.pk.name}
+    relations: Set[str] = set()
+    prefetched: Set[str] = set()
+    for path in [*paths, *ordering_paths(queryset)]:
+        if not resolve_path(model, path, columns, relations, prefetched):
+            return queryset
+
+    lookups = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in prefetched
+    ]
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns)
+
+
+class SparseFieldsSerializerMixin:
+    """Сериализатор с подмножеством полей: Serializer(..., fields=('id', 'name'))"""
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def project(cls, queryset: QuerySet, fields: Iterable[str]) -> QuerySet:
+        """Проекция queryset под поля fields"""
+        explicit = getattr(cls.Meta, 'field_sources', {})
+        paths: List[str] = []
+        for name, field in cls(fields=fields).fields.items():
+            if name in explicit:
+                paths.extend(explicit[name])
+            elif field.source == '*':
+                return queryset
+            else:
+                paths.append('__'.join(field.source_attrs))
+        return project(queryset, paths)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= / ?omit= для GET: поля передаются сериализатору (get_serializer),
+    queryset проецируется методом project сериализатора (filter_queryset).
+    """
+
+    def get_sparse_fields(self) -> Optional[Tuple[str, ...]]:
+        """Поля ответа; None - все поля (параметров нет или запрос не GET)"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            params = self.request.query_params
+            fields, omit = parse_names(params.get(FIELDS_PARAM)), parse_names(params.get(OMIT_PARAM))
+            if self.request.method in ('GET', 'HEAD') and (fields or omit):
+                serializer_class = self.get_serializer_class()
+                self._sparse_fields = select_fields(serializer_class.Meta.fields, fields, omit)
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        return self.project_queryset(super().filter_queryset(queryset))
+
+    def project_queryset(self, queryset: QuerySet) -> QuerySet:
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        return self.get_serializer_class().project(queryset, fields)
@@ -5,6 +5,7 @@ urlpatterns = [
     # Отели
     path('hotels/', views.HotelListView.as_view(), name='hotel-list'),
     path('hotels/<int:pk>/', views.HotelDetailView.as_view(), name='hotel-detail-api'),
+    path('hotels/<int:pk>/reviews/', views.HotelReviewListView.as_view(), name='hotel-reviews'),
 
     # Отзывы
     path('reviews/', views.ReviewViewSet.as_view({
@@ -13,6 +14,8 @@ urlpatterns = [
     }), name='reviews'),
     path('reviews/<int:pk>/', views.ReviewViewSet.as_view({
         'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
         'delete': 'destroy'
     }), name='review-detail'),
 
@@ -23,12 +26,15 @@ urlpatterns = [
     }), name='bookings'),
     path('bookings/<int:pk>/', views.BookingViewSet.as_view({
         'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
         'delete': 'destroy'
     }), name='booking-detail'),
 
     # Справочники
     path('countries/', views.CountryListView.as_view(), name='country-list'),
     path('cities/', views.CityListView.as_view(), name='city-list'),
+    path('autocomplete/', views.AutocompleteView.as_view(), name='autocomplete'),
 
     # Избранное
     path('favorites/', views.FavoriteViewSet.as_view({
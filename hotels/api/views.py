@@ -1,11 +1,21 @@
-from rest_framework import generics, permissions, viewsets
-from django.db.models import Q, Avg
+from rest_framework import generics, permissions, serializers, viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.cache import patch_cache_control
+from hashlib import md5
 from typing import Any
 
-from ..models import Hotel, Country, City, Review, Booking, Favorite
+from .. import search
+from ..cache import CachedListMixin, ConditionalGetMixin
+from ..replicas import ReplicaReadMixin
+
+from ..models import Hotel, HotelImage, RoomType, Country, City, Review, Booking, Favorite
 
 from .serializers import (
-    HotelListSerializer,
+    HotelCardSerializer,
     HotelDetailSerializer,
     ReviewSerializer,
     BookingSerializer,
@@ -17,18 +27,36 @@ from .serializers import (
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
-from .filters import HotelFilter
+from .filters import HotelFilter, ReviewFilter
+from .pagination import HotelPagination, ReviewCursorPagination
+from .sparse import SparseFieldsMixin
 
 # список отелей с фильтрацией
-class HotelListView(generics.ListAPIView):
-    serializer_class = HotelListSerializer
+class HotelListView(SparseFieldsMixin, ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
+    serializer_class = HotelCardSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_class = HotelFilter
+    pagination_class = HotelPagination
+    cache_dependencies = ('hotel', 'hotelimage', 'review', 'city', 'country')
+    surrogate_keys = ('hotels',)
+
+    def get_cache_dependencies(self) -> Any:
+        # загрузка номеров меняется с каждой бронью - учитываем ее только в поиске по датам
+        if 'check_in' in self.request.query_params:
+            return self.cache_dependencies + ('roomtype', 'roomnight')
+        return self.cache_dependencies
+
+    def get_modified_querysets(self) -> Any:
+        # рейтинг и обложка обновляют updated_at отеля; брони видны только по версии roomnight
+        querysets = (Hotel.objects.all(), HotelImage.objects.all(), City.objects.all(), Country.objects.all())
+        if 'check_in' in self.request.query_params:
+            querysets += (RoomType.objects.all(),)
+        return querysets
 
     def get_queryset(self) -> Any:
-        queryset = Hotel.objects.select_related('country', 'city').prefetch_related('images', 'reviews')
-        return queryset
+        # страна, город и обложка - JOIN в проекции карточек (filter_queryset)
+        return Hotel.objects.all()
     
     def filter_queryset(self, queryset):
 
@@ -39,11 +67,13 @@ class HotelListView(generics.ListAPIView):
         ordering = self.request.query_params.get('ordering')
         sort_by = self.request.query_params.get('sort_by')
         
-        # Сортировка по рейтингу (требует аннотацию)
+        # Сортировка по рейтингу (по сохраненной статистике, индекс hotel_rating_idx)
+        # Везде в конце id - стабильный тайбрейкер для курсорной пагинации
         if sort_by == 'rating_desc':
-            queryset = queryset.annotate(
-                avg_rating=Avg('reviews__rating')
-            ).order_by('-avg_rating', 'name')
+            queryset = queryset.order_by('-rating_avg', 'name', 'id')
+        # Сортировка по релевантности (только вместе с ?search=)
+        elif sort_by == 'relevance' and 'search_rank' in queryset.query.annotations:
+            queryset = queryset.order_by('-search_rank', 'id')
         # Сортировка по цене
         elif ordering == 'price_per_night':
             queryset = queryset.order_by('price_per_night', 'id')
@@ -58,18 +88,79 @@ class HotelListView(generics.ListAPIView):
         else:
             queryset = queryset.order_by('id')
         
+        # карточки строятся из values(), без экземпляров моделей
+        return self.get_serializer_class().project(queryset, self.get_sparse_fields())
+
+    def project_queryset(self, queryset) -> Any:
+        # values() строится после сортировки, в filter_queryset
         return queryset
 
 
 # детальная страница отеля
-class HotelDetailView(generics.RetrieveAPIView):
-    queryset = Hotel.objects.all()
+class HotelDetailView(SparseFieldsMixin, ReplicaReadMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = HotelDetailSerializer
     permission_classes = [permissions.AllowAny]
+    latest_reviews = 5
+
+    def get_queryset(self) -> Any:
+        # Фиксированное число запросов независимо от количества отзывов:
+        # отель + страна + город, фото, категории номеров, N последних отзывов с авторами
+        latest_reviews = (
+            Review.objects.select_related('user')
+            .order_by('-created_at', '-id')[:self.latest_reviews]
+        )
+        return Hotel.objects.select_related('country', 'city').prefetch_related(
+            'images',
+            'room_types',
+            Prefetch('reviews', queryset=latest_reviews, to_attr='latest_reviews'),
+        )
+
+    def get_cache_dependencies(self) -> Any:
+        # версия конкретного отеля меняется при изменении его данных, отзывов, фото и номеров
+        return (f"hotel:{self.kwargs['pk']}", 'hotel-bulk', 'city', 'country')
+
+    def get_modified_querysets(self) -> Any:
+        pk = self.kwargs['pk']
+        return (
+            Hotel.objects.filter(pk=pk),
+            HotelImage.objects.filter(hotel_id=pk),
+            RoomType.objects.filter(hotel_id=pk),
+            City.objects.all(),
+            Country.objects.all(),
+        )
+
+    def get_surrogate_keys(self) -> Any:
+        return (f"hotel-{self.kwargs['pk']}", 'hotel-details')
+
+
+# отзывы отеля с курсорной пагинацией: /hotels/<id>/reviews/?rating=5
+class HotelReviewListView(SparseFieldsMixin, ReplicaReadMixin, ConditionalGetMixin, generics.ListAPIView):
+    serializer_class = ReviewSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ReviewFilter
+    pagination_class = ReviewCursorPagination
+
+    def get_cache_dependencies(self) -> Any:
+        return (f"hotel:{self.kwargs['pk']}",)
+
+    def get_modified_querysets(self) -> Any:
+        # новый или удаленный отзыв пересчитывает рейтинг отеля (и его updated_at)
+        return (Hotel.objects.filter(pk=self.kwargs['pk']),)
+
+    def get_surrogate_keys(self) -> Any:
+        return (f"hotel-{self.kwargs['pk']}",)
+
+    def get_queryset(self) -> Any:
+        return (
+            Review.objects.filter(hotel_id=self.kwargs['pk'])
+            .select_related('user')
+            .order_by('-created_at', '-id')
+        )
 
 
 # ViewSet для отзывов
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = None  # Отключаем пагинацию для личного кабинета
@@ -77,17 +168,41 @@ class ReviewViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Фильтр по пользователю: /reviews/?user=username
         username = self.request.query_params.get('user')
+        # ReviewSerializer читает только автора (отель - id)
+        if self.action in ('update', 'partial_update'):
+            # изменить можно только свой отзыв
+            return Review.objects.filter(user=self.request.user).select_related('user')
         if username:
-            return Review.objects.filter(user__username=username).select_related('hotel', 'user')
+            return Review.objects.filter(user__username=username).select_related('user')
 
-        return Review.objects.all().select_related('hotel', 'user')
+        return Review.objects.select_related('user')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            Hotel.apply_review_rating(review.hotel_id, review.rating, 1)
+
+    def perform_update(self, serializer):
+        # новая оценка или отель: прежний отзыв вычитается из статистики, новый добавляется
+        with transaction.atomic():
+            old_hotel_id, old_rating = (
+                Review.objects.select_for_update()
+                .values_list('hotel_id', 'rating')
+                .get(pk=serializer.instance.pk)
+            )
+            review = serializer.save()
+            if (review.hotel_id, review.rating) != (old_hotel_id, old_rating):
+                Hotel.apply_review_rating(old_hotel_id, old_rating, -1)
+                Hotel.apply_review_rating(review.hotel_id, review.rating, 1)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Hotel.apply_review_rating(instance.hotel_id, instance.rating, -1)
 
 
 # ViewSet для бронирований
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None  # Отключаем пагинацию для личного кабинета
@@ -95,50 +210,133 @@ class BookingViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Фильтр по пользователю: /bookings/?user=username
         username = self.request.query_params.get('user')
-        if username:
+        # BookingSerializer читает название отеля и имя пользователя
+        if username and self.action not in ('update', 'partial_update'):
             return Booking.objects.filter(user__username=username).select_related('hotel', 'user')
 
         # По умолчанию - бронирования текущего пользователя
         return Booking.objects.filter(user=self.request.user).select_related('hotel', 'user')
 
     def get_serializer_class(self):
-        if self.action == 'create':
+        # изменение брони проверяется и бронируется так же, как новая
+        if self.action in ('create', 'update', 'partial_update'):
             return BookingCreateSerializer
         return BookingSerializer
 
+    def reserve_room(self, data) -> Any:
+        """
+        Занять номер на все ночи брони. Если категория не указана - берем
+        самую маленькую подходящую по вместимости, где есть места.
+        Отели без настроенных категорий номеров бронируются без учета загрузки.
+        """
+        hotel = data['hotel']
+        room_type = data.get('room_type')
+        if room_type is not None:
+            candidates = [room_type]
+        else:
+            if not hotel.room_types.exists():
+                return None
+            candidates = hotel.room_types.filter(capacity__gte=data.get('guests', 1))
+
+        for candidate in candidates:
+            if candidate.reserve(data['check_in'], data['check_out']):
+                return candidate
+        raise serializers.ValidationError("Нет свободных номеров на выбранные даты")
+
     def perform_create(self, serializer):
         hotel = serializer.validated_data['hotel']
         check_in = serializer.validated_data['check_in']
         check_out = serializer.validated_data['check_out']
         nights = (check_out - check_in).days
         total_price = hotel.price_per_night * nights
-        serializer.save(user=self.request.user, total_price=total_price)
+        with transaction.atomic():
+            room_type = self.reserve_room(serializer.validated_data)
+            serializer.save(
+                user=self.request.user,
+                total_price=total_price,
+                room_type=room_type
+            )
+
+    def perform_update(self, serializer):
+        # прежние ночи возвращаются в продажу, новые занимаются - в одной транзакции:
+        # если мест нет, ValidationError откатывает и возврат
+        data = serializer.validated_data
+        total_price = data['hotel'].price_per_night * (data['check_out'] - data['check_in']).days
+        with transaction.atomic():
+            booking = (
+                Booking.objects.select_for_update(of=('self',))
+                .select_related('room_type')
+                .get(pk=serializer.instance.pk)
+            )
+            if booking.room_type_id:
+                booking.room_type.release(booking.check_in, booking.check_out)
+            room_type = self.reserve_room(data)
+            serializer.save(total_price=total_price, room_type=room_type)
 
 
 # список стран
-class CountryListView(generics.ListAPIView):
+class CountryListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    cache_dependencies = ('country',)
+    surrogate_keys = ('country-list',)
+
+    def get_modified_querysets(self) -> Any:
+        return (Country.objects.all(),)
 
 
 # список городов с фильтрацией
-class CityListView(generics.ListAPIView):
+class CityListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     serializer_class = CitySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    cache_dependencies = ('city', 'country')
+    surrogate_keys = ('city-list',)
+
+    def get_modified_querysets(self) -> Any:
+        return (City.objects.all(), Country.objects.all())
 
     def get_queryset(self) -> Any:
-        queryset = City.objects.all()
+        queryset = City.objects.select_related('country')
         country_id = self.request.query_params.get('country')
         if country_id:
             queryset = queryset.filter(country_id=country_id)
         return queryset
 
 
+# подсказки для строки поиска: /autocomplete/?q=пра
+class AutocompleteView(APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    cache_timeout = 300
+    default_limit = 10
+
+    def get(self, request) -> Response:
+        query = search.normalize_autocomplete_query(request.query_params.get('q', ''))
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, search.AUTOCOMPLETE_MAX_LIMIT))
+
+        if len(query) < search.AUTOCOMPLETE_MIN_LENGTH:
+            suggestions = []
+        else:
+            key = 'autocomplete:{}:{}'.format(limit, md5(query.encode('utf-8')).hexdigest())
+            suggestions = cache.get(key)
+            if suggestions is None:
+                suggestions = search.autocomplete(query, limit)
+                cache.set(key, suggestions, self.cache_timeout)
+
+        response = Response(suggestions)
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+
+
 # ViewSet для избранного
-class FavoriteViewSet(viewsets.ModelViewSet):
+class FavoriteViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None  # Отключаем пагинацию для личного кабинета
@@ -147,10 +345,14 @@ class FavoriteViewSet(viewsets.ModelViewSet):
         # Фильтр по пользователю: /favorites/?user=username
         username = self.request.query_params.get('user')
         if username:
-            return Favorite.objects.filter(user__username=username).select_related('hotel', 'user')
+            return Favorite.objects.filter(user__username=username).select_related(
+                'hotel__city', 'hotel__country', 'hotel__cover_image', 'user'
+            )
 
         # По умолчанию - избранное текущего пользователя
-        return Favorite.objects.filter(user=self.request.user).select_related('hotel', 'user')
+        return Favorite.objects.filter(user=self.request.user).select_related(
+                'hotel__city', 'hotel__country', 'hotel__cover_image', 'user'
+            )
 
     def perform_create(self, serializer):
         hotel_id = self.request.data.get('hotel')
@@ -0,0 +1,399 @@
+"""
+Кеш ответов публичных API с версионной инвалидацией.
+
+Для каждой модели (и для каждого отеля отдельно) хранится версия
+(ver:<name>) - время последнего изменения. Сигналы post_save /
+post_delete обновляют версию сразу и еще раз после коммита транзакции
+(чтобы ответ, закешированный до коммита, тоже устарел), а запись кеша
+помнит версии зависимостей, с которыми она была построена. Несовпадение
+версий делает запись устаревшей: один запрос (single-flight блокировка)
+пересчитывает ответ, остальные в это время получают устаревшую копию
+(stale-while-revalidate) вместо похода в базу.
+
+Версии в кеше видны всем процессам только при общем кеше (REDIS_URL,
+CACHE_DIR). Поэтому к ним добавляется время изменения из базы - max
+updated_at выборок представления (get_modified_querysets), одним запросом:
+правка отеля, рейтинга, обложки или справочника меняет ETag ответа и запись
+кеша и в процессе, который об этой правке не знает.
+
+Асинхронные представления (hotels/api/async_views.py) используют те же
+ключи и записи через aget_versions / aget_or_compute.
+"""
+import asyncio
+import hashlib
+import time
+import urllib.request
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from jobs.queue import enqueue
+
+CACHE_ALIAS = 'default'
+VERSION_PREFIX = 'ver'
+CHANGED_PREFIX = 'changed'
+LOCK_TIMEOUT = 10
+# Сколько ждать чужого пересчета, если устаревшей копии нет совсем
+COLD_WAIT = 2.0
+COLD_WAIT_STEP = 0.05
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(name: str) -> str:
+    return f'{VERSION_PREFIX}:{name}'
+
+
+def _changed_key(name: str) -> str:
+    return f'{CHANGED_PREFIX}:{name}'
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def get_versions(names: Iterable[str]) -> Tuple[int, ...]:
+    """
+    Текущие версии зависимостей одним запросом к кешу. Версия - отметка
+    времени последнего изменения в миллисекундах; отсутствующий (или
+    вытесненный) счетчик инициализируется текущим временем, поэтому
+    потеря ключа приводит к пересчету, а не к устаревшему ответу.
+    """
+    names = list(names)
+    cache = get_cache()
+    stored = cache.get_many([_version_key(name) for name in names])
+    versions = []
+    for name in names:
+        version = stored.get(_version_key(name))
+        if version is None:
+            version = _now_ms()
+            if not cache.add(_version_key(name), version, None):
+                version = cache.get(_version_key(name), version)
+        versions.append(version)
+    return tuple(versions)
+
+
+async def aget_versions(names: Iterable[str]) -> Tuple[int, ...]:
+    """get_versions для асинхронных представлений"""
+    names = list(names)
+    cache = get_cache()
+    stored = await cache.aget_many([_version_key(name) for name in names])
+    versions = []
+    for name in names:
+        version = stored.get(_version_key(name))
+        if version is None:
+            version = _now_ms()
+            if not await cache.aadd(_version_key(name), version, None):
+                version = await cache.aget(_version_key(name), version)
+        versions.append(version)
+    return tuple(versions)
+
+
+def bump_version(*names: str) -> None:
+    """Обновить версии сейчас и еще раз после коммита текущей транзакции"""
+    def bump() -> None:
+        cache = get_cache()
+        keys = [_version_key(name) for name in names]
+        stored = cache.get_many(keys)
+        now = _now_ms()
+        cache.set_many({key: max(now, stored.get(key, 0) + 1) for key in keys}, None)
+        if settings.DATABASE_REPLICAS:
+            # реплики отстают: недавно измененное читается с основной базы (hotels/replicas.py)
+            cache.set_many({_changed_key(name): 1 for name in names}, settings.REPLICA_STICKY_SECONDS)
+
+    bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def get_timestamps(querysets: Iterable[QuerySet]) -> Tuple[int, ...]:
+    """
+    Время последнего изменения каждой выборки (max updated_at, миллисекунды;
+    0 - выборка пуста) одним запросом: SELECT (подзапрос), (подзапрос), ...
+    Подзапрос - ORDER BY updated_at DESC LIMIT 1, по индексу updated_at.
+    """
+    querysets = list(querysets)
+    if not querysets:
+        return ()
+    using = querysets[0].db
+    parts, params = [], []
+    for queryset in querysets:
+        latest = queryset.order_by('-updated_at').values('updated_at')[:1]
+        sql, latest_params = latest.query.get_compiler(using=using).as_sql()
+        parts.append(f'({sql})')
+        params.extend(latest_params)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT {", ".join(parts)}', params)
+        row = cursor.fetchone()
+    return tuple(int(value.timestamp() * 1000) if value else 0 for value in row)
+
+
+async def aget_timestamps(querysets: Iterable[QuerySet]) -> Tuple[int, ...]:
+    """get_timestamps для асинхронных представлений"""
+    querysets = list(querysets)
+    if not querysets:
+        return ()
+    return await sync_to_async(get_timestamps)(querysets)
+
+
+def changed_recently(names: Iterable[str]) -> bool:
+    """Менялась ли какая-то зависимость за последние REPLICA_STICKY_SECONDS (только с репликами)"""
+    return bool(get_cache().get_many([_changed_key(name) for name in names]))
+
+
+def build_key(prefix: str, params: Dict[str, List[str]], extra: str = '') -> str:
+    """Ключ из нормализованных параметров: порядок и пустые значения не важны"""
+    normalized = sorted(
+        (name, sorted(value for value in values if value != ''))
+        for name, values in params.items()
+        if any(value != '' for value in values)
+    )
+    digest = hashlib.sha1(repr((extra, normalized)).encode('utf-8')).hexdigest()
+    return f'resp:{prefix}:{digest}'
+
+
+def get_or_compute(
+    key: str,
+    dependencies: Iterable[str],
+    compute: Callable[[], Any],
+    timeout: int,
+    stale_timeout: int,
+    timestamps: Tuple[int, ...] = (),
+) -> Tuple[Any, Tuple[int, ...]]:
+    """
+    Вернуть значение из кеша или пересчитать его - вместе с версиями, с
+    которыми оно построено (по ним строятся валидаторы ответа).
+
+    Свежая запись - версии (и время изменения timestamps из базы) совпадают
+    и не истек timeout. Устаревшую запись (другие версии или истекший
+    timeout) пересчитывает только владелец блокировки, остальные возвращают
+    ее как есть - со старыми версиями.
+    """
+    cache = get_cache()
+    versions = get_versions(dependencies) + tuple(timestamps)
+    entry: Optional[Dict[str, Any]] = cache.get(key)
+    now = time.time()
+
+    if entry is not None and entry['versions'] == versions and entry['expires'] > now:
+        return entry['value'], entry['versions']
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry['value'], entry['versions']
+        # холодный старт: ждем, пока владелец блокировки заполнит кеш
+        # (или отпустит блокировку без записи - тогда пересчитываем сами)
+        deadline = now + COLD_WAIT
+        while not locked and time.time() < deadline:
+            time.sleep(COLD_WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value'], entry['versions']
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+
+    # не дождались - считаем без блокировки: чужую блокировку не снимаем
+    try:
+        value = compute()
+        cache.set(
+            key,
+            {'value': value, 'versions': versions, 'expires': time.time() + timeout},
+            timeout + stale_timeout,
+        )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value, versions
+
+
+async def aget_or_compute(
+    key: str,
+    dependencies: Iterable[str],
+    compute: Callable[[], Awaitable[Any]],
+    timeout: int,
+    stale_timeout: int,
+    timestamps: Tuple[int, ...] = (),
+) -> Tuple[Any, Tuple[int, ...]]:
+    """get_or_compute для асинхронных представлений: те же записи и блокировка"""
+    cache = get_cache()
+    versions = await aget_versions(dependencies) + tuple(timestamps)
+    entry: Optional[Dict[str, Any]] = await cache.aget(key)
+    now = time.time()
+
+    if entry is not None and entry['versions'] == versions and entry['expires'] > now:
+        return entry['value'], entry['versions']
+
+    lock_key = f'{key}:lock'
+    locked = await cache.aadd(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry['value'], entry['versions']
+        deadline = now + COLD_WAIT
+        while not locked and time.time() < deadline:
+            await asyncio.sleep(COLD_WAIT_STEP)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry['value'], entry['versions']
+            locked = await cache.aadd(lock_key, 1, LOCK_TIMEOUT)
+
+    try:
+        value = await compute()
+        await cache.aset(
+            key,
+            {'value': value, 'versions': versions, 'expires': time.time() + timeout},
+            timeout + stale_timeout,
+        )
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+    return value, versions
+
+
+def purge_surrogate_keys(keys: Iterable[str]) -> None:
+    """
+    Попросить reverse proxy / CDN сбросить ответы с этими Surrogate-Key.
+    Запрос PURGE отправляет фоновая задача (hotels.tasks.purge_surrogate_keys):
+    запись не ждет CDN, задача ставится в транзакции изменения и видна
+    воркеру после коммита. Без SURROGATE_PURGE_URL - no-op.
+    """
+    if not getattr(settings, 'SURROGATE_PURGE_URL', None):
+        return
+    enqueue('hotels.tasks.purge_surrogate_keys', list(keys))
+
+
+def send_purge(keys: Iterable[str]) -> None:
+    """PURGE на SURROGATE_PURGE_URL; ошибка сети - исключение (повтор задачи)"""
+    keys = ' '.join(keys)
+    request = urllib.request.Request(
+        settings.SURROGATE_PURGE_URL, method='PURGE', headers={'Surrogate-Key': keys}
+    )
+    urllib.request.urlopen(request, timeout=2).close()
+
+
+class CacheDependenciesMixin:
+    """
+    Модели (и отдельные отели), от которых зависит ответ представления, и
+    выборки, чье время изменения (updated_at) входит в валидаторы и записи кеша
+    """
+
+    cache_dependencies: Tuple[str, ...] = ()
+
+    def get_cache_dependencies(self) -> Tuple[str, ...]:
+        return self.cache_dependencies
+
+    def get_modified_querysets(self) -> Tuple[QuerySet, ...]:
+        return ()
+
+    def get_modified_timestamps(self) -> Tuple[int, ...]:
+        """Время изменения из базы - один запрос на запрос к API"""
+        if not hasattr(self, '_modified_timestamps'):
+            self._modified_timestamps = get_timestamps(self.get_modified_querysets())
+        return self._modified_timestamps
+
+    async def aget_modified_timestamps(self) -> Tuple[int, ...]:
+        if not hasattr(self, '_modified_timestamps'):
+            self._modified_timestamps = await aget_timestamps(self.get_modified_querysets())
+        return self._modified_timestamps
+
+
+class ConditionalGetMixin(CacheDependenciesMixin):
+    """
+    ETag / Last-Modified / Cache-Control / Surrogate-Key для публичных GET.
+
+    Валидаторы считаются по версиям зависимостей из кеша и времени изменения
+    выборок get_modified_querysets (один короткий запрос по индексам
+    updated_at) - без сериализации, поэтому 304 Not Modified почти бесплатен.
+    Last-Modified - самое позднее из них. Если ответ - устаревшая копия из
+    кеша (пересчет идет в другом процессе), валидаторы строятся по версиям,
+    с которыми она закеширована: старое тело не попадает к клиентам и CDN
+    под новым ETag.
+    """
+
+    http_max_age: int = 60
+    http_stale_while_revalidate: int = 300
+    surrogate_keys: Tuple[str, ...] = ()
+
+    def get_surrogate_keys(self) -> Tuple[str, ...]:
+        return self.surrogate_keys
+
+    def get_validator_versions(self) -> Tuple[int, ...]:
+        return get_versions(self.get_cache_dependencies()) + self.get_modified_timestamps()
+
+    async def aget_validator_versions(self) -> Tuple[int, ...]:
+        return await aget_versions(self.get_cache_dependencies()) + await self.aget_modified_timestamps()
+
+    def build_validators(self, request, versions: Tuple[int, ...]) -> Tuple[str, int]:
+        key = build_key(
+            type(self).__name__,
+            dict(request.query_params.lists()),
+            extra=f'{request.get_host()}:{self.kwargs}',
+        )
+        etag = hashlib.sha1(f'{key}:{versions}'.encode('utf-8')).hexdigest()
+        return quote_etag(etag), max(versions, default=0) // 1000
+
+    def get(self, request, *args, **kwargs):
+        versions = self.get_validator_versions()
+        etag, last_modified = self.build_validators(request, versions)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            served = getattr(self, 'served_versions', versions)
+            if served != versions:
+                etag, last_modified = self.build_validators(request, served)
+        return self.add_validators(response, etag, last_modified)
+
+    def add_validators(self, response, etag: str, last_modified: int):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=self.http_max_age,
+                stale_while_revalidate=self.http_stale_while_revalidate,
+            )
+            response['Surrogate-Key'] = ' '.join(self.get_surrogate_keys())
+        return response
+
+
+class CachedListMixin(CacheDependenciesMixin):
+    """
+    Кеширование ответа list() для публичных справочных представлений.
+    Ответ не зависит от пользователя, поэтому ключ строится по пути и параметрам.
+    Версии, с которыми построен отданный ответ, - в served_versions.
+    """
+
+    cache_timeout: int = 60
+    cache_stale_timeout: int = 300
+
+    def list(self, request, *args, **kwargs) -> Response:
+        parent_list = super().list
+
+        def compute() -> Any:
+            return parent_list(request, *args, **kwargs).data
+
+        data, self.served_versions = get_or_compute(
+            self.get_list_cache_key(request),
+            self.get_cache_dependencies(),
+            compute,
+            self.cache_timeout,
+            self.cache_stale_timeout,
+            self.get_modified_timestamps(),
+        )
+        return Response(data)
+
+    def get_list_cache_key(self, request) -> str:
+        return build_key(
+            type(self).__name__,
+            dict(request.query_params.lists()),
+            extra=request.get_host(),
+        )
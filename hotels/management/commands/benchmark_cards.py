@@ -0,0 +1,81 @@
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from hotels.api.renderers import FastJSONRenderer
+from hotels.api.serializers import HotelCardSerializer, HotelListSerializer
+from hotels.models import Hotel
+
+
+def best_of(repeat: int, function: Callable[[], Any]) -> Tuple[float, Any]:
+    """Минимальное время из repeat запусков (меньше всего шума) и результат"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+class Command(BaseCommand):
+    """
+    Стоимость карточки отеля в списке до и после быстрого пути:
+    - до: select_related + HotelListSerializer (ModelSerializer) + JSONRenderer;
+    - после: values() (HotelCardSerializer.project) + HotelCardSerializer +
+      FastJSONRenderer (orjson).
+    Этапы - выборка, сериализация, рендеринг - замеряются отдельно, время на
+    один отель. Ответы сравниваются побайтно. Нужен каталог в базе.
+    """
+
+    help = 'Микробенчмарк сериализации карточек отелей (мкс на отель)'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--hotels', type=int, default=500, help='Отелей в выборке')
+        parser.add_argument('--repeat', type=int, default=20, help='Повторов каждого этапа (берется лучший)')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        queryset = Hotel.objects.order_by('id')[:options['hotels']]
+        count = queryset.count()
+        if not count:
+            raise CommandError('Каталог пуст: загрузите данные (seed_scale или loaddata)')
+        repeat = options['repeat']
+
+        paths = {
+            'ModelSerializer + JSONRenderer': (
+                lambda: list(queryset.select_related('country', 'city', 'cover_image')),
+                HotelListSerializer,
+                JSONRenderer(),
+            ),
+            'values() + HotelCardSerializer + orjson': (
+                lambda: list(HotelCardSerializer.project(queryset)),
+                HotelCardSerializer,
+                FastJSONRenderer(),
+            ),
+        }
+        results: Dict[str, Dict[str, float]] = {}
+        outputs: List[bytes] = []
+        for name, (fetch, serializer_class, renderer) in paths.items():
+            fetch_time, rows = best_of(repeat, fetch)
+            serialize_time, data = best_of(repeat, lambda: serializer_class(rows, many=True).data)
+            render_time, content = best_of(repeat, lambda: renderer.render(data))
+            outputs.append(content)
+            results[name] = {'fetch': fetch_time, 'serialize': serialize_time, 'render': render_time}
+
+        self.stdout.write(f'Отелей: {count}, лучший из {repeat} повторов, мкс на отель')
+        header = f'{"Путь":<42} {"выборка":>9} {"сериал.":>9} {"рендер":>9} {"всего":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, stages in results.items():
+            total = sum(stages.values())
+            self.stdout.write(
+                f'{name:<42} ' + ' '.join(f'{stages[stage] / count * 1e6:>9.1f}' for stage in stages)
+                + f' {total / count * 1e6:>9.1f}'
+            )
+        before, after = (sum(stages.values()) for stages in results.values())
+        if outputs[0] != outputs[1]:
+            raise CommandError('Ответы различаются: быстрый путь несовместим')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ответы совпадают побайтно ({len(outputs[0])} байт), ускорение x{before / after:.1f}'
+        ))
@@ -0,0 +1,117 @@
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageFilter
+
+from hotels.images import build_variants
+
+
+class _Source:
+    """Минимальная замена HotelImage: build_variants нужен только image.name"""
+
+    def __init__(self, name: str) -> None:
+        self.image = self
+        self.name = name
+
+
+class Command(BaseCommand):
+    """
+    Замер скорости бэкфилла на каталоге fixtures/hotel_images.json.
+    Файлы берутся из MEDIA_ROOT; отсутствующие заменяются синтетическими
+    фотографиями того же порядка размера. В базу ничего не пишется.
+    """
+
+    help = 'Измеряет скорость генерации вариантов изображений (изображений в секунду)'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--fixture',
+            default=os.path.join(settings.BASE_DIR, 'fixtures', 'hotel_images.json'),
+            help='Фикстура с каталогом изображений'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            action='append',
+            help='Размер пула (можно указать несколько раз). По умолчанию: 0, 1 и число CPU'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Ограничить количество изображений'
+        )
+        parser.add_argument(
+            '--size',
+            default='1600x1067',
+            help='Размер синтетических фото для отсутствующих файлов'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with open(options['fixture'], encoding='utf-8') as file:
+            names: List[str] = [
+                row['fields']['image'] for row in json.load(file)
+                if row['model'] == 'hotels.hotelimage' and row['fields'].get('image')
+            ]
+        names = names[:options['limit']]
+        width, height = (int(value) for value in options['size'].split('x'))
+        workers_list = options['workers'] or sorted({0, 1, os.cpu_count() or 1})
+
+        with tempfile.TemporaryDirectory() as location:
+            synthetic = self.prepare(names, location, width, height)
+            source_bytes = sum(os.path.getsize(os.path.join(location, name)) for name in names)
+            self.stdout.write(
+                f'Изображений: {len(names)} (синтетических: {synthetic}), '
+                f'исходный объем: {source_bytes / 2 ** 20:.1f} МБ'
+            )
+
+            for workers in workers_list:
+                started = time.perf_counter()
+                results = build_variants(
+                    [_Source(name) for name in names],
+                    workers=workers,
+                    location=location,
+                    save=False,
+                )
+                elapsed = time.perf_counter() - started
+                ok = sum(1 for _, variants in results if variants is not None)
+                self.stdout.write(
+                    f'workers={workers}: {ok} изобр. за {elapsed:.2f} с - {ok / elapsed:.1f} изобр./с'
+                )
+
+            variants_bytes = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, files in os.walk(os.path.join(location, 'hotel_images', 'variants'))
+                for name in files
+                if name.endswith('-320.webp')
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Карточка (WebP 320w) в среднем: {variants_bytes / max(len(names), 1) / 1024:.1f} КБ '
+                f'против {source_bytes / max(len(names), 1) / 1024:.1f} КБ оригинала'
+            ))
+
+    @staticmethod
+    def prepare(names: List[str], location: str, width: int, height: int) -> int:
+        """Скопировать (ссылкой) исходники во временное хранилище, недостающие - сгенерировать"""
+        rng = random.Random(0)
+        synthetic = 0
+        for name in names:
+            target = os.path.join(location, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            original = os.path.join(settings.MEDIA_ROOT, name)
+            if os.path.exists(original):
+                os.symlink(original, target)
+                continue
+            # шум + размытие: по размеру и энтропии ближе к фото, чем заливка
+            noise = Image.effect_noise((width // 4, height // 4), 64).convert('RGB')
+            tint = Image.new('RGB', noise.size, tuple(rng.randrange(256) for _ in range(3)))
+            image = Image.blend(noise, tint, 0.5).resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+            image.save(target, 'JPEG', quality=90)
+            synthetic += 1
+        return synthetic
@@ -0,0 +1,62 @@
+import os
+import time
+from contextlib import nullcontext
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from hotels.images import build_variants, create_pool
+from hotels.models import HotelImage
+
+
+class Command(BaseCommand):
+    """Бэкфилл WebP/JPEG вариантов и заглушек для уже загруженных фото (например, после loaddata)"""
+
+    help = 'Генерирует производные изображения отелей в пуле процессов'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Количество процессов (0 - в текущем процессе)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Сколько изображений обрабатывать и сохранять за раз'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перегенерировать и те изображения, у которых варианты уже есть'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        queryset = HotelImage.objects.exclude(image='').order_by('id')
+        if not options['force']:
+            queryset = queryset.filter(Q(variants={}) | ~Q(variants__has_key='placeholder'))
+
+        ids = list(queryset.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        workers = options['workers']
+        done = failed = 0
+        started = time.perf_counter()
+        # один пул на весь прогон: запуск процессов и django.setup() - не на каждую пачку
+        with create_pool(workers) if workers and ids else nullcontext() as pool:
+            for start in range(0, len(ids), batch_size):
+                images = HotelImage.objects.filter(id__in=ids[start:start + batch_size]).order_by('id')
+                for _, variants in build_variants(images, workers=workers, pool=pool):
+                    if variants is None:
+                        failed += 1
+                    else:
+                        done += 1
+                self.stdout.write(f'{done + failed}/{len(ids)}')
+
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Варианты построены: {done}, ошибок: {failed}, {elapsed:.1f} с ({rate:.1f} изобр./с)'
+        ))
@@ -0,0 +1,215 @@
+import gzip
+import itertools
+import json
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import IO, Any, Dict, List, Optional
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .fastload import sort_models
+
+# Каталог по умолчанию: справочники и отели (без пользовательских данных)
+CATALOGUE_MODELS = [
+    'hotels.Country',
+    'hotels.City',
+    'hotels.Hotel',
+    'hotels.HotelImage',
+    'hotels.RoomType',
+]
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_OVERLAP = timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка каталога в JSON Lines (формат jsonl сериализатора Django).
+
+    Каждая модель читается серверным курсором (iterator(chunk_size=...)) и
+    пишется построчно, поэтому память не растет с размером таблиц. Все модели
+    выгружаются из одного снимка (REPEATABLE READ). Файлы грузятся обратно
+    командами fastload (в пустую базу) или loaddata (в том числе поверх
+    существующих строк - для инкрементальных выгрузок). Инкрементальная
+    выгрузка (--since) берет строки по updated_at; удаления она не переносит.
+    """
+
+    help = 'Выгружает каталог в JSON Lines (gzip, шарды, инкрементально)'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'labels',
+            nargs='*',
+            help='Модели app_label.Model или приложения. По умолчанию - каталог отелей'
+        )
+        parser.add_argument(
+            '--output',
+            default='dump',
+            help='Каталог для файлов выгрузки'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы (.jsonl.gz)'
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=0,
+            help='Строк в одном файле (0 - один файл на модель)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Строк за одно чтение серверного курсора'
+        )
+        parser.add_argument(
+            '--since',
+            default=None,
+            help='Только строки, измененные после момента (ISO 8601) или выгрузки '
+                 '(путь к ее manifest.json или каталогу)'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию - default)'
+        )
+
+    def get_models(self, labels: List[str]) -> List[Any]:
+        models = []
+        for label in labels or CATALOGUE_MODELS:
+            try:
+                if '.' in label:
+                    models.append(apps.get_model(label))
+                else:
+                    models.extend(apps.get_app_config(label).get_models())
+            except LookupError as error:
+                raise CommandError(str(error))
+        return sort_models(list(dict.fromkeys(models)))
+
+    @staticmethod
+    def parse_since(value: Optional[str]):
+        if not value:
+            return None
+        if os.path.isdir(value):
+            value = os.path.join(value, MANIFEST_NAME)
+        if os.path.isfile(value):
+            with open(value, encoding='utf-8') as file:
+                value = json.load(file)['snapshot_at']
+        since = parse_datetime(value)
+        if since is None:
+            raise CommandError(f'Неверное значение --since: {value}')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def open_shard(self, directory: str, label: str, index: Optional[int], compress: bool) -> IO[str]:
+        suffix = f'-{index:04d}' if index is not None else ''
+        name = f'{label}{suffix}.jsonl' + ('.gz' if compress else '')
+        path = os.path.join(directory, name)
+        if compress:
+            return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        return open(path, 'w', encoding='utf-8')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        using = options['database']
+        connection = connections[using]
+        models = self.get_models(options['labels'])
+        since = self.parse_since(options['since'])
+        directory = options['output']
+        os.makedirs(directory, exist_ok=True)
+        shard_size = options['shard_size']
+        serializer_class = serializers.get_serializer('jsonl')
+
+        manifest: Dict[str, Any] = {'since': since.isoformat() if since else None, 'models': {}}
+        started = time.perf_counter()
+        total = 0
+        # единый снимок для всех моделей (внутри уже открытой транзакции - ее снимок)
+        own_transaction = not connection.in_atomic_block
+        with transaction.atomic(using=using):
+            if connection.vendor == 'postgresql' and own_transaction:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+            # граница для следующей инкрементальной выгрузки - с запасом на транзакции,
+            # начатые до снимка (повторная загрузка строки через loaddata безвредна)
+            manifest['snapshot_at'] = (timezone.now() - SNAPSHOT_OVERLAP).isoformat()
+
+            for model in models:
+                label = model._meta.label_lower
+                queryset = model._default_manager.using(using).order_by(model._meta.pk.name)
+                incremental = since is not None and any(
+                    field.name == 'updated_at' for field in model._meta.concrete_fields
+                )
+                if incremental:
+                    queryset = queryset.filter(updated_at__gt=since)
+                m2m = [field.name for field in model._meta.many_to_many]
+                if m2m:
+                    queryset = queryset.prefetch_related(*m2m)
+
+                # шард пишется прямо из курсора, без буферизации строк в памяти
+                rows = queryset.iterator(chunk_size=options['chunk_size'])
+                files: List[str] = []
+                count = 0
+                for index in itertools.count(1):
+                    first = next(rows, None)
+                    if first is None:
+                        break
+                    rest = itertools.islice(rows, shard_size - 1) if shard_size else rows
+                    shard = itertools.chain([first], rest)
+                    file = self.open_shard(
+                        directory, label, index if shard_size else None, options['gzip']
+                    )
+                    with file:
+                        counter = _Counter(shard)
+                        serializer_class().serialize(counter, stream=file, cls=PreciseJSONEncoder)
+                    count += counter.count
+                    files.append(os.path.basename(file.name))
+
+                manifest['models'][label] = {
+                    'rows': count,
+                    'files': files,
+                    'mode': 'incremental' if incremental else 'full',
+                }
+                total += count
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f'{label}: {count} ({len(files)} files)')
+
+        with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {total} из {len(models)} моделей в {directory} '
+            f'за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
+
+
+class PreciseJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder обрезает время до миллисекунд - выгрузка должна быть точной"""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, (datetime, dt_time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _Counter:
+    """Итератор-обертка: считает отданные сериализатору строки"""
+
+    def __init__(self, iterable) -> None:
+        self.iterable = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.iterable)
+        self.count += 1
+        return item
@@ -0,0 +1,408 @@
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, IO, Iterator, List, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+CHUNK_SIZE = 1 << 16
+PARALLEL_MIN_BYTES = 16 << 20
+# str.translate с таблицей-словарем на длинных описаниях в разы медленнее replace
+COPY_SPECIAL = re.compile(r'[\\\t\n\r]')
+
+
+def iter_fixture(file: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковый разбор JSON-массива фикстуры: объекты читаются по одному,
+    весь файл в память не загружается.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        # пропускаем пробелы, '[' и ',' между объектами
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[':
+            started = started or buffer[position] == '['
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position) if position < len(buffer) else (None, 0)
+        except ValueError:
+            obj = None
+        if obj is not None:
+            if not started or not isinstance(obj, dict):
+                raise CommandError('Ожидается JSON-массив объектов фикстуры')
+            yield obj
+            position = end
+            continue
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            if buffer[position:].strip():
+                raise CommandError('Неожиданный конец файла фикстуры')
+            return
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def is_jsonl(path: str) -> bool:
+    return path.removesuffix('.gz').endswith('.jsonl')
+
+
+def open_fixture(path: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def iter_fixture_lines(file: IO[str]) -> Iterator[Dict[str, Any]]:
+    """JSON Lines (формат jsonl, например из dump_catalog): объект на строку"""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def copy_value(value: Any) -> str:
+    """Значение (после get_db_prep_save) в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if hasattr(value, 'adapted') and hasattr(value, 'dumps'):
+        # psycopg2.extras.Json (JSONField)
+        value = value.dumps(value.adapted)
+    text = str(value)
+    if COPY_SPECIAL.search(text):
+        text = (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return text
+
+
+class CopyEncoder:
+    """Строки COPY для модели: те же преобразования, что делает python-десериализатор"""
+
+    def __init__(self, model, connection) -> None:
+        self.model = model
+        self.connection = connection
+        self.fields = list(model._meta.local_concrete_fields)
+        self.m2m_fields = [
+            field for field in model._meta.many_to_many
+            if field.remote_field.through._meta.auto_created
+        ]
+
+    def encode(self, obj: Dict[str, Any]) -> Tuple[str, Dict[str, List[str]]]:
+        data = obj.get('fields', {})
+        if obj.get('pk') is None:
+            raise CommandError(f'{obj["model"]}: fastload требует pk у каждого объекта')
+        row = []
+        for field in self.fields:
+            if field.primary_key:
+                value = field.to_python(obj['pk'])
+            elif field.name in data:
+                raw = data[field.name]
+                if field.remote_field is not None:
+                    if isinstance(raw, list):
+                        raise CommandError(
+                            f'{obj["model"]}.{field.name}: natural keys не поддерживаются, используйте loaddata'
+                        )
+                    value = None if raw is None else field.target_field.to_python(raw)
+                else:
+                    value = field.to_python(raw)
+            else:
+                value = field.get_default()
+            row.append(copy_value(field.get_db_prep_save(value, self.connection)))
+
+        m2m_rows: Dict[str, List[str]] = {}
+        pk = row[[field.primary_key for field in self.fields].index(True)]
+        for field in self.m2m_fields:
+            m2m_rows[field.name] = [f'{pk}\t{copy_value(target)}' for target in data.get(field.name, [])]
+        return '\t'.join(row), m2m_rows
+
+
+def spool_fixture(path: str, spool_dir: str, method: str, using: str) -> Dict[str, Any]:
+    """
+    Разобрать файл фикстуры и разложить объекты по файлам-спулам (по одному на
+    модель и на M2M-поле). Выполняется в пуле процессов, без запросов к базе.
+    """
+    connection = connections[using]
+    encoders: Dict[str, CopyEncoder] = {}
+    outputs: Dict[str, IO[str]] = {}
+    counts: Dict[str, int] = defaultdict(int)
+    base = os.path.join(tempfile.mkdtemp(dir=spool_dir), 'spool')
+
+    def output(key: str) -> IO[str]:
+        if key not in outputs:
+            outputs[key] = open(f'{base}.{key}', 'w', encoding='utf-8')
+        return outputs[key]
+
+    try:
+        with open_fixture(path) as file:
+            objects = iter_fixture_lines(file) if is_jsonl(path) else iter_fixture(file)
+            for obj in objects:
+                label = obj['model'].lower()
+                counts[label] += 1
+                if method == 'bulk':
+                    output(label).write(json.dumps(obj, ensure_ascii=False) + '\n')
+                    continue
+                if label not in encoders:
+                    encoders[label] = CopyEncoder(apps.get_model(label), connection)
+                row, m2m_rows = encoders[label].encode(obj)
+                output(label).write(row + '\n')
+                for name, rows in m2m_rows.items():
+                    if rows:
+                        output(f'{label}.{name}').write('\n'.join(rows) + '\n')
+    finally:
+        for file in outputs.values():
+            file.close()
+    return {'counts': dict(counts), 'spools': {key: file.name for key, file in outputs.items()}}
+
+
+def _init_worker() -> None:
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def sort_models(models: List[Any]) -> List[Any]:
+    """Модели в порядке зависимостей по FK/M2M (циклы - в конец, FK в PostgreSQL отложенные)"""
+    pending = {model: {
+        field.related_model for field in model._meta.get_fields()
+        if (field.many_to_one or field.one_to_one or field.many_to_many)
+        and field.concrete and field.related_model in models and field.related_model is not model
+    } for model in models}
+    ordered: List[Any] = []
+    while pending:
+        ready = [model for model in models if model in pending and not pending[model] - set(ordered)]
+        if not ready:
+            ready = [model for model in models if model in pending]
+        for model in ready:
+            ordered.append(model)
+            del pending[model]
+    return ordered
+
+
+class Command(BaseCommand):
+    """
+    Быстрая загрузка фикстур в пустую базу: потоковый разбор JSON, порядок
+    моделей по FK, COPY (или пакетный bulk_create) в одной транзакции,
+    сброс последовательностей. Файлы разбираются параллельно в пуле процессов.
+    Сигналы post_save не отправляются - их эффекты (обложки отелей, версии
+    кеша) применяются после загрузки.
+    """
+
+    help = 'Быстрая загрузка фикстур (COPY / bulk_create) с отчетом о скорости'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'fixture_labels', nargs='+', help='Файлы фикстур (*.json, *.jsonl, *.jsonl.gz)'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию - default)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=['copy', 'bulk'],
+            default=None,
+            help='copy - COPY FROM STDIN (только PostgreSQL), bulk - bulk_create. '
+                 'По умолчанию copy для PostgreSQL'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Процессов для параллельного разбора файлов (0 - в текущем процессе). '
+                 'По умолчанию пул используется только для больших фикстур'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета для bulk_create'
+        )
+
+    def find_fixture(self, label: str) -> str:
+        if os.path.isfile(label):
+            return label
+        dirs = [str(path) for path in settings.FIXTURE_DIRS]
+        dirs += [os.path.join(app.path, 'fixtures') for app in apps.get_app_configs()]
+        dirs.append(os.path.join(settings.BASE_DIR, 'fixtures'))
+        for directory in dirs:
+            path = os.path.join(directory, label)
+            if os.path.isfile(path):
+                return path
+        raise CommandError(f"No fixture named '{label}' found.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        using = options['database']
+        connection = connections[using]
+        method = options['method'] or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL, используйте --method bulk')
+        paths = [self.find_fixture(label) for label in options['fixture_labels']]
+        workers = options['workers']
+        if workers is None:
+            # запуск пула (spawn + django.setup) стоит ~1-2 c - окупается на крупных файлах
+            large = sum(os.path.getsize(path) for path in paths) >= PARALLEL_MIN_BYTES
+            workers = min(os.cpu_count() or 1, 4) if large and len(paths) > 1 else 0
+        workers = min(workers, len(paths))
+
+        started = time.perf_counter()
+        spool_dir = tempfile.mkdtemp(prefix='fastload-')
+        try:
+            if workers:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                ) as pool:
+                    results = list(pool.map(
+                        spool_fixture, paths, [spool_dir] * len(paths),
+                        [method] * len(paths), [using] * len(paths)
+                    ))
+            else:
+                results = [spool_fixture(path, spool_dir, method, using) for path in paths]
+            parsed = time.perf_counter()
+
+            counts: Dict[str, int] = defaultdict(int)
+            spools: Dict[str, List[str]] = defaultdict(list)
+            for result in results:
+                for label, count in result['counts'].items():
+                    counts[label] += count
+                for key, name in result['spools'].items():
+                    spools[key].append(name)
+            models = sort_models([apps.get_model(label) for label in counts])
+
+            with transaction.atomic(using=using):
+                for model in models:
+                    label = model._meta.label_lower
+                    if method == 'copy':
+                        self.copy_model(connection, model, spools[label], spools)
+                    else:
+                        self.bulk_model(using, spools[label], options['batch_size'])
+                sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+                if sequence_sql:
+                    if options['verbosity'] >= 2:
+                        self.stdout.write('Resetting sequences')
+                    with connection.cursor() as cursor:
+                        for line in sequence_sql:
+                            cursor.execute(line)
+                self.after_load(models, using)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        if options['verbosity'] >= 1:
+            # тот же вывод, что у loaddata; скорость - отдельно в stderr
+            self.stdout.write(f'Installed {total} object(s) from {len(paths)} fixture(s)')
+            self.stderr.write(
+                f'{total} rows in {elapsed:.2f}s ({total / elapsed:.0f} rows/s; '
+                f'parse {parsed - started:.2f}s, {method} {elapsed - (parsed - started):.2f}s, '
+                f'workers={workers})',
+                style_func=lambda text: text,
+            )
+
+    def copy_model(self, connection, model, names: List[str], spools: Dict[str, List[str]]) -> None:
+        quote = connection.ops.quote_name
+        fields = model._meta.local_concrete_fields
+        columns = ', '.join(quote(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            for name in names:
+                with open(name, encoding='utf-8') as file:
+                    cursor.copy_expert(
+                        f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN', file
+                    )
+            for field in model._meta.many_to_many:
+                if not field.remote_field.through._meta.auto_created:
+                    continue
+                through = field.remote_field.through._meta
+                for name in spools.get(f'{model._meta.label_lower}.{field.name}', []):
+                    with open(name, encoding='utf-8') as file:
+                        cursor.copy_expert(
+                            f'COPY {quote(through.db_table)} '
+                            f'({quote(field.m2m_column_name())}, {quote(field.m2m_reverse_name())}) '
+                            f'FROM STDIN',
+                            file,
+                        )
+
+    def bulk_model(self, using: str, names: List[str], batch_size: int) -> None:
+        for name in names:
+            with open(name, encoding='utf-8') as file:
+                batch: List[Dict[str, Any]] = []
+                for line in file:
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        self.bulk_insert(using, batch)
+                        batch = []
+                if batch:
+                    self.bulk_insert(using, batch)
+
+    @staticmethod
+    def bulk_insert(using: str, batch: List[Dict[str, Any]]) -> None:
+        # python-десериализатор Django: те же преобразования значений, что в loaddata
+        objects = list(serializers.deserialize('python', batch, using=using))
+        model = type(objects[0].object)
+        model._base_manager.using(using).bulk_create([item.object for item in objects])
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                continue
+            through._base_manager.using(using).bulk_create([
+                through(**{field.m2m_field_name() + '_id': item.object.pk,
+                           field.m2m_reverse_field_name() + '_id': target})
+                for item in objects
+                for target in item.m2m_data.get(field.name, [])
+            ])
+
+    @staticmethod
+    def after_load(models: List[Any], using: str) -> None:
+        """
+        Эффекты сигналов post_save и save() моделей, которых COPY не вызывает:
+        обложки, поисковые векторы (Hotel.save) и статистика отзывов (ее ведут
+        представления), как в seed_scale. Выгрузки dump_catalog уже содержат
+        векторы и статистику - пересчитываются только пустые и разошедшиеся,
+        чтобы не сдвигать updated_at (инкрементальные выгрузки).
+        """
+        from django.db.models import Count, F, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        from hotels.cache import bump_version
+        from hotels.models import Hotel, HotelImage, Review
+
+        if HotelImage in models:
+            # выгрузки dump_catalog уже содержат обложки - заполняем только пустые
+            Hotel.refresh_cover_images(Hotel.objects.using(using).filter(
+                cover_image__isnull=True,
+                pk__in=HotelImage.objects.using(using).values('hotel_id'),
+            ))
+        if Hotel in models:
+            Hotel.update_search_vectors(Hotel.objects.using(using).filter(search_vector__isnull=True))
+        if Review in models:
+            reviews = (
+                Review.objects.using(using).filter(hotel_id=OuterRef('pk'))
+                .order_by().values('hotel_id').annotate(count=Count('pk')).values('count')
+            )
+            stale = list(
+                Hotel.objects.using(using)
+                .annotate(review_total=Coalesce(Subquery(reviews), 0))
+                .exclude(rating_count=F('review_total'))
+                .values_list('pk', flat=True)
+            )
+            if stale:
+                Hotel.rebuild_rating_stats(stale, using=using)
+        bump_version(*[model._meta.model_name for model in models], 'hotel-bulk')
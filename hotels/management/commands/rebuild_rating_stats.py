@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from typing import Any
+
+from hotels.models import Hotel
+
+
+class Command(BaseCommand):
+    """Пересчет денормализованной статистики отзывов отелей с нуля"""
+
+    help = 'Пересчитывает средний рейтинг, количество отзывов и гистограмму оценок отелей'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--hotel',
+            type=int,
+            action='append',
+            dest='hotel_ids',
+            help='ID отеля (можно указать несколько раз). По умолчанию - все отели'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета для bulk_update'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        updated = Hotel.rebuild_rating_stats(
+            hotel_ids=options['hotel_ids'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Статистика пересчитана: отелей с отзывами - {updated}'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from typing import Any
+
+from hotels.models import Hotel
+
+
+class Command(BaseCommand):
+    """Пересчет поисковых векторов отелей (например, после loaddata)"""
+
+    help = 'Пересчитывает поле search_vector у всех отелей'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        updated = Hotel.update_search_vectors(Hotel.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс обновлен: отелей - {updated}'
+        ))
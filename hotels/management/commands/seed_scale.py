@@ -0,0 +1,540 @@
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from hotels.cache import bump_version
+from hotels.models import Booking, City, Country, Favorite, Hotel, Review, RoomType
+
+# Все даты отсчитываются от фиксированного момента: при одном seed данные совпадают
+ANCHOR = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+DAY = 86400
+SEED_PASSWORD = 'seed-password'
+
+SYLLABLES = [
+    'ка', 'ло', 'ми', 'ра', 'тен', 'вер', 'на', 'до', 'силь', 'бур', 'гра', 'ле',
+    'мон', 'ти', 'са', 'ри', 'зан', 'ко', 'пол', 'ви', 'ар', 'ден', 'ма', 'ус',
+]
+HOTEL_PREFIXES = ['Гранд', 'Отель', 'Парк', 'Резиденция', 'Бутик-отель', 'Палас', 'Хостел', 'Вилла']
+HOTEL_WORDS = ['Центральный', 'Морской', 'Старый город', 'Панорама', 'Империал', 'Лагуна',
+               'Ривьера', 'Бельведер', 'Корона', 'Сити', 'Вокзальный', 'Садовый']
+STREETS = ['ул. Центральная', 'пр. Мира', 'ул. Набережная', 'пл. Ратушная', 'ул. Садовая',
+           'бул. Приморский', 'ул. Старая', 'пер. Тихий']
+DESCRIPTION_PHRASES = [
+    'Удобное расположение рядом с историческим центром.',
+    'Номера с видом на море и собственным балконом.',
+    'Бесплатный Wi-Fi и завтрак включены в стоимость.',
+    'Спа-центр, крытый бассейн и тренажерный зал.',
+    'Тихий район в десяти минутах от вокзала.',
+    'Ресторан местной кухни на первом этаже.',
+    'Подходит для семейного отдыха с детьми.',
+    'Парковка и трансфер из аэропорта по запросу.',
+    'Панорамная терраса на крыше.',
+    'Номера недавно отремонтированы.',
+]
+REVIEW_COMMENTS = {
+    1: ['Ужасно, не рекомендую.', 'Грязно и шумно.', 'Персонал грубый.'],
+    2: ['Ожидали большего.', 'Завтрак слабый, номер тесный.', 'Цена не соответствует.'],
+    3: ['Нормально за свои деньги.', 'Обычный отель, без сюрпризов.', 'Есть плюсы и минусы.'],
+    4: ['Хороший отель, удобное расположение.', 'Чисто и уютно.', 'Приветливый персонал.'],
+    5: ['Отлично, обязательно вернемся!', 'Лучший отель в городе.', 'Все было идеально.'],
+}
+ROOM_TYPES = [('Одноместный', 1), ('Стандарт', 2), ('Улучшенный', 2), ('Люкс', 3), ('Семейный', 4)]
+STAR_WEIGHTS = [5, 15, 40, 30, 10]
+
+
+def zipf_weights(n: int, exponent: float) -> List[float]:
+    """Веса закона Ципфа: немногие элементы (популярные города) получают большую долю"""
+    return [1.0 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def cumulative(weights: Iterable[float]) -> List[float]:
+    total, result = 0.0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def spread(
+    total: int, cum_weights: List[float], rng: random.Random, cap: int, chunk: int = 100000
+) -> array:
+    """
+    Распределить total событий по элементам пропорционально весам
+    (мультиномиально), не больше cap на элемент: лишнее достается остальным
+    """
+    counts = array('I', bytes(4 * len(cum_weights)))
+    population = range(len(cum_weights))
+    total = min(total, cap * len(cum_weights))
+    while total > 0:
+        for index in rng.choices(population, cum_weights=cum_weights, k=min(total, chunk)):
+            if counts[index] < cap:
+                counts[index] += 1
+                total -= 1
+    return counts
+
+
+def distinct_choices(k: int, cum_weights: List[float], rng: random.Random) -> List[int]:
+    """k разных элементов с учетом весов (без возвращения)"""
+    population = range(len(cum_weights))
+    if k * 2 > len(population):
+        # почти все элементы - выборка с учетом весов свелась бы к переборам
+        return rng.sample(population, k)
+    chosen: Dict[int, None] = {}
+    for _ in range(20):
+        chosen.update(dict.fromkeys(rng.choices(population, cum_weights=cum_weights, k=k - len(chosen))))
+        if len(chosen) >= k:
+            return list(chosen)[:k]
+    rest = [index for index in population if index not in chosen]
+    return list(chosen) + rng.sample(rest, k - len(chosen))
+
+
+def pick(rng: random.Random, items: Sequence[Any]) -> Any:
+    # rng.choice/randrange в разы медленнее на десятках миллионов вызовов
+    return items[int(rng.random() * len(items))]
+
+
+def make_name(rng: random.Random, syllables: int) -> str:
+    return ''.join(pick(rng, SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def moment(rng: random.Random, days: int) -> datetime:
+    """Случайный момент за days дней до ANCHOR"""
+    return ANCHOR - timedelta(seconds=int(rng.random() * days * DAY))
+
+
+class TableWriter:
+    """
+    Пакетная запись строк модели: COPY FROM STDIN (PostgreSQL) или bulk_create.
+    Значения генератора не бывают None и не содержат табуляций и переводов
+    строк, поэтому для COPY хватает str() без экранирования (copy_value из
+    fastload на десятках миллионов значений занимает большую часть времени).
+    """
+
+    def __init__(self, model, columns: Sequence[str], using: str, method: str, batch_size: int) -> None:
+        self.model = model
+        self.columns = list(columns)
+        self.using = using
+        self.method = method
+        self.batch_size = batch_size
+        self.rows: List[Tuple[Any, ...]] = []
+        self.count = 0
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        self.sql = 'COPY {} ({}) FROM STDIN'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(model._meta.get_field(name).column) for name in self.columns),
+        )
+
+    def write(self, row: Tuple[Any, ...]) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        if self.method == 'copy':
+            data = StringIO(''.join('\t'.join(map(str, row)) + '\n' for row in self.rows))
+            with connections[self.using].cursor() as cursor:
+                cursor.copy_expert(self.sql, data)
+        else:
+            # bulk_create выставит auto_now_add-поля (created_at) в текущее время
+            self.model._base_manager.using(self.using).bulk_create(
+                [self.model(**dict(zip(self.columns, row))) for row in self.rows]
+            )
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class Command(BaseCommand):
+    """
+    Синтетический каталог для нагрузочного тестирования: страны, города, отели,
+    категории номеров, пользователи, отзывы, бронирования и избранное.
+
+    Данные воспроизводимы (--seed) и неравномерны, как в жизни: популярность
+    городов подчиняется закону Ципфа, популярность отелей логнормальна,
+    активность пользователей - распределение Парето (немногие "power users"
+    пишут большую часть отзывов). Строки пишутся COPY пакетами в одной
+    транзакции; индексы и FK на это время снимаются и строятся заново в конце
+    (таблицы заблокированы до завершения, см. --keep-indexes). Статистика
+    рейтингов считается по ходу генерации, поэтому отели записываются
+    последними (FK в PostgreSQL отложенные). Бронирования -
+    в прошлом: загрузка номеров на будущие ночи (RoomNight) не создается.
+
+    Размер задается числом отелей, остальное по умолчанию выводится из него:
+    --hotels 500000 дает ~11 млн строк (из них 5 млн отзывов).
+    """
+
+    help = 'Генерирует воспроизводимый синтетический каталог заданного масштаба'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--hotels', type=int, default=10000, help='Количество отелей')
+        parser.add_argument('--countries', type=int, help='По умолчанию - от числа городов')
+        parser.add_argument('--cities', type=int, help='По умолчанию - отели / 100')
+        parser.add_argument('--users', type=int, help='По умолчанию - отели × 2')
+        parser.add_argument('--reviews', type=int, help='По умолчанию - отели × 10')
+        parser.add_argument('--bookings', type=int, help='По умолчанию - отели × 3')
+        parser.add_argument('--favorites', type=int, help='По умолчанию - пользователи × 2')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Префикс имен пользователей (повторный запуск - с другим префиксом)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Строк в одном COPY / bulk_create'
+        )
+        parser.add_argument(
+            '--method',
+            choices=['copy', 'bulk'],
+            default=None,
+            help='copy - COPY FROM STDIN (только PostgreSQL), bulk - bulk_create'
+        )
+        parser.add_argument(
+            '--keep-indexes',
+            action='store_true',
+            help='Не снимать индексы и FK на время загрузки (таблицы не блокируются '
+                 'целиком, но запись в разы медленнее)'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию - default)'
+        )
+
+    @staticmethod
+    def plan(options: Dict[str, Any]) -> Dict[str, int]:
+        hotels = options['hotels']
+        cities = options['cities'] or max(1, hotels // 100)
+        users = options['users'] or max(1, hotels * 2)
+        plan = {
+            'hotels': hotels,
+            'cities': cities,
+            'countries': options['countries'] or max(1, min(200, cities // 20)),
+            'users': users,
+            'reviews': options['reviews'] if options['reviews'] is not None else hotels * 10,
+            'bookings': options['bookings'] if options['bookings'] is not None else hotels * 3,
+            'favorites': options['favorites'] if options['favorites'] is not None else users * 2,
+        }
+        if min(plan['hotels'], plan['cities'], plan['countries'], plan['users']) < 1:
+            raise CommandError('Нужен хотя бы один отель, город, страна и пользователь')
+        return plan
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        using = options['database']
+        connection = connections[using]
+        method = options['method'] or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL, используйте --method bulk')
+        self.using = using
+        self.method = method
+        self.batch_size = options['batch_size']
+        self.seed = options['seed']
+        self.sizes = self.plan(options)
+        user_model = get_user_model()
+        if user_model._default_manager.using(using).filter(
+            username__startswith=f"{options['prefix']}-"
+        ).exists():
+            raise CommandError(f"Пользователи с префиксом {options['prefix']} уже есть, задайте --prefix")
+
+        started = time.perf_counter()
+        models = [user_model, Country, City, RoomType, Review, Booking, Favorite, Hotel]
+        with transaction.atomic(using=using):
+            # новые id - после существующих: генерация добавляет данные, а не заменяет
+            self.next_ids = {
+                model: (model._base_manager.using(using).aggregate(top=Max('pk'))['top'] or 0) + 1
+                for model in models
+            }
+            restore = []
+            if method == 'copy' and not options['keep_indexes']:
+                restore = self.drop_indexes(connection, models)
+            counts = {
+                'users': self.create_users(user_model, options['prefix']),
+                'countries': self.create_countries(),
+                'cities': self.create_cities(),
+            }
+            self.plan_hotels()
+            counts['room types'] = self.create_room_types()
+            counts['reviews'] = self.create_reviews()
+            counts['bookings'] = self.create_bookings()
+            counts['favorites'] = self.create_favorites()
+            counts['hotels'] = self.create_hotels()
+
+            Hotel.update_search_vectors(
+                Hotel.objects.using(using).filter(pk__gte=self.next_ids[Hotel])
+            )
+            with connection.cursor() as cursor:
+                for line in connection.ops.sequence_reset_sql(no_style(), models) + restore:
+                    cursor.execute(line)
+        bump_version(*[model._meta.model_name for model in models], 'hotel-bulk')
+
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        if options['verbosity'] >= 2:
+            for name, count in counts.items():
+                self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано строк: {total} (seed={self.seed}) за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
+
+    @staticmethod
+    def drop_indexes(connection, models: List[Any]) -> List[str]:
+        """
+        Снять FK, уникальные ограничения и вторичные индексы таблиц до вставки
+        и вернуть DDL для их восстановления. Построить индекс и проверить FK
+        одним проходом после загрузки во много раз быстрее, чем обновлять
+        индексы и ставить в очередь проверки FK на каждую строку. Первичные
+        ключи остаются (на них ссылаются FK). DDL транзакционный: при ошибке
+        все вернется откатом.
+        """
+        tables = [model._meta.db_table for model in models]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid), contype
+                FROM pg_constraint
+                WHERE conrelid = ANY(%s::regclass[]) AND contype IN ('f', 'u')
+                ORDER BY contype, conname
+                """,
+                [tables],
+            )
+            constraints = cursor.fetchall()
+            cursor.execute(
+                """
+                SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+                FROM pg_index
+                WHERE indrelid = ANY(%s::regclass[]) AND NOT indisprimary
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = indexrelid)
+                ORDER BY 1
+                """,
+                [tables],
+            )
+            indexes = cursor.fetchall()
+
+            quote = connection.ops.quote_name
+            # сначала FK (contype 'f' отсортирован раньше 'u'), восстановление - в обратном порядке
+            for table, name, _, _ in constraints:
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {quote(name)}')
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {name}')
+        return [definition for _, definition in indexes] + [
+            f'ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}'
+            for table, name, definition, _ in reversed(constraints)
+        ]
+
+    def rng(self, stream: str) -> random.Random:
+        # отдельный поток на сущность: изменение числа отзывов не меняет отели
+        return random.Random(f'{self.seed}:{stream}')
+
+    def writer(self, model, columns: Sequence[str]) -> TableWriter:
+        return TableWriter(model, columns, self.using, self.method, self.batch_size)
+
+    def create_users(self, user_model, prefix: str) -> int:
+        rng = self.rng('users')
+        count = self.sizes['users']
+        password = make_password(SEED_PASSWORD)
+        first_id = self.next_ids[user_model]
+        writer = self.writer(user_model, [
+            'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name',
+            'email', 'is_staff', 'is_active', 'date_joined',
+        ])
+        for index in range(count):
+            username = f'{prefix}-{index + 1:07d}'
+            writer.write((
+                first_id + index, password, False, username, make_name(rng, 2),
+                make_name(rng, 3), f'{username}@example.com', False, True, moment(rng, 3 * 365),
+            ))
+        writer.flush()
+        self.user_ids = range(first_id, first_id + count)
+        # активность пользователей по Парето: немногие пишут большую часть отзывов
+        self.user_activity = cumulative(min(rng.paretovariate(1.2), 1000.0) for _ in range(count))
+        return writer.count
+
+    def create_countries(self) -> int:
+        rng = self.rng('countries')
+        first_id = self.next_ids[Country]
+        writer = self.writer(Country, ['id', 'name', 'updated_at'])
+        now = datetime.now(dt_timezone.utc)
+        for index in range(self.sizes['countries']):
+            writer.write((first_id + index, make_name(rng, 3) + 'ия', now))
+        writer.flush()
+        self.country_ids = range(first_id, first_id + writer.count)
+        return writer.count
+
+    def create_cities(self) -> int:
+        rng = self.rng('cities')
+        first_id = self.next_ids[City]
+        count = self.sizes['cities']
+        country_weights = cumulative(zipf_weights(len(self.country_ids), 0.8))
+        countries = rng.choices(range(len(self.country_ids)), cum_weights=country_weights, k=count)
+        writer = self.writer(City, ['id', 'name', 'country_id', 'updated_at'])
+        now = datetime.now(dt_timezone.utc)
+        self.city_names: List[str] = []
+        self.city_countries = array('I')
+        for index in range(count):
+            name = make_name(rng, rng.randint(2, 4))
+            country_id = self.country_ids[countries[index]]
+            self.city_names.append(name)
+            self.city_countries.append(country_id)
+            writer.write((first_id + index, name, country_id, now))
+        writer.flush()
+        self.city_ids = range(first_id, first_id + count)
+        return writer.count
+
+    def plan_hotels(self) -> None:
+        """Атрибуты отелей, нужные зависимым таблицам (город, цена, популярность)"""
+        rng = self.rng('hotels')
+        count = self.sizes['hotels']
+        city_weights = zipf_weights(len(self.city_ids), 1.0)
+        self.hotel_cities = array('I', rng.choices(
+            range(len(self.city_ids)), cum_weights=cumulative(city_weights), k=count
+        ))
+        self.hotel_stars = array('B', rng.choices(range(1, 6), weights=STAR_WEIGHTS, k=count))
+        self.hotel_prices = array('I')   # в центах
+        self.hotel_quality = array('f')
+        popularity = []
+        for index in range(count):
+            stars = self.hotel_stars[index]
+            self.hotel_prices.append(int(rng.lognormvariate(3.4 + stars * 0.35, 0.4) * 100))
+            self.hotel_quality.append(min(5.0, max(1.0, rng.gauss(2.6 + stars * 0.35, 0.7))))
+            # популярность отеля: логнормальный разброс, в популярных городах выше
+            popularity.append(rng.lognormvariate(0, 1) * city_weights[self.hotel_cities[index]] ** 0.5)
+        self.hotel_popularity = cumulative(popularity)
+        self.hotel_ids = range(self.next_ids[Hotel], self.next_ids[Hotel] + count)
+        self.rating_counts = [array('I', bytes(4 * count)) for _ in range(5)]
+
+    def create_room_types(self) -> int:
+        rng = self.rng('room-types')
+        first_id = self.next_ids[RoomType]
+        writer = self.writer(RoomType, ['id', 'hotel_id', 'name', 'capacity', 'quantity', 'updated_at'])
+        now = datetime.now(dt_timezone.utc)
+        self.room_first = array('I')
+        self.room_count = array('B')
+        self.room_capacity = array('B')
+        room_id = first_id
+        for index, hotel_id in enumerate(self.hotel_ids):
+            kinds = rng.sample(ROOM_TYPES, rng.choices((1, 2, 3, 4), weights=(3, 4, 2, 1))[0])
+            self.room_first.append(room_id)
+            self.room_count.append(len(kinds))
+            for name, capacity in kinds:
+                writer.write((room_id, hotel_id, name, capacity, rng.randint(1, 40), now))
+                self.room_capacity.append(capacity)
+                room_id += 1
+        writer.flush()
+        return writer.count
+
+    def per_user(self, stream: str, total: int, distinct: bool) -> Iterable[Tuple[int, List[int]]]:
+        """(пользователь, индексы отелей) с перекосом по активности и популярности"""
+        rng = self.rng(f'{stream}-spread')
+        # отзыв и избранное - не больше одного на пару (пользователь, отель)
+        cap = len(self.hotel_ids) if distinct else total
+        counts = spread(total, self.user_activity, rng, cap)
+        for user_index, count in enumerate(counts):
+            if not count:
+                continue
+            if distinct:
+                hotels = distinct_choices(count, self.hotel_popularity, rng)
+            else:
+                hotels = rng.choices(range(len(self.hotel_ids)), cum_weights=self.hotel_popularity, k=count)
+            yield self.user_ids[user_index], hotels
+
+    def create_reviews(self) -> int:
+        rng = self.rng('reviews')
+        review_id = self.next_ids[Review]
+        writer = self.writer(Review, ['id', 'hotel_id', 'user_id', 'rating', 'comment', 'created_at'])
+        for user_id, hotels in self.per_user('reviews', self.sizes['reviews'], distinct=True):
+            for hotel in hotels:
+                rating = min(5, max(1, round(rng.gauss(self.hotel_quality[hotel], 1.0))))
+                self.rating_counts[rating - 1][hotel] += 1
+                writer.write((
+                    review_id, self.hotel_ids[hotel], user_id, rating,
+                    pick(rng, REVIEW_COMMENTS[rating]), moment(rng, 3 * 365),
+                ))
+                review_id += 1
+        writer.flush()
+        return writer.count
+
+    def create_bookings(self) -> int:
+        rng = self.rng('bookings')
+        booking_id = self.next_ids[Booking]
+        room_base = self.next_ids[RoomType]
+        writer = self.writer(Booking, [
+            'id', 'hotel_id', 'user_id', 'room_type_id', 'check_in', 'check_out',
+            'guests', 'total_price', 'created_at',
+        ])
+        for user_id, hotels in self.per_user('bookings', self.sizes['bookings'], distinct=False):
+            for hotel in hotels:
+                room_id = self.room_first[hotel] + int(rng.random() * self.room_count[hotel])
+                nights = 1 + min(int(rng.expovariate(1 / 3)), 20)
+                check_in = (ANCHOR - timedelta(days=nights + int(rng.random() * 2 * 365))).date()
+                created = datetime.combine(check_in, datetime.min.time(), dt_timezone.utc) \
+                    - timedelta(seconds=int(rng.random() * 90 * DAY))
+                writer.write((
+                    booking_id, self.hotel_ids[hotel], user_id, room_id, check_in,
+                    check_in + timedelta(days=nights),
+                    1 + int(rng.random() * self.room_capacity[room_id - room_base]),
+                    Decimal(self.hotel_prices[hotel] * nights) / 100, created,
+                ))
+                booking_id += 1
+        writer.flush()
+        return writer.count
+
+    def create_favorites(self) -> int:
+        rng = self.rng('favorites')
+        favorite_id = self.next_ids[Favorite]
+        writer = self.writer(Favorite, ['id', 'user_id', 'hotel_id', 'created_at'])
+        for user_id, hotels in self.per_user('favorites', self.sizes['favorites'], distinct=True):
+            for hotel in hotels:
+                writer.write((favorite_id, user_id, self.hotel_ids[hotel], moment(rng, 2 * 365)))
+                favorite_id += 1
+        writer.flush()
+        return writer.count
+
+    def create_hotels(self) -> int:
+        rng = self.rng('hotel-texts')
+        now = datetime.now(dt_timezone.utc)
+        writer = self.writer(Hotel, [
+            'id', 'name', 'description', 'country_id', 'city_id', 'stars', 'address',
+            'price_per_night', 'created_at', 'updated_at', 'rating_avg', 'rating_count',
+        ] + Hotel.RATING_FIELDS)
+        for index, hotel_id in enumerate(self.hotel_ids):
+            city = self.hotel_cities[index]
+            city_name = self.city_names[city]
+            ratings = [counts[index] for counts in self.rating_counts]
+            rating_count = sum(ratings)
+            rating_avg = (
+                sum(count * value for value, count in enumerate(ratings, start=1)) / rating_count
+                if rating_count else 0.0
+            )
+            writer.write((
+                hotel_id,
+                f'{pick(rng, HOTEL_PREFIXES)} {pick(rng, HOTEL_WORDS)} {city_name}',
+                f'{city_name}. ' + ' '.join(rng.sample(DESCRIPTION_PHRASES, rng.randint(2, 5))),
+                self.city_countries[city],
+                self.city_ids[city],
+                self.hotel_stars[index],
+                f'{pick(rng, STREETS)}, {1 + int(rng.random() * 200)}, {city_name}',
+                Decimal(self.hotel_prices[index]) / 100,
+                moment(rng, 5 * 365),
+                now,
+                rating_avg,
+                rating_count,
+                *ratings,
+            ))
+        writer.flush()
+        return writer.count
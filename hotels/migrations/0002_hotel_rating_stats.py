@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:31
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_rating_stats(apps, schema_editor):
+    Hotel = apps.get_model('hotels', 'Hotel')
+    Review = apps.get_model('hotels', 'Review')
+    stats = Review.objects.order_by().values('hotel_id').annotate(
+        **{f'rating_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)}
+    )
+    for row in stats.iterator():
+        count = sum(row[f'rating_{i}'] for i in range(1, 6))
+        Hotel.objects.filter(pk=row['hotel_id']).update(
+            rating_count=count,
+            rating_avg=sum(row[f'rating_{i}'] * i for i in range(1, 6)) / count,
+            **{f'rating_{i}': row[f'rating_{i}'] for i in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 1'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 2'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 3'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 4'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 5'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-rating_avg', 'name'], name='hotel_rating_idx'),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
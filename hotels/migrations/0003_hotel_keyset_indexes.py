@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0002_hotel_rating_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='hotel',
+            name='hotel_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-rating_avg', 'name', 'id'], name='hotel_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['price_per_night', 'id'], name='hotel_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-price_per_night', 'id'], name='hotel_price_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['stars', 'id'], name='hotel_stars_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-stars', 'id'], name='hotel_stars_desc_idx'),
+        ),
+    ]
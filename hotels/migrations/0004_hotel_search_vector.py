@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from hotels.search import build_search_vector
+
+
+def fill_search_vector(apps, schema_editor):
+    Hotel = apps.get_model('hotels', 'Hotel')
+    City = apps.get_model('hotels', 'City')
+    Hotel.objects.update(search_vector=build_search_vector(City))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0003_hotel_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='hotel_search_idx'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:37
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0005_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('capacity', models.PositiveSmallIntegerField(default=2, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)], verbose_name='Вместимость (гостей)')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Количество номеров')),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_types', to='hotels.hotel', verbose_name='Отель')),
+            ],
+            options={
+                'verbose_name': 'Категория номеров',
+                'verbose_name_plural': 'Категории номеров',
+                'ordering': ['capacity', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('total', models.PositiveIntegerField(verbose_name='Всего номеров')),
+                ('booked', models.PositiveIntegerField(default=0, verbose_name='Забронировано')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='hotels.roomtype', verbose_name='Категория номеров')),
+            ],
+            options={
+                'verbose_name': 'Загрузка на ночь',
+                'verbose_name_plural': 'Загрузка по ночам',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='room_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='hotels.roomtype', verbose_name='Категория номеров'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.UniqueConstraint(fields=('room_type', 'date'), name='room_night_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.CheckConstraint(check=models.Q(('booked__lte', models.F('total'))), name='room_night_no_overbooking'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0006_room_inventory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomnight',
+            index=models.Index(condition=models.Q(('booked__gte', models.F('total'))), fields=['room_type', 'date'], name='room_night_sold_out_idx'),
+        ),
+    ]
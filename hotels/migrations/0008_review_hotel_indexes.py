@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_room_night_sold_out_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['hotel', '-created_at', '-id'], name='review_hotel_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['hotel', 'rating', '-created_at', '-id'], name='review_hotel_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_cover_image(apps, schema_editor):
+    Hotel = apps.get_model('hotels', 'Hotel')
+    HotelImage = apps.get_model('hotels', 'HotelImage')
+    first_image = HotelImage.objects.filter(
+        hotel_id=models.OuterRef('pk')
+    ).order_by('position', 'id').values('pk')[:1]
+    Hotel.objects.update(cover_image=models.Subquery(first_image))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_review_hotel_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='hotelimage',
+            options={'ordering': ['position', 'id'], 'verbose_name': 'Изображение отеля', 'verbose_name_plural': 'Изображения отелей'},
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hotels.hotelimage', verbose_name='Обложка'),
+        ),
+        migrations.AddField(
+            model_name='hotelimage',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='Порядок'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelimage',
+            index=models.Index(fields=['hotel', 'position', 'id'], name='hotel_image_order_idx'),
+        ),
+        migrations.RunPython(fill_cover_image, migrations.RunPython.noop),
+    ]
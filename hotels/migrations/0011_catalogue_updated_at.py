@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:59
+
+from django.db import migrations, models
+import django.utils.timezone
+import hotels.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0010_hotel_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='updated_at',
+            field=hotels.models.UpdatedAtField(default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='updated_at',
+            field=hotels.models.UpdatedAtField(default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='updated_at',
+            field=hotels.models.UpdatedAtField(default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='hotelimage',
+            name='updated_at',
+            field=hotels.models.UpdatedAtField(default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='updated_at',
+            field=hotels.models.UpdatedAtField(default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['updated_at'], name='hotel_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelimage',
+            index=models.Index(fields=['updated_at'], name='hotel_image_updated_idx'),
+        ),
+    ]
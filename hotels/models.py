@@ -1,18 +1,47 @@
-from django.db import models
-from django.db.models import Avg
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Greatest, Now, Upper
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import bump_version
+from .search import build_search_vector
 
 User = get_user_model()
 
+
+class UpdatedAtField(models.DateTimeField):
+    """
+    Время последнего изменения строки (для инкрементальных выгрузок dump_catalog).
+    В отличие от auto_now имеет default, поэтому фикстуры без этого поля
+    загружаются, а loaddata сохраняет выгруженное значение как есть.
+    Массовые UPDATE должны выставлять его сами (updated_at=Now()).
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        kwargs.setdefault('default', timezone.now)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        value = timezone.now()
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class Country(models.Model):
 
     name: models.CharField = models.CharField(
         max_length=100,
         verbose_name='Название страны'
     )
+    updated_at: UpdatedAtField = UpdatedAtField(verbose_name='Дата изменения')
 
     def __str__(self) -> str:
         return self.name
@@ -21,6 +50,9 @@ class Country(models.Model):
         verbose_name: str = 'Страна'
         verbose_name_plural: str = 'Страны'
         ordering: List[str] = ['name']
+        indexes: List[models.Index] = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='country_name_trgm_idx'),
+        ]
 
 
 class City(models.Model):
@@ -33,14 +65,23 @@ class City(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Страна'
     )
+    updated_at: UpdatedAtField = UpdatedAtField(verbose_name='Дата изменения')
 
     def __str__(self) -> str:
         return str(self.name)
 
+    def save(self, *args, **kwargs) -> None:
+        """Название города входит в поисковый вектор отелей - обновляем его"""
+        super().save(*args, **kwargs)
+        Hotel.update_search_vectors(Hotel.objects.filter(city_id=self.pk))
+
     class Meta:
         verbose_name: str = 'Город'
         verbose_name_plural: str = 'Города'
         ordering: List[str] = ['name']
+        indexes: List[models.Index] = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='city_name_trgm_idx'),
+        ]
 
 class Hotel(models.Model):
 
@@ -89,25 +130,184 @@ class Hotel(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    updated_at: UpdatedAtField = UpdatedAtField(verbose_name='Дата изменения')
+
+    # Денормализованная статистика отзывов (обновляется при создании/удалении отзыва)
+    rating_avg: models.FloatField = models.FloatField(
+        default=0.0,
+        verbose_name='Средний рейтинг'
+    )
+    rating_count: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+    rating_1: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Оценок 1'
+    )
+    rating_2: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Оценок 2'
+    )
+    rating_3: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Оценок 3'
+    )
+    rating_4: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Оценок 4'
+    )
+    rating_5: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Оценок 5'
+    )
+
+    # Обложка - первое изображение по позиции (поддерживается HotelImage, см. signals)
+    cover_image: models.ForeignKey = models.ForeignKey(
+        'HotelImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False,
+        verbose_name='Обложка'
+    )
+
+    # Полнотекстовый поиск (название, город, описание; русский и английский стемминг)
+    search_vector: SearchVectorField = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    RATING_FIELDS: List[str] = [f'rating_{i}' for i in range(1, 6)]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.stars}⭐)"
 
+    def save(self, *args, **kwargs) -> None:
+        """Пересчитывать поисковый вектор при сохранении"""
+        super().save(*args, **kwargs)
+        # карточки других отелей не меняются - их версия (hotel-bulk) остается
+        Hotel.update_search_vectors(Hotel.objects.filter(pk=self.pk), versions=('hotel', f'hotel:{self.pk}'))
+
+    @staticmethod
+    def refresh_cover_images(queryset) -> int:
+        """Обложка = изображение с наименьшей позицией (одним UPDATE)"""
+        first_image = HotelImage.objects.filter(
+            hotel_id=OuterRef('pk')
+        ).order_by('position', 'id').values('pk')[:1]
+        return queryset.update(cover_image=Subquery(first_image), updated_at=Now())
+
+    @staticmethod
+    def update_search_vectors(queryset, versions: Iterable[str] = ('hotel', 'hotel-bulk')) -> int:
+        """
+        Пересчитать поисковый вектор одним UPDATE для всех отелей queryset.
+        versions - версии кеша, которые устаревают (по умолчанию - все отели)
+        """
+        updated = queryset.update(search_vector=build_search_vector(City), updated_at=Now())
+        bump_version(*versions)
+        return updated
+
     class Meta:
         verbose_name: str = 'Отель'
         verbose_name_plural: str = 'Отели'
         ordering: List[str] = ['-created_at']
+        indexes: List[models.Index] = [
+            models.Index(fields=['-rating_avg', 'name', 'id'], name='hotel_rating_idx'),
+            models.Index(fields=['price_per_night', 'id'], name='hotel_price_idx'),
+            models.Index(fields=['-price_per_night', 'id'], name='hotel_price_desc_idx'),
+            models.Index(fields=['stars', 'id'], name='hotel_stars_idx'),
+            models.Index(fields=['-stars', 'id'], name='hotel_stars_desc_idx'),
+            GinIndex(fields=['search_vector'], name='hotel_search_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='hotel_name_trgm_idx'),
+            models.Index(fields=['updated_at'], name='hotel_updated_idx'),
+        ]
 
     @property
     def average_rating(self) -> float:
-        """Вычисляем средний рейтинг отеля"""
-        avg = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0.0
+        """Средний рейтинг отеля (из сохраненной статистики)"""
+        return round(self.rating_avg, 1) if self.rating_count else 0.0
 
     @property
     def review_count(self) -> int:
         """Количество отзывов"""
-        return self.reviews.count()
+        return self.rating_count
+
+    @property
+    def rating_histogram(self) -> Dict[int, int]:
+        """Распределение оценок 1–5"""
+        return {i: getattr(self, f'rating_{i}') for i in range(1, 6)}
+
+    @classmethod
+    def apply_review_rating(cls, hotel_id: int, rating: int, delta: int) -> None:
+        """Инкрементально учесть добавленный (delta=1) или удаленный (delta=-1) отзыв"""
+        bucket = f'rating_{rating}'
+        weighted_sum = sum(
+            (F(field) * i for i, field in enumerate(cls.RATING_FIELDS, start=1)),
+            Value(0)
+        )
+        with transaction.atomic():
+            cls.objects.filter(pk=hotel_id).update(
+                rating_count=F('rating_count') + delta,
+                updated_at=Now(),
+                **{bucket: F(bucket) + delta}
+            )
+            cls.objects.filter(pk=hotel_id).update(
+                rating_avg=Case(
+                    When(rating_count=0, then=Value(0.0)),
+                    default=Cast(weighted_sum, FloatField()) / F('rating_count'),
+                    output_field=FloatField(),
+                )
+            )
+
+    @classmethod
+    def rebuild_rating_stats(
+        cls,
+        hotel_ids: Optional[Iterable[int]] = None,
+        batch_size: int = 1000,
+        using: str = DEFAULT_DB_ALIAS,
+    ) -> int:
+        """Пересчитать статистику отзывов с нуля. Возвращает число отелей с отзывами"""
+        hotels = cls.objects.using(using)
+        stats = Review.objects.using(using).order_by().values('hotel_id').annotate(
+            **{
+                f'rating_{i}': Count('id', filter=Q(rating=i))
+                for i in range(1, 6)
+            }
+        )
+        if hotel_ids is not None:
+            hotel_ids = list(hotel_ids)
+            hotels = hotels.filter(pk__in=hotel_ids)
+            stats = stats.filter(hotel_id__in=hotel_ids)
+
+        fields = ['rating_avg', 'rating_count'] + cls.RATING_FIELDS
+        updated = 0
+        with transaction.atomic(using=using):
+            hotels.update(
+                rating_avg=0.0, rating_count=0, updated_at=Now(),
+                **{f: 0 for f in cls.RATING_FIELDS}
+            )
+
+            batch: List['Hotel'] = []
+            for row in stats.iterator(chunk_size=batch_size):
+                hotel = cls(pk=row['hotel_id'])
+                for field in cls.RATING_FIELDS:
+                    setattr(hotel, field, row[field])
+                hotel.rating_count = sum(row[f] for f in cls.RATING_FIELDS)
+                hotel.rating_avg = sum(
+                    row[f] * i for i, f in enumerate(cls.RATING_FIELDS, start=1)
+                ) / hotel.rating_count
+                batch.append(hotel)
+                if len(batch) >= batch_size:
+                    hotels.bulk_update(batch, fields)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                hotels.bulk_update(batch, fields)
+                updated += len(batch)
+        bump_version('hotel', 'hotel-bulk')
+        return updated
 
 
 class HotelImage(models.Model):
@@ -122,6 +322,18 @@ class HotelImage(models.Model):
         upload_to='hotel_images/',
         verbose_name='Изображение'
     )
+    position: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Порядок'
+    )
+    # Производные WebP/JPEG и заглушка (см. hotels/images.py)
+    variants: models.JSONField = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты'
+    )
+    updated_at: UpdatedAtField = UpdatedAtField(verbose_name='Дата изменения')
 
     def __str__(self) -> str:
         return f"Изображение {self.hotel.name}"
@@ -129,6 +341,175 @@ class HotelImage(models.Model):
     class Meta:
         verbose_name: str = 'Изображение отеля'
         verbose_name_plural: str = 'Изображения отелей'
+        ordering: List[str] = ['position', 'id']
+        indexes: List[models.Index] = [
+            models.Index(fields=['hotel', 'position', 'id'], name='hotel_image_order_idx'),
+            models.Index(fields=['updated_at'], name='hotel_image_updated_idx'),
+        ]
+
+
+class RoomType(models.Model):
+    """Категория номеров отеля с количеством номеров (аллотментом)"""
+
+    hotel: models.ForeignKey = models.ForeignKey(
+        Hotel,
+        on_delete=models.CASCADE,
+        related_name='room_types',
+        verbose_name='Отель'
+    )
+    name: models.CharField = models.CharField(
+        max_length=100,
+        verbose_name='Название'
+    )
+    capacity: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField(
+        default=2,
+        validators=[MinValueValidator(1), MaxValueValidator(10)],
+        verbose_name='Вместимость (гостей)'
+    )
+    quantity: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Количество номеров'
+    )
+    updated_at: UpdatedAtField = UpdatedAtField(verbose_name='Дата изменения')
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.quantity} шт.)"
+
+    def save(self, *args, **kwargs) -> None:
+        """Изменение количества номеров применяется к будущим ночам"""
+        super().save(*args, **kwargs)
+        self.room_nights.filter(date__gte=date.today()).update(
+            total=Greatest(Value(self.quantity), F('booked'))
+        )
+
+    class Meta:
+        verbose_name: str = 'Категория номеров'
+        verbose_name_plural: str = 'Категории номеров'
+        ordering: List[str] = ['capacity', 'id']
+
+    @staticmethod
+    def nights(check_in: date, check_out: date) -> List[date]:
+        """Список ночей проживания (дата выезда не включается)"""
+        return [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
+
+    def _lock_nights(self, check_in: date, check_out: date) -> List[int]:
+        """
+        Блокируем строки ночей в порядке дат - одинаковый порядок захвата
+        блокировок во всех транзакциях исключает взаимоблокировки
+        """
+        return list(
+            RoomNight.objects.select_for_update()
+            .filter(room_type=self, date__gte=check_in, date__lt=check_out)
+            .order_by('date')
+            .values_list('id', flat=True)
+        )
+
+    def reserve(self, check_in: date, check_out: date) -> bool:
+        """
+        Атомарно занять по одному номеру на каждую ночь.
+        Блокируются только строки нужных ночей этой категории, поэтому брони
+        на другие даты и другие категории идут параллельно.
+        """
+        nights = self.nights(check_in, check_out)
+        with transaction.atomic():
+            RoomNight.objects.bulk_create(
+                [RoomNight(room_type=self, date=night, total=self.quantity) for night in nights],
+                ignore_conflicts=True
+            )
+            night_ids = self._lock_nights(check_in, check_out)
+            reserved = RoomNight.objects.filter(
+                id__in=night_ids,
+                booked__lt=F('total')
+            ).update(booked=F('booked') + 1)
+            if reserved != len(nights):
+                transaction.set_rollback(True)
+                return False
+        bump_version('roomnight')
+        return True
+
+    def release(self, check_in: date, check_out: date) -> None:
+        """Вернуть номер в продажу на каждую ночь (отмена брони)"""
+        with transaction.atomic():
+            night_ids = self._lock_nights(check_in, check_out)
+            RoomNight.objects.filter(
+                id__in=night_ids,
+                booked__gt=0
+            ).update(booked=F('booked') - 1)
+        bump_version('roomnight')
+
+    @staticmethod
+    def release_bookings(bookings: 'models.QuerySet[Booking]') -> None:
+        """
+        Вернуть в продажу ночи всех броней выборки за несколько запросов, не
+        по запросу на бронь (удаление аккаунта). Брони отвязываются от
+        категорий, поэтому сигнал pre_delete при их удалении ничего не
+        возвращает повторно.
+        """
+        bookings = bookings.filter(room_type__isnull=False)
+        stays = list(bookings.values_list('room_type_id', 'check_in', 'check_out'))
+        if not stays:
+            return
+        condition = Q()
+        for room_type_id, check_in, check_out in stays:
+            condition |= Q(room_type_id=room_type_id, date__gte=check_in, date__lt=check_out)
+        with transaction.atomic():
+            # порядок блокировок (категория, дата) согласован с _lock_nights
+            nights = (
+                RoomNight.objects.select_for_update().filter(condition)
+                .order_by('room_type_id', 'date').values_list('id', 'room_type_id', 'date')
+            )
+            released: Dict[int, int] = {}
+            for night_id, room_type_id, night in nights:
+                released[night_id] = sum(
+                    1 for stay in stays if stay[0] == room_type_id and stay[1] <= night < stay[2]
+                )
+            by_count: Dict[int, List[int]] = {}
+            for night_id, count in released.items():
+                by_count.setdefault(count, []).append(night_id)
+            for count, night_ids in by_count.items():
+                RoomNight.objects.filter(id__in=night_ids).update(booked=Greatest(F('booked') - count, Value(0)))
+            bookings.update(room_type=None)
+        bump_version('roomnight')
+
+
+class RoomNight(models.Model):
+    """Счетчик занятых номеров категории на конкретную ночь"""
+
+    room_type: models.ForeignKey = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name='room_nights',
+        verbose_name='Категория номеров'
+    )
+    date: models.DateField = models.DateField(
+        verbose_name='Дата'
+    )
+    total: models.PositiveIntegerField = models.PositiveIntegerField(
+        verbose_name='Всего номеров'
+    )
+    booked: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Забронировано'
+    )
+
+    def __str__(self) -> str:
+        return f"{self.date}: {self.booked}/{self.total}"
+
+    class Meta:
+        verbose_name: str = 'Загрузка на ночь'
+        verbose_name_plural: str = 'Загрузка по ночам'
+        constraints: List[models.BaseConstraint] = [
+            models.UniqueConstraint(fields=['room_type', 'date'], name='room_night_unique'),
+            models.CheckConstraint(check=Q(booked__lte=F('total')), name='room_night_no_overbooking'),
+        ]
+        indexes: List[models.Index] = [
+            # Календарь доступности: фильтр отелей ищет только распроданные ночи
+            models.Index(
+                fields=['room_type', 'date'],
+                condition=Q(booked__gte=F('total')),
+                name='room_night_sold_out_idx'
+            ),
+        ]
 
 
 class Review(models.Model):
@@ -167,6 +548,11 @@ class Review(models.Model):
         verbose_name_plural: str = 'Отзывы'
         ordering: List[str] = ['-created_at']
         unique_together: List[str] = ['hotel', 'user']
+        indexes: List[models.Index] = [
+            # Последние отзывы отеля и курсорная пагинация /hotels/<id>/reviews/
+            models.Index(fields=['hotel', '-created_at', '-id'], name='review_hotel_recent_idx'),
+            models.Index(fields=['hotel', 'rating', '-created_at', '-id'], name='review_hotel_rating_idx'),
+        ]
 
 
 class Booking(models.Model):
@@ -181,6 +567,14 @@ class Booking(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Пользователь'
     )
+    room_type: models.ForeignKey = models.ForeignKey(
+        RoomType,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bookings',
+        verbose_name='Категория номеров'
+    )
     check_in: models.DateField = models.DateField(
         verbose_name='Дата заезда'
     )
@@ -0,0 +1,167 @@
+"""
+Чтение публичных API с реплик PostgreSQL.
+
+Реплики задаются переменной DB_REPLICA_HOSTS (settings.DATABASE_REPLICAS -
+их алиасы). Решение принимает представление: ReplicaReadMixin на GET/HEAD
+выбирает одну реплику на весь запрос и кладет ее алиас в contextvar, а
+ReplicaRouter отдает его в db_for_read. Остальной код (админка, личный
+кабинет, фоновые задачи) и все записи идут в основную базу.
+
+Реплика отстает от основной базы, поэтому пользователь, который только что
+что-то записал (бронь, отзыв, избранное), REPLICA_STICKY_SECONDS читает
+с основной базы и сразу видит свои изменения: PrimaryStickinessMiddleware
+отмечает успешные небезопасные запросы в кеше (при нескольких процессах
+нужен общий кеш - REDIS_URL или CACHE_DIR). Анонимные GET всегда идут на
+реплику. Недоступная реплика на REPLICA_RETRY_SECONDS исключается из выбора.
+
+Изменение данных обновляет версии кеша ответов сразу после коммита, а
+реплика получает его позже. Чтобы следующий пересчет не сохранил под новыми
+версиями ответ со старыми данными, представление, чьи зависимости
+(get_cache_dependencies) менялись последние REPLICA_STICKY_SECONDS, читает
+с основной базы - для всех пользователей (cache.changed_recently).
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from .cache import changed_recently
+
+logger = logging.getLogger(__name__)
+
+STICKY_PREFIX = 'db-primary'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# алиас базы для чтения в текущем запросе; None - основная
+read_alias: ContextVar[Optional[str]] = ContextVar('read_alias', default=None)
+# алиас реплики -> time.monotonic(), до которого она не выбирается (процесс)
+down_until: Dict[str, float] = {}
+
+
+def _sticky_key(user_id: Any) -> str:
+    return f'{STICKY_PREFIX}:{user_id}'
+
+
+def stick_to_primary(user) -> None:
+    """Следующие REPLICA_STICKY_SECONDS читать для пользователя с основной базы"""
+    cache.set(_sticky_key(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user) -> bool:
+    return bool(user.is_authenticated and cache.get(_sticky_key(user.pk)))
+
+
+def choose_replica() -> Optional[str]:
+    """Случайная доступная реплика; None - читать с основной базы"""
+    now = time.monotonic()
+    candidates = [alias for alias in settings.DATABASE_REPLICAS if down_until.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except OperationalError:
+            logger.warning('Реплика %s недоступна, чтение с основной базы', alias)
+            down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+            continue
+        down_until.pop(alias, None)
+        return alias
+    return None
+
+
+class ReplicaRouter:
+    """Чтение - из алиаса текущего запроса (ReplicaReadMixin), запись - в основную базу"""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # реплики содержат те же строки, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        # схема приходит на реплики репликацией
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaReadMixin:
+    """
+    Публичные GET/HEAD представления читают с реплики. Решение принимается
+    после аутентификации (initial), чтобы учесть недавние записи пользователя.
+    """
+
+    def dispatch(self, request, *args, **kwargs) -> Any:
+        self.replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.replica_token is not None:
+                read_alias.reset(self.replica_token)
+
+    def initial(self, request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        alias = self.choose_read_alias(request)
+        if alias is not None:
+            self.replica_token = read_alias.set(alias)
+
+    def choose_read_alias(self, request) -> Optional[str]:
+        """
+        Реплика для чтения запроса; None - основная база (пользователь недавно
+        писал или недавно менялись данные ответа)
+        """
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in ('GET', 'HEAD')
+            and not is_sticky(request.user)
+            and not changed_recently(getattr(self, 'get_cache_dependencies', tuple)())
+        ):
+            return choose_replica()
+        return None
+
+
+
+class PrimaryStickinessMiddleware:
+    """
+    После успешного POST/PUT/PATCH/DELETE пользователь на время читает с
+    основной базы. Пользователь берется после ответа: DRF записывает в
+    request.user и пользователя из JWT. Без реплик ничего не делает.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method in UNSAFE_METHODS:
+            self.remember_write(request, response)
+        return response
+
+    async def __acall__(self, request) -> Any:
+        response = await self.get_response(request)
+        if request.method in UNSAFE_METHODS:
+            # request.user сессии и кеш - синхронные
+            await sync_to_async(self.remember_write)(request, response)
+        return response
+
+    @staticmethod
+    def remember_write(request, response) -> None:
+        if not settings.DATABASE_REPLICAS or response.status_code >= 400:
+            return
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            stick_to_primary(user)
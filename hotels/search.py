@@ -0,0 +1,110 @@
+from typing import Any, Dict, List
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    CharField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Upper
+
+# Конфигурация 'russian' стеммит кириллицу русским snowball-стеммером,
+# а латиницу (asciiword) - английским, поэтому одного вектора достаточно
+SEARCH_CONFIG = 'russian'
+
+HEADLINE_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'max_words': 35,
+    'min_words': 15,
+    'max_fragments': 2,
+}
+
+
+def build_search_vector(city_model) -> SearchVector:
+    """
+    Взвешенный вектор отеля: название (A), город (B), описание (C).
+    Название города берется подзапросом, чтобы выражение работало в UPDATE.
+    """
+    city_name = Subquery(
+        city_model.objects.filter(pk=OuterRef('city_id')).values('name')[:1]
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(city_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def build_search_query(value: str) -> SearchQuery:
+    """Запрос в синтаксисе web-поиска ("фраза", -исключение, OR)"""
+    return SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+
+
+# Автодополнение: префикс + триграммное сходство (устойчиво к опечаткам)
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_SIMILARITY_THRESHOLD = 0.4
+
+
+def normalize_autocomplete_query(value: str) -> str:
+    """Приводим запрос к каноническому виду (ключ кеша и параметр поиска)"""
+    return ' '.join(value.lower().split())
+
+
+def autocomplete(value: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Подсказки по отелям, городам и странам одним UNION-запросом.
+    Оба условия (UPPER(name) LIKE 'q%' и word_similarity) обслуживаются
+    GIN-индексами gin_trgm_ops по UPPER(name).
+    """
+    from .models import City, Country, Hotel
+
+    needle = value.upper()
+    branches = []
+    for model, kind in ((Hotel, 'hotel'), (City, 'city'), (Country, 'country')):
+        branches.append(
+            model.objects
+            .alias(name_upper=Upper('name'))
+            .filter(
+                Q(name_upper__startswith=needle)
+                | Q(name_upper__trigram_word_similar=value)
+            )
+            .annotate(
+                type=Value(kind, output_field=CharField()),
+                is_prefix=Case(
+                    When(name_upper__startswith=needle, then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                score=TrigramWordSimilarity(value, Upper('name')),
+            )
+            .order_by('-is_prefix', '-score', 'name')
+            .values('id', 'name', 'type', 'is_prefix', 'score')[:limit]
+        )
+    queryset = branches[0].union(*branches[1:], all=True).order_by(
+        '-is_prefix', '-score', 'name'
+    )[:limit]
+
+    with transaction.atomic(using=queryset.db):
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(AUTOCOMPLETE_SIMILARITY_THRESHOLD)]
+            )
+        rows = list(queryset)
+
+    return [
+        {'id': row['id'], 'name': row['name'], 'type': row['type']}
+        for row in rows
+    ]
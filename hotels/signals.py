@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+
+from .cache import bump_version, purge_surrogate_keys
+from .models import Booking, City, Country, Hotel, HotelImage, Review, RoomType
+
+
+# Названия городов и стран выводятся в списках и карточках отелей
+REFERENCE_SURROGATE_KEYS = {
+    City: ['city-list', 'hotels', 'hotel-details'],
+    Country: ['country-list', 'city-list', 'hotels', 'hotel-details'],
+}
+
+
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=Country)
+def invalidate_reference_data(sender, **kwargs) -> None:
+    """Изменение справочника делает устаревшими все ответы, которые от него зависят"""
+    bump_version(sender._meta.model_name)
+    purge_surrogate_keys(REFERENCE_SURROGATE_KEYS[sender])
+
+
+@receiver([post_save, post_delete], sender=Hotel)
+@receiver([post_save, post_delete], sender=HotelImage)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=RoomType)
+def invalidate_hotel_data(sender, instance, **kwargs) -> None:
+    """Изменение отеля или его данных - общая версия модели и версия конкретного отеля"""
+    hotel_id = instance.pk if sender is Hotel else instance.hotel_id
+    bump_version(sender._meta.model_name, f'hotel:{hotel_id}')
+    purge_surrogate_keys([f'hotel-{hotel_id}', 'hotels'])
+
+
+@receiver(pre_delete, sender=Booking)
+def release_booking_nights(sender, instance, **kwargs) -> None:
+    """
+    Удаленная бронь возвращает ночи в продажу - при отмене через API, в
+    админке и при каскадном удалении пользователя. Выполняется в транзакции
+    удаления (Collector.delete).
+    """
+    if instance.room_type_id:
+        RoomType(pk=instance.room_type_id).release(instance.check_in, instance.check_out)
+
+
+@receiver([post_save, post_delete], sender=HotelImage)
+def refresh_cover_image(sender, instance, **kwargs) -> None:
+    """
+    Поддерживаем денормализованную обложку отеля. Работает и при loaddata
+    (raw=True): отель к этому моменту уже загружен.
+    """
+    Hotel.refresh_cover_images(Hotel.objects.filter(pk=instance.hotel_id))
+
+
+@receiver(post_save, sender=HotelImage)
+def build_image_variants(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Новый или замененный файл - генерируем варианты фоновой задачей.
+    Фикстуры (raw) обрабатываются командой build_image_variants.
+    """
+    if raw or not instance.image or instance.variants.get('source') == instance.image.name:
+        return
+    enqueue('hotels.tasks.build_image_variants', instance.pk)
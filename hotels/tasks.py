@@ -0,0 +1,30 @@
+from typing import List, Optional
+
+from jobs.queue import task
+
+from .cache import send_purge
+from .images import safe_render, save_variants
+from .models import Hotel, HotelImage
+
+
+@task(max_attempts=5)
+def build_image_variants(image_id: int) -> None:
+    """Варианты нового или замененного фото (ставится сигналом post_save)"""
+    image = HotelImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return
+    variants = safe_render(image.image.name)
+    if variants is not None:
+        save_variants(image.pk, image.hotel_id, variants)
+
+
+@task
+def rebuild_rating_stats(hotel_ids: Optional[List[int]] = None) -> None:
+    """Пересчет статистики отзывов после массовых удалений (например, аккаунта)"""
+    Hotel.rebuild_rating_stats(hotel_ids=hotel_ids)
+
+
+@task(max_attempts=5)
+def purge_surrogate_keys(keys: List[str]) -> None:
+    """Сброс ответов CDN по Surrogate-Key после записи (ставится cache.purge_surrogate_keys)"""
+    send_purge(keys)
@@ -1,10 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
 from .models import Country, City, Hotel
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+import json
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
 from datetime import date, timedelta
-from .models import Booking
+from .models import Booking, RoomNight, RoomType
 
 User = get_user_model()
 
@@ -32,9 +39,9 @@ class HotelAPITest(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        self.assertTrue(len(response.data) > 0)
+        self.assertTrue(len(response.data['results']) > 0)
 
-        first_hotel = response.data[0]
+        first_hotel = response.data['results'][0]
         self.assertEqual(first_hotel['name'], "Римский отель")
 
 
@@ -129,4 +136,1767 @@ class BookingValidationTest(APITestCase):
         response = self.client.post('/api/bookings/', data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('Нельзя бронировать на прошедшие даты', str(response.data))
\ No newline at end of file
+        self.assertIn('Нельзя бронировать на прошедшие даты', str(response.data))
+
+# Тесты денормализованной статистики отзывов
+class RatingStatsTest(APITestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name="Испания")
+        self.city = City.objects.create(name="Мадрид", country=self.country)
+        self.hotel = Hotel.objects.create(
+            name="Мадридский отель",
+            description="Отель у парка",
+            country=self.country,
+            city=self.city,
+            stars=3,
+            address="Улица Тестовая, 2",
+            price_per_night=90.00
+        )
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='testpass123')
+            for i in range(3)
+        ]
+
+    def _post_review(self, user, rating):
+        self.client.force_authenticate(user=user)
+        return self.client.post('/api/reviews/', {
+            'hotel': self.hotel.id,
+            'rating': rating,
+            'comment': 'Отзыв'
+        }, format='json')
+
+    def test_stats_updated_on_create_and_delete(self):
+        """статистика обновляется при создании и удалении отзыва"""
+        self._post_review(self.users[0], 5)
+        self._post_review(self.users[1], 4)
+        response = self._post_review(self.users[2], 4)
+
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 3)
+        self.assertAlmostEqual(self.hotel.rating_avg, 13 / 3)
+        self.assertEqual(self.hotel.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 2, 5: 1})
+
+        self.client.delete(f"/api/reviews/{response.data['id']}/")
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 2)
+        self.assertEqual(self.hotel.rating_avg, 4.5)
+        self.assertEqual(self.hotel.rating_4, 1)
+
+    def test_stats_follow_rating_and_hotel_change(self):
+        """PATCH оценки или отеля переносит отзыв в статистике"""
+        def send(method, data):
+            self.client.force_authenticate(user=self.users[1])
+            return getattr(self.client, method)(f'/api/reviews/{review_id}/', data, format='json')
+
+        self._post_review(self.users[0], 5)
+        review_id = self._post_review(self.users[1], 4).data['id']
+
+        # чужой отзыв изменить нельзя
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.patch(f'/api/reviews/{review_id}/', {'rating': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = send('patch', {'rating': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 2)
+        self.assertEqual(self.hotel.rating_avg, 3.5)
+        self.assertEqual(self.hotel.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        # только комментарий - статистика не меняется
+        send('patch', {'comment': 'Передумал'})
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 2)
+
+        other = Hotel.objects.create(
+            name="Другой отель", description="-", country=self.country,
+            city=self.city, stars=3, address="-", price_per_night=80.00
+        )
+        response = send('put', {'hotel': other.id, 'rating': 3, 'comment': '-'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.hotel.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.hotel.rating_count, self.hotel.rating_avg), (1, 5.0))
+        self.assertEqual((other.rating_count, other.rating_3), (1, 1))
+
+    def test_list_and_detail_use_stored_stats(self):
+        """список и детальная страница читают сохраненные поля"""
+        self._post_review(self.users[0], 5)
+        self._post_review(self.users[1], 2)
+
+        response = self.client.get('/api/hotels/?sort_by=rating_desc')
+        card = response.data['results'][0]
+        self.assertEqual(card['average_rating'], 3.5)
+        self.assertEqual(card['review_count'], 2)
+
+        response = self.client.get(f'/api/hotels/{self.hotel.id}/')
+        self.assertEqual(response.data['average_rating'], 3.5)
+        self.assertEqual(response.data['review_count'], 2)
+
+    def test_rebuild_command(self):
+        """команда rebuild_rating_stats пересчитывает статистику с нуля"""
+        from django.core.management import call_command
+        from .models import Review
+
+        Review.objects.create(hotel=self.hotel, user=self.users[0], rating=1, comment='-')
+        Review.objects.create(hotel=self.hotel, user=self.users[1], rating=3, comment='-')
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 0)
+
+        call_command('rebuild_rating_stats', stdout=StringIO())
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.rating_count, 2)
+        self.assertEqual(self.hotel.rating_avg, 2.0)
+        self.assertEqual(self.hotel.rating_histogram, {1: 1, 2: 0, 3: 1, 4: 0, 5: 0})
+
+
+# Тесты курсорной пагинации списка отелей
+class HotelCursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name="Греция")
+        self.city = City.objects.create(name="Афины", country=self.country)
+        # Много одинаковых цен и звезд - проверяем тайбрейкер
+        for i in range(25):
+            Hotel.objects.create(
+                name=f"Отель {i % 7}",
+                description="Описание",
+                country=self.country,
+                city=self.city,
+                stars=i % 5 + 1,
+                address="Адрес",
+                price_per_night=100 + (i % 3) * 10,
+                rating_avg=float(i % 4),
+                rating_count=i % 4,
+            )
+
+    def _walk(self, query):
+        ids, url = [], f'/api/hotels/?pagination=cursor&{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(hotel['id'] for hotel in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def _expected(self, query):
+        ids, url = [], f'/api/hotels/?{query}'
+        while url:
+            response = self.client.get(url)
+            ids.extend(hotel['id'] for hotel in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_walk_matches_page_numbers_for_every_ordering(self):
+        """курсорный обход совпадает с постраничным для всех сортировок"""
+        for query in ['', 'ordering=price_per_night', 'ordering=-price_per_night',
+                      'ordering=stars', 'ordering=-stars', 'sort_by=rating_desc',
+                      'ordering=stars&min_price=105']:
+            ids = self._walk(query)
+            self.assertEqual(ids, self._expected(query), query)
+            self.assertEqual(len(ids), len(set(ids)))
+
+    def test_previous_link_and_estimate(self):
+        """ссылка назад возвращает предыдущую страницу, оценка количества опциональна"""
+        first = self.client.get('/api/hotels/?pagination=cursor&ordering=-price_per_night&estimate=1')
+        self.assertIsNone(first.data['previous'])
+        self.assertIn('estimated_count', first.data)
+
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [h['id'] for h in back.data['results']],
+            [h['id'] for h in first.data['results']]
+        )
+        self.assertNotIn('count', second.data)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/hotels/?cursor=bm90LWpzb24')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_of_wrong_type(self):
+        """правильный по форме курсор с чужими типами значений - 404, а не 500"""
+        from base64 import b64encode
+        from urllib.parse import quote
+        hotel = Hotel.objects.first()
+
+        def cursor(*values):
+            return quote(b64encode(json.dumps({'v': list(values), 'r': 0}).encode()).decode())
+
+        for path, values in [
+            ('/api/hotels/?pagination=cursor', ['x']),
+            ('/api/hotels/?pagination=cursor', [None]),
+            ('/api/hotels/?ordering=price_per_night', ['дорого', 1]),
+            ('/api/hotels/?sort_by=rating_desc', [{'a': 1}, 'Отель', 1]),
+            (f'/api/hotels/{hotel.id}/reviews/?pagination=cursor', ['вчера', 1]),
+            (f'/api/hotels/{hotel.id}/reviews/?pagination=cursor', ['2030-13-45T00:00:00', 1]),
+        ]:
+            response = self.client.get(f'{path}&cursor={cursor(*values)}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, (path, values))
+
+        # значения приводятся к типу поля: цена строкой и id числом в строке - допустимый курсор
+        response = self.client.get(f"/api/hotels/?ordering=price_per_night&cursor={cursor('105.00', '3')}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(row['price_per_night'] >= '105.00' for row in response.data['results']))
+
+
+# Тесты полнотекстового поиска
+class HotelSearchTest(APITestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name="Чехия")
+        self.prague = City.objects.create(name="Прага", country=self.country)
+        self.brno = City.objects.create(name="Брно", country=self.country)
+        self.museum_hotel = Hotel.objects.create(
+            name="Музейный отель",
+            description="Рядом с музеями и галереями",
+            country=self.country, city=self.brno, stars=4,
+            address="Адрес", price_per_night=120.00
+        )
+        self.quiet_hotel = Hotel.objects.create(
+            name="Тихий двор",
+            description="Спокойный отель, в 5 минутах от музея. Quiet rooms with gardens",
+            country=self.country, city=self.prague, stars=3,
+            address="Адрес", price_per_night=80.00
+        )
+
+    def _ids(self, query):
+        response = self.client.get(f'/api/hotels/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [hotel['id'] for hotel in response.data['results']]
+
+    def test_search_uses_stemming_and_city(self):
+        """поиск находит словоформы (русский и английский) и название города"""
+        self.assertCountEqual(
+            self._ids('search=отели'),
+            [self.museum_hotel.id, self.quiet_hotel.id]
+        )
+        self.assertEqual(self._ids('search=garden'), [self.quiet_hotel.id])
+        self.assertEqual(self._ids('search=Праге'), [self.quiet_hotel.id])
+
+    def test_relevance_sort_and_filters(self):
+        """совпадение в названии важнее совпадения в описании, фильтры работают вместе с поиском"""
+        self.assertEqual(
+            self._ids('search=отели&sort_by=relevance'),
+            [self.museum_hotel.id, self.quiet_hotel.id]
+        )
+        self.assertEqual(self._ids('search=отели&stars=3'), [self.quiet_hotel.id])
+
+    def test_headline(self):
+        response = self.client.get('/api/hotels/?search=галерея')
+        self.assertIn('<mark>галереями</mark>', response.data['results'][0]['search_headline'])
+
+        response = self.client.get('/api/hotels/')
+        self.assertIsNone(response.data['results'][0]['search_headline'])
+
+    def test_city_rename_updates_vector(self):
+        self.brno.name = "Оломоуц"
+        self.brno.save()
+        self.assertEqual(self._ids('search=Оломоуц'), [self.museum_hotel.id])
+
+
+# Тесты автодополнения
+class AutocompleteTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.country = Country.objects.create(name="Нидерланды")
+        self.city = City.objects.create(name="Амстердам", country=self.country)
+        self.hotel = Hotel.objects.create(
+            name="Amsterdam Canal House",
+            description="Описание",
+            country=self.country, city=self.city, stars=4,
+            address="Адрес", price_per_night=150.00
+        )
+
+    def test_prefix_and_types(self):
+        response = self.client.get('/api/autocomplete/?q=амс')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.city.id, 'name': "Амстердам", 'type': 'city'},
+        ])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        response = self.client.get('/api/autocomplete/?q=Нидер')
+        self.assertEqual(response.data[0]['type'], 'country')
+
+    def test_typo_tolerance_and_ranking(self):
+        """опечатка находит город, префиксные совпадения идут первыми"""
+        response = self.client.get('/api/autocomplete/?q=амстердм')
+        self.assertEqual(response.data[0]['id'], self.city.id)
+
+        Hotel.objects.create(
+            name="Grand Amsterdam", description="-", country=self.country,
+            city=self.city, stars=5, address="-", price_per_night=300.00
+        )
+        response = self.client.get('/api/autocomplete/?q=amsterdam')
+        self.assertEqual(
+            [item['name'] for item in response.data],
+            ["Amsterdam Canal House", "Grand Amsterdam"]
+        )
+
+    def test_short_query(self):
+        response = self.client.get('/api/autocomplete/?q=а')
+        self.assertEqual(response.data, [])
+
+
+# Тесты загрузки номеров и защиты от овербукинга
+class RoomInventoryTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='guest', password='testpass123')
+        self.country = Country.objects.create(name="Австрия")
+        self.city = City.objects.create(name="Вена", country=self.country)
+        self.hotel = Hotel.objects.create(
+            name="Венский отель", description="-", country=self.country,
+            city=self.city, stars=4, address="-", price_per_night=100.00
+        )
+        self.double = RoomType.objects.create(hotel=self.hotel, name="Двухместный", capacity=2, quantity=1)
+        self.family = RoomType.objects.create(hotel=self.hotel, name="Семейный", capacity=4, quantity=1)
+        self.client.force_authenticate(user=self.user)
+        self.check_in = date.today() + timedelta(days=10)
+
+    def _book(self, nights=2, guests=2, **extra):
+        return self.client.post('/api/bookings/', {
+            'hotel': self.hotel.id,
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=nights)).isoformat(),
+            'guests': guests,
+            **extra
+        }, format='json')
+
+    def test_no_overbooking(self):
+        """после исчерпания номеров бронь отклоняется, подбирается следующая категория"""
+        first = self._book()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data['room_type'], self.double.id)
+
+        second = self._book()
+        self.assertEqual(second.data['room_type'], self.family.id)
+
+        third = self._book(nights=1)
+        self.assertEqual(third.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Нет свободных номеров', str(third.data))
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_capacity_and_room_type_checks(self):
+        response = self._book(guests=3, room_type=self.double.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._book(guests=3)
+        self.assertEqual(response.data['room_type'], self.family.id)
+
+    def test_any_delete_releases_nights_once(self):
+        """ночи возвращаются при удалении брони из API, админки и вместе с пользователем"""
+        self.double.quantity = 4
+        self.double.save()
+        ids = [self._book(room_type=self.double.id).data['id'] for _ in range(4)]
+
+        def booked():
+            return list(RoomNight.objects.filter(room_type=self.double).values_list('booked', flat=True))
+
+        self.client.delete(f'/api/bookings/{ids[0]}/')
+        self.assertEqual(booked(), [3, 3])
+
+        admin = User.objects.create_superuser(username='admin', password='x', email='admin@example.com')
+        self.client.force_login(admin)
+        response = self.client.post('/admin/hotels/booking/', {
+            'action': 'delete_selected', '_selected_action': [ids[1]], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(booked(), [2, 2])
+
+        self.client.logout()
+        self.client.force_authenticate(self.user)
+        response = self.client.delete('/api/auth/delete-account/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(booked(), [0, 0])
+
+    def test_update_moves_nights(self):
+        """изменение дат возвращает прежние ночи и занимает новые; без мест - ничего не меняется"""
+        def patch(booking_id, data):
+            self.client.force_authenticate(self.user)
+            return self.client.patch(f'/api/bookings/{booking_id}/', data, format='json')
+
+        def booked():
+            return dict(RoomNight.objects.filter(room_type=self.double).values_list('date', 'booked'))
+
+        booking = self._book(room_type=self.double.id).data
+        later = self.check_in + timedelta(days=1)
+        response = patch(booking['id'], {'check_in': later.isoformat(), 'check_out': (later + timedelta(days=2)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['room_type'], self.double.id)
+        self.assertEqual(booked(), {self.check_in: 0, later: 1, later + timedelta(days=1): 1})
+        self.assertEqual(Booking.objects.get(pk=booking['id']).total_price, 200)
+
+        response = patch(booking['id'], {'check_out': later.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # другая бронь занимает первую ночь - перенос на нее откатывается целиком
+        other = self._book(nights=1, room_type=self.double.id)
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        response = patch(booking['id'], {'check_in': self.check_in.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(booked(), {self.check_in: 1, later: 1, later + timedelta(days=1): 1})
+        self.assertEqual(Booking.objects.get(pk=booking['id']).check_in, later)
+
+        # чужую бронь изменить нельзя, в том числе через ?user=
+        stranger = User.objects.create_user(username='stranger', password='x')
+        self.client.force_authenticate(stranger)
+        response = self.client.patch(
+            f"/api/bookings/{booking['id']}/?user={self.user.username}", {'guests': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_releases_nights(self):
+        booking = self._book(room_type=self.double.id)
+        self.assertEqual(self._book(room_type=self.double.id).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.delete(f"/api/bookings/{booking.data['id']}/")
+        self.assertEqual(
+            list(RoomNight.objects.filter(room_type=self.double).values_list('booked', flat=True)),
+            [0, 0]
+        )
+        self.assertEqual(self._book(room_type=self.double.id).status_code, status.HTTP_201_CREATED)
+
+
+# Параллельные брони: настоящие транзакции в отдельных соединениях
+class ConcurrentBookingTest(TransactionTestCase):
+    attempts = 200
+    workers = 20
+
+    def setUp(self):
+        self.country = Country.objects.create(name="Италия")
+        self.hotel = Hotel.objects.create(
+            name="Отель", description="-", country=self.country,
+            stars=3, address="-", price_per_night=50.00
+        )
+        self.room_type = RoomType.objects.create(hotel=self.hotel, name="Стандарт", capacity=2, quantity=5)
+        self.other_room_type = RoomType.objects.create(hotel=self.hotel, name="Люкс", capacity=2, quantity=100)
+        self.check_in = date.today() + timedelta(days=30)
+
+    def _attempt(self, room_type, offset):
+        try:
+            check_in = self.check_in + timedelta(days=offset)
+            return room_type.reserve(check_in, check_in + timedelta(days=2))
+        finally:
+            connection.close()
+
+    def test_parallel_attempts_on_same_night(self):
+        """сотни параллельных попыток на одну ночь не приводят к овербукингу"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # каждая попытка пересекается с соседними по датам - проверяем и deadlock-и
+            results = list(pool.map(
+                lambda i: self._attempt(self.room_type, i % 3), range(self.attempts)
+            ))
+            others = list(pool.map(
+                lambda i: self._attempt(self.other_room_type, i % 3), range(self.attempts // 2)
+            ))
+
+        nights = RoomNight.objects.filter(room_type=self.room_type)
+        self.assertTrue(all(night.booked <= night.total for night in nights))
+        self.assertEqual(max(night.booked for night in nights), self.room_type.quantity)
+        self.assertLessEqual(sum(results), self.room_type.quantity * 2)
+        self.assertTrue(all(others))
+
+
+# Тесты фильтра доступности по датам
+class AvailabilityFilterTest(APITestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name="Венгрия")
+        self.city = City.objects.create(name="Будапешт", country=self.country)
+        self.small = Hotel.objects.create(
+            name="Маленький", description="-", country=self.country,
+            city=self.city, stars=3, address="-", price_per_night=60.00
+        )
+        self.big = Hotel.objects.create(
+            name="Большой", description="-", country=self.country,
+            city=self.city, stars=4, address="-", price_per_night=90.00
+        )
+        self.unmanaged = Hotel.objects.create(
+            name="Без категорий", description="-", country=self.country,
+            city=self.city, stars=2, address="-", price_per_night=40.00
+        )
+        self.single = RoomType.objects.create(hotel=self.small, name="Одноместный", capacity=1, quantity=1)
+        self.suite = RoomType.objects.create(hotel=self.big, name="Люкс", capacity=4, quantity=2)
+        self.check_in = date.today() + timedelta(days=5)
+
+    def _ids(self, nights=3, guests=1, offset=0):
+        check_in = self.check_in + timedelta(days=offset)
+        response = self.client.get('/api/hotels/', {
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=nights)).isoformat(),
+            'guests': guests,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {hotel['id'] for hotel in response.data['results']}
+
+    def test_sold_out_night_hides_hotel(self):
+        everyone = {self.small.id, self.big.id, self.unmanaged.id}
+        self.assertEqual(self._ids(), everyone)
+
+        # распродаем вторую ночь маленького отеля
+        night = self.check_in + timedelta(days=1)
+        self.assertTrue(self.single.reserve(night, night + timedelta(days=1)))
+        self.assertEqual(self._ids(), {self.big.id, self.unmanaged.id})
+        # диапазон без распроданной ночи
+        self.assertEqual(self._ids(nights=1), everyone)
+        self.assertEqual(self._ids(offset=2), everyone)
+
+    def test_guests_capacity(self):
+        self.assertEqual(self._ids(guests=3), {self.big.id, self.unmanaged.id})
+
+    def test_invalid_range(self):
+        response = self.client.get('/api/hotels/', {
+            'check_in': self.check_in.isoformat(),
+            'check_out': self.check_in.isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# Тесты кеша ответов
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.country = Country.objects.create(name="Португалия")
+        self.city = City.objects.create(name="Лиссабон", country=self.country)
+        self.hotel = Hotel.objects.create(
+            name="Лиссабонский отель", description="-", country=self.country,
+            city=self.city, stars=4, address="-", price_per_night=100.00
+        )
+
+    def test_hit_skips_database_and_params_are_normalized(self):
+        self.client.get('/api/hotels/?stars=4&ordering=stars')
+        # только время изменения из базы (get_modified_querysets)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/hotels/?ordering=stars&stars=4&search=')
+        self.assertEqual(response.data['results'][0]['name'], "Лиссабонский отель")
+
+    def test_signals_invalidate(self):
+        self.client.get('/api/hotels/')
+        self.client.get('/api/cities/')
+
+        self.hotel.name = "Новое имя"
+        self.hotel.save()
+        self.assertEqual(self.client.get('/api/hotels/').data['results'][0]['name'], "Новое имя")
+
+        self.country.name = "Португальская Республика"
+        self.country.save()
+        self.assertEqual(
+            self.client.get('/api/cities/').data[0]['country_name'],
+            "Португальская Республика"
+        )
+
+    def test_stale_while_revalidate(self):
+        """пока один запрос пересчитывает ответ, остальные получают устаревшую копию"""
+        from django.core.cache import cache
+        from .cache import build_key
+
+        self.client.get('/api/countries/')
+        Country.objects.create(name="Андорра")
+        key = build_key('CountryListView', {}, extra='testserver')
+        cache.add(f'{key}:lock', 1)
+
+        with self.assertNumQueries(1):
+            stale = self.client.get('/api/countries/')
+        self.assertEqual(len(stale.data), 1)
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(len(self.client.get('/api/countries/').data), 2)
+
+    def test_stale_copy_keeps_its_validators(self):
+        """устаревшая копия отдается с ETag, с которым ее закешировали, - не с новым"""
+        from django.core.cache import cache
+        from .cache import build_key
+
+        first = self.client.get('/api/countries/')
+        Country.objects.create(name="Андорра")
+        key = build_key('CountryListView', {}, extra='testserver')
+        cache.add(f'{key}:lock', 1)
+
+        stale = self.client.get('/api/countries/')
+        self.assertEqual(len(stale.data), 1)
+        self.assertEqual(stale['ETag'], first['ETag'])
+        self.assertEqual(stale['Last-Modified'], first['Last-Modified'])
+        # копия с новым ETag не сохранилась: после пересчета клиент получает новое тело
+        cache.delete(f'{key}:lock')
+        fresh = self.client.get('/api/countries/', HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(fresh.data), 2)
+        self.assertNotEqual(fresh['ETag'], first['ETag'])
+
+    def test_single_flight(self):
+        from .cache import get_or_compute
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda _: get_or_compute('single-flight', ['hotel'], compute, 60, 60)[0], range(8)
+            ))
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_surrogate_purge_is_sent_by_job(self):
+        """запись не ждет CDN: PURGE отправляет фоновая задача"""
+        from django.test import override_settings
+        from jobs.models import Job
+        from jobs.queue import run_pending
+
+        with override_settings(SURROGATE_PURGE_URL='http://cdn.invalid/purge'), \
+                mock.patch('urllib.request.urlopen') as urlopen:
+            self.country.name = "Португальская Республика"
+            self.country.save()
+            urlopen.assert_not_called()
+            job = Job.objects.get(task='hotels.tasks.purge_surrogate_keys')
+            self.assertEqual(job.args, [['country-list', 'city-list', 'hotels', 'hotel-details']])
+            self.assertEqual(run_pending(), 1)
+
+        request = urlopen.call_args.args[0]
+        self.assertEqual(request.get_method(), 'PURGE')
+        self.assertEqual(request.get_header('Surrogate-key'), 'country-list city-list hotels hotel-details')
+
+    def test_cold_wait_timeout_keeps_owner_lock(self):
+        """не дождавшийся владельца запрос считает сам, но его блокировку не снимает"""
+        from asgiref.sync import async_to_sync
+        from django.core.cache import cache
+        from .cache import aget_or_compute, get_or_compute
+
+        async def acompute():
+            return 'value'
+
+        cache.add('cold:lock', 1)
+        with mock.patch('hotels.cache.COLD_WAIT', 0.1):
+            self.assertEqual(get_or_compute('cold', ['hotel'], lambda: 'value', 60, 60)[0], 'value')
+            self.assertTrue(cache.get('cold:lock'))
+            cache.delete('cold')
+            self.assertEqual(async_to_sync(aget_or_compute)('cold', ['hotel'], acompute, 60, 60)[0], 'value')
+            self.assertTrue(cache.get('cold:lock'))
+
+        # блокировка владельца истекла без записи - ожидающий берет ее и снимает после пересчета
+        cache.delete_many(['cold', 'cold:lock'])
+        cache.add('cold:lock', 1, 0.2)
+        get_or_compute('cold', ['hotel'], lambda: 'value', 60, 60)
+        self.assertIsNone(cache.get('cold:lock'))
+
+
+# Тесты условных запросов (ETag / Last-Modified)
+class ConditionalRequestTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.country = Country.objects.create(name="Бельгия")
+        self.city = City.objects.create(name="Брюгге", country=self.country)
+        self.hotel = Hotel.objects.create(
+            name="Брюггский отель", description="-", country=self.country,
+            city=self.city, stars=4, address="-", price_per_night=110.00
+        )
+        self.other = Hotel.objects.create(
+            name="Другой отель", description="-", country=self.country,
+            city=self.city, stars=3, address="-", price_per_night=70.00
+        )
+        self.url = f'/api/hotels/{self.hotel.id}/'
+
+    def test_detail_not_modified_with_one_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(f'hotel-{self.hotel.id}', response['Surrogate-Key'])
+        self.assertIn('Last-Modified', response)
+
+        # max(updated_at) отеля, фото, номеров и справочников - один запрос
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_etag_changes_only_for_affected_hotel(self):
+        etag = self.client.get(self.url)['ETag']
+        other_etag = self.client.get(f'/api/hotels/{self.other.id}/')['ETag']
+
+        user = User.objects.create_user(username='critic', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.client.post('/api/reviews/', {'hotel': self.hotel.id, 'rating': 5, 'comment': '!'}, format='json')
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['review_count'], 1)
+        response = self.client.get(f'/api/hotels/{self.other.id}/', HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_hotel_save_keeps_other_hotels_valid(self):
+        etag = self.client.get(self.url)['ETag']
+        other_url = f'/api/hotels/{self.other.id}/'
+        other_etag = self.client.get(other_url)['ETag']
+
+        self.hotel.name = "Переименованный отель"
+        self.hotel.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], "Переименованный отель")
+        response = self.client.get(other_url, HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_change_unknown_to_cache_changes_validators(self):
+        """Правка из другого процесса (версии в кеше не менялись) видна по updated_at"""
+        from django.db.models.functions import Now
+        response = self.client.get(self.url)
+        listing = self.client.get('/api/hotels/')
+        Hotel.objects.filter(pk=self.hotel.pk).update(name="Переименован", updated_at=Now())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], "Переименован")
+        response = self.client.get('/api/hotels/', HTTP_IF_NONE_MATCH=listing['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Переименован", [hotel['name'] for hotel in response.data['results']])
+
+    def test_list_etag_depends_on_params(self):
+        first = self.client.get('/api/hotels/?stars=4')
+        second = self.client.get('/api/hotels/?stars=3')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(
+            self.client.get('/api/hotels/?stars=4', HTTP_IF_NONE_MATCH=first['ETag']).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(
+            self.client.get('/api/cities/').status_code,
+            status.HTTP_200_OK
+        )
+
+
+# Тесты отзывов отеля и ограниченной детальной страницы
+class HotelReviewsTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import Review
+        cache.clear()
+        self.country = Country.objects.create(name="Хорватия")
+        self.hotel = Hotel.objects.create(
+            name="Сплит", description="-", country=self.country,
+            stars=4, address="-", price_per_night=100.00
+        )
+        users = User.objects.bulk_create([
+            User(username=f'reviewer{i}', first_name=f'Имя{i}') for i in range(25)
+        ])
+        Review.objects.bulk_create([
+            Review(hotel=self.hotel, user=user, rating=i % 5 + 1, comment=f'Отзыв {i}')
+            for i, user in enumerate(users)
+        ])
+
+    def test_cursor_pages_and_rating_filter(self):
+        ids, url = [], f'/api/hotels/{self.hotel.id}/reviews/'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 10)
+            ids.extend(review['id'] for review in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+        response = self.client.get(f'/api/hotels/{self.hotel.id}/reviews/?rating=5')
+        self.assertEqual({review['rating'] for review in response.data['results']}, {5})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_detail_embeds_latest_reviews_with_fixed_query_count(self):
+        # валидаторы, отель + страна/город, фото, категории номеров, последние отзывы с авторами
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/hotels/{self.hotel.id}/')
+        self.assertEqual(len(response.data['reviews']), 5)
+        self.assertTrue(response.data['reviews'][0]['user_first_name'].startswith('Имя'))
+
+
+class CoverImageTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import HotelImage
+        cache.clear()
+        self.country = Country.objects.create(name="Португалия")
+        self.hotels = [
+            Hotel.objects.create(
+                name=f"Порту {i}", description="-", country=self.country,
+                stars=4, address="-", price_per_night=100 + i
+            )
+            for i in range(5)
+        ]
+        for hotel in self.hotels:
+            HotelImage.objects.create(hotel=hotel, image=f'hotel_images/{hotel.id}-b.jpg', position=1)
+            HotelImage.objects.create(hotel=hotel, image=f'hotel_images/{hotel.id}-a.jpg', position=0)
+
+    def test_cover_follows_image_position(self):
+        from .models import HotelImage
+        hotel = self.hotels[0]
+        hotel.refresh_from_db()
+        self.assertTrue(hotel.cover_image.image.name.endswith('-a.jpg'))
+
+        hotel.cover_image.delete()
+        hotel.refresh_from_db()
+        self.assertTrue(hotel.cover_image.image.name.endswith('-b.jpg'))
+
+        HotelImage.objects.filter(hotel=hotel).delete()
+        hotel.refresh_from_db()
+        self.assertIsNone(hotel.cover_image)
+
+    def test_list_and_favorites_do_not_query_images_per_hotel(self):
+        from .models import Favorite
+        # валидаторы, COUNT + страница отелей (страна, город и обложка через JOIN)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/hotels/')
+        self.assertTrue(all(
+            hotel['main_image'].endswith('-a.jpg') for hotel in response.data['results']
+        ))
+
+        user = User.objects.create_user(username='traveller', password='testpass123')
+        Favorite.objects.bulk_create([Favorite(user=user, hotel=hotel) for hotel in self.hotels])
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/favorites/')
+        self.assertEqual(len(response.data), 5)
+        self.assertTrue(all(item['hotel_image'].endswith('-a.jpg') for item in response.data))
+
+    def test_personal_lists_join_only_serialized_relations(self):
+        from django.test.utils import CaptureQueriesContext
+        from .models import Review
+        user = User.objects.create_user(username='writer', password='testpass123')
+        Review.objects.create(hotel=self.hotels[0], user=user, rating=4, comment='-')
+        Booking.objects.create(
+            hotel=self.hotels[0], user=user, check_in=date(2030, 1, 1), check_out=date(2030, 1, 2), total_price=100,
+        )
+        self.client.force_authenticate(user)
+        for url, joined in (('/api/reviews/', {'auth_user'}), ('/api/bookings/', {'auth_user', 'hotels_hotel'})):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            sql = context[-1]['sql']
+            for table in ('hotels_city', 'hotels_country', 'hotels_hotelimage'):
+                self.assertNotIn(table, sql, url)
+            for table in joined:
+                self.assertIn(f'JOIN "{table}"', sql, url)
+
+
+# Быстрый путь карточек: values() + HotelCardSerializer + orjson
+class HotelCardTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import HotelImage
+        cache.clear()
+        country = Country.objects.create(name="Норвегия")
+        city = City.objects.create(name="Берген", country=country)
+        self.hotels = [
+            Hotel.objects.create(
+                name=f"Фьорд {i}", description="Вид на фьорд\u2028и горы", country=country,
+                city=city if i % 2 else None, stars=3 + i % 3, address="-",
+                price_per_night=f'{99 + i}.5', rating_avg=4.5 - i / 3, rating_count=i,
+            )
+            for i in range(12)
+        ]
+        variants = {'webp': {'320': 'hotel_images/variants/a-320.webp'}, 'jpeg': {}, 'placeholder': 'data:,'}
+        for hotel in self.hotels[:6]:
+            HotelImage.objects.create(hotel=hotel, image=f'hotel_images/{hotel.id}.jpg', variants=variants)
+
+    def reference(self, queryset):
+        from rest_framework.renderers import JSONRenderer
+        from .api.serializers import HotelListSerializer
+        return JSONRenderer().render(HotelListSerializer(queryset.select_related('country', 'city', 'cover_image'), many=True).data)
+
+    def test_cards_match_model_serializer_bytes(self):
+        from django.contrib.postgres.search import SearchHeadline
+        from .api.renderers import FastJSONRenderer
+        from .api.serializers import HotelCardSerializer
+        from .search import build_search_query
+        queryset = Hotel.objects.annotate(
+            search_headline=SearchHeadline('description', build_search_query('фьорд'))
+        ).order_by('-rating_avg', 'name', 'id')
+        rows = list(HotelCardSerializer.project(queryset))
+        self.assertIn('search_headline', rows[0])
+        self.assertEqual(
+            FastJSONRenderer().render(HotelCardSerializer(rows, many=True).data), self.reference(queryset)
+        )
+
+    def test_list_endpoint_uses_cards(self):
+        for query in ('', 'page=2', 'sort_by=rating_desc', 'pagination=cursor&ordering=-price_per_night'):
+            response = self.client.get(f'/api/hotels/?{query}')
+            self.assertEqual(response.status_code, 200)
+            ids = [hotel['id'] for hotel in response.json()['results']]
+            queryset = Hotel.objects.filter(id__in=ids)
+            expected = {hotel['id']: hotel for hotel in json.loads(self.reference(queryset))}
+            self.assertEqual(response.json()['results'], [expected[pk] for pk in ids])
+        # курсор keyset строится по строкам values()
+        next_page = self.client.get(response.json()['next'])
+        self.assertEqual(len(next_page.json()['results']), 3)
+
+    def test_renderer_matches_stock_renderer(self):
+        from datetime import datetime, timezone as tz
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .api.renderers import FastJSONRenderer
+        for data in (
+            {'text': 'a\u2028b\u2029 é "q"\n', 'rating': 4.35, 'small': 1e-7, 'large': 1e16},
+            {'when': datetime(2030, 1, 5, 12, 0, 1, 123456, tzinfo=tz.utc), 'price': Decimal('10.50'), 5: [None, True]},
+            {'big': 2 ** 70},
+        ):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({'a': 1}, 'application/json; indent=2', {}), b'{\n  "a": 1\n}')
+
+    def test_renderer_fast_path_and_out_of_range_floats(self):
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .api.renderers import FastJSONRenderer
+        # текст, похожий на экспоненту, и обычные числа - без стандартного рендерера
+        data = {'text': 'e-mail, e1, e-2', 'items': [{'rating': 4.35, 'price': Decimal('1e3')}], 'zero': 0.0}
+        with mock.patch.object(JSONRenderer, 'render', side_effect=AssertionError('stock renderer')):
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                b'{"text":"e-mail, e1, e-2","items":[{"rating":4.35,"price":1000.0}],"zero":0.0}'
+            )
+        # числа, которые orjson пишет иначе, - байты стандартного рендерера
+        for data in ({'items': [{'tiny': 5e-5}, (1, 2e20)]}, [-0.00001234, 1.5e-7], {'price': Decimal('1e16')}):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Decimal NaN / Infinity: ValueError, как у строгого JSONRenderer, а не null
+        for value in (Decimal('NaN'), Decimal('-Infinity')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'rating': [value]})
+
+
+# ?fields= / ?omit=: урезанный ответ и проекция SQL
+class SparseFieldsTest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import Favorite, HotelImage, Review
+        cache.clear()
+        self.user = User.objects.create_user(username='sparse', password='testpass123')
+        country = Country.objects.create(name="Греция")
+        city = City.objects.create(name="Афины", country=country)
+        self.hotels = [
+            Hotel.objects.create(
+                name=f"Акрополь {i}", description="Длинное описание", country=country, city=city,
+                stars=4, address="Адрес", price_per_night=90 + i,
+            )
+            for i in range(4)
+        ]
+        for hotel in self.hotels:
+            HotelImage.objects.create(hotel=hotel, image=f'hotel_images/{hotel.pk}.jpg')
+            Review.objects.create(hotel=hotel, user=self.user, rating=5, comment="Отлично")
+            Hotel.apply_review_rating(hotel.pk, 5, 1)
+            Booking.objects.create(
+                hotel=hotel, user=self.user, check_in=date(2030, 1, 1), check_out=date(2030, 1, 3), total_price=200,
+            )
+            Favorite.objects.create(hotel=hotel, user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, queries):
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(context), queries, [query['sql'] for query in context])
+        # запрос валидаторов (max updated_at) к проекции не относится
+        sql = [query['sql'] for query in context if not query['sql'].startswith('SELECT (SELECT')]
+        return response.json(), ' '.join(sql)
+
+    def test_hotel_list_projects_values(self):
+        data, sql = self.get('/api/hotels/?fields=id,name', queries=3)
+        self.assertEqual(list(data['results'][0]), ['id', 'name'])
+        self.assertNotIn('JOIN', sql)
+
+        data, sql = self.get('/api/hotels/?omit=country_name,main_image,main_image_srcset&pagination=cursor', queries=2)
+        self.assertNotIn('main_image', data['results'][0])
+        self.assertIn('city_name', data['results'][0])
+        self.assertNotIn('hotels_country', sql)
+        self.assertNotIn('hotels_hotelimage', sql)
+
+    def test_hotel_detail_prunes_prefetches(self):
+        pk = self.hotels[0].pk
+        data, sql = self.get(f'/api/hotels/{pk}/?omit=images,room_types,reviews,description', queries=2)
+        self.assertNotIn('images', data)
+        self.assertEqual(data['average_rating'], 5.0)
+        self.assertEqual(data['rating_histogram']['5'], 1)
+        self.assertNotIn('"description"', sql)
+
+        data, _ = self.get(f'/api/hotels/{pk}/?fields=id,reviews', queries=3)
+        self.assertEqual(list(data), ['id', 'reviews'])
+        self.assertEqual(data['reviews'][0]['user_name'], 'sparse')
+
+    def test_personal_endpoints(self):
+        data, sql = self.get('/api/bookings/?fields=id,hotel_name', queries=1)
+        self.assertEqual(list(data[0]), ['id', 'hotel_name'])
+        self.assertNotIn('hotels_city', sql)
+        self.assertNotIn('"description"', sql)
+
+        data, sql = self.get('/api/favorites/?fields=hotel_name,hotel_image', queries=1)
+        self.assertTrue(data[0]['hotel_image'].endswith('.jpg'))
+        self.assertNotIn('auth_user', sql)
+
+        data, sql = self.get('/api/reviews/?omit=user_name,user_first_name,comment&user=sparse', queries=1)
+        self.assertEqual(set(data[0]), {'id', 'hotel', 'user', 'rating', 'created_at'})
+        self.assertNotIn('"comment"', sql)
+
+        # курсор строится по полю сортировки из проекции, без запросов на строку
+        data, _ = self.get(f'/api/hotels/{self.hotels[0].pk}/reviews/?fields=id', queries=2)
+        self.assertEqual(list(data['results'][0]), ['id'])
+
+    def test_unknown_field_and_unsafe_methods(self):
+        response = self.client.get('/api/bookings/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+        # ?fields= не влияет на запись
+        from .models import Favorite
+        Favorite.objects.filter(hotel=self.hotels[0]).delete()
+        response = self.client.post('/api/favorites/?fields=id', {'hotel': self.hotels[0].pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('hotel_name', response.json())
+
+
+class ImageVariantsTest(APITestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.test import override_settings
+        from PIL import Image
+        from .models import HotelImage
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.country = Country.objects.create(name="Исландия")
+        self.hotel = Hotel.objects.create(
+            name="Рейкьявик", description="-", country=self.country,
+            stars=4, address="-", price_per_night=300.00
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (30, 120, 200)).save(buffer, 'JPEG')
+        self.image = HotelImage(hotel=self.hotel)
+        self.image.image.save('lagoon.jpg', ContentFile(buffer.getvalue()))
+
+    def test_upload_enqueues_background_job(self):
+        from jobs.models import Job
+        from jobs.queue import run_pending
+        # генерация поставлена в очередь, а не выполнена в запросе
+        job = Job.objects.get(task='hotels.tasks.build_image_variants')
+        self.assertEqual(job.args, [self.image.pk])
+        self.assertEqual(self.image.variants, {})
+
+        self.assertEqual(run_pending(), 1)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.variants['source'], self.image.image.name)
+
+    def test_backfill_builds_variants_and_srcset(self):
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        call_command('build_image_variants', '--workers', '0', stdout=StringIO())
+        self.image.refresh_from_db()
+        variants = self.image.variants
+        self.assertEqual(variants['source'], self.image.image.name)
+        self.assertEqual(sorted(variants['webp']), ['1024', '320', '640'])
+        self.assertEqual((variants['width'], variants['height']), (1024, 683))
+        self.assertTrue(variants['placeholder'].startswith('data:image/jpeg;base64,'))
+        self.assertTrue(all(default_storage.exists(name) for name in variants['jpeg'].values()))
+
+        response = self.client.get('/api/hotels/')
+        srcset = response.data['results'][0]['main_image_srcset']
+        self.assertRegex(srcset['webp'], r'^/media/hotel_images/variants/lagoon-[0-9a-f]{10}-320\.webp 320w')
+        self.assertTrue(srcset['jpeg'].endswith('1024w'))
+
+    def test_variant_names_do_not_collide(self):
+        from .images import variant_name
+        names = {
+            variant_name(source, 320, 'webp')
+            for source in ('hotel_images/a.jpg', 'hotel_images/a.png', 'hotel_images/old/a.jpg')
+        }
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(name.startswith('hotel_images/variants/a-') for name in names))
+
+    def test_backfill_reuses_one_pool(self):
+        from unittest import mock
+        from concurrent.futures import ThreadPoolExecutor
+        from django.core.management import call_command
+        from .models import HotelImage
+        HotelImage.objects.create(hotel=self.hotel, image=self.image.image.name)
+        # пул потоков вместо процессов: в тесте важно только число созданных пулов
+        with mock.patch(
+            'hotels.management.commands.build_image_variants.create_pool',
+            side_effect=lambda workers: ThreadPoolExecutor(workers),
+        ) as create_pool:
+            call_command('build_image_variants', '--workers', '2', '--batch-size', '1', stdout=StringIO())
+        create_pool.assert_called_once_with(2)
+        self.assertEqual(HotelImage.objects.filter(variants__has_key='placeholder').count(), 2)
+
+    def test_missing_variants_fall_back_to_original(self):
+        response = self.client.get('/api/hotels/')
+        hotel = response.data['results'][0]
+        self.assertIsNone(hotel['main_image_srcset'])
+        self.assertTrue(hotel['main_image'].endswith('.jpg'))
+
+
+class FastloadTest(APITestCase):
+    fixtures_to_load = ['countries.json', 'cities.json', 'hotels.json', 'hotel_images.json']
+
+    def snapshot(self):
+        from .models import HotelImage
+        # updated_at без значения в фикстуре - момент загрузки
+        return [
+            [
+                {key: value for key, value in row.items() if key != 'updated_at'}
+                for row in model.objects.order_by('pk').values()
+            ]
+            for model in (Country, City, Hotel, HotelImage)
+        ]
+
+    def test_matches_loaddata(self):
+        from django.core.management import call_command
+        from .models import HotelImage
+        out, err = StringIO(), StringIO()
+        # в обратном порядке: зависимости по FK разрешаются самой командой
+        call_command('fastload', *reversed(self.fixtures_to_load), workers=0, stdout=out, stderr=err)
+        self.assertEqual(out.getvalue(), 'Installed 208 object(s) from 4 fixture(s)\n')
+        self.assertIn('rows/s', err.getvalue())
+        fast = self.snapshot()
+        self.assertTrue(all(hotel['cover_image_id'] for hotel in fast[2]))
+
+        # последовательности сброшены
+        self.assertGreater(Country.objects.create(name="Новая").pk, max(c['id'] for c in fast[0]))
+        Country.objects.filter(name="Новая").delete()
+
+        # COPY не вызывает Hotel.save - векторы строит after_load
+        self.assertFalse(Hotel.objects.filter(search_vector__isnull=True).exists())
+        self.assertTrue(self.client.get('/api/hotels/?search=отель').data['results'])
+
+        for model in (HotelImage, Hotel, City, Country):
+            model.objects.all().delete()
+        out = StringIO()
+        call_command('loaddata', *[f'fixtures/{name}' for name in self.fixtures_to_load], stdout=out)
+        self.assertEqual(out.getvalue(), 'Installed 208 object(s) from 4 fixture(s)\n')
+        # loaddata (raw) векторы тоже не строит - их пересчитывает rebuild_search_index
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.snapshot(), fast)
+
+    def test_reviews_rebuild_rating_stats(self):
+        import os
+        import tempfile
+        from django.core.management import call_command
+        call_command('fastload', 'countries.json', 'cities.json', 'hotels.json', workers=0,
+                     stdout=StringIO(), stderr=StringIO())
+        hotel = Hotel.objects.order_by('pk').first()
+        users = [User.objects.create_user(username=f'fast{i}', password='x') for i in range(2)]
+        rows = [
+            {'model': 'hotels.review', 'pk': 900 + i,
+             'fields': {'hotel': hotel.pk, 'user': user.pk, 'rating': rating, 'comment': '-',
+                        'created_at': '2024-01-01T00:00:00Z'}}
+            for i, (user, rating) in enumerate(zip(users, (5, 2)))
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as file:
+            json.dump(rows, file)
+        self.addCleanup(os.remove, file.name)
+
+        call_command('fastload', file.name, workers=0, stdout=StringIO(), stderr=StringIO())
+        hotel.refresh_from_db()
+        self.assertEqual((hotel.rating_count, hotel.rating_avg), (2, 3.5))
+        self.assertEqual(hotel.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+    def test_bulk_method_and_streaming_parser(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from .management.commands import fastload
+        call_command(
+            'fastload', 'countries.json', 'cities.json',
+            method='bulk', workers=0, stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(City.objects.count(), 13)
+
+        with open('fixtures/cities.json', encoding='utf-8') as file:
+            original = file.read()
+        # объекты, разрезанные границей чтения, собираются корректно
+        with mock.patch.object(fastload, 'CHUNK_SIZE', 7):
+            self.assertEqual(len(list(fastload.iter_fixture(StringIO(original)))), 13)
+        with self.assertRaises(CommandError):
+            list(fastload.iter_fixture(StringIO(original[:-40])))
+
+
+class DumpCatalogTest(APITestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.management import call_command
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+        call_command(
+            'fastload', 'countries.json', 'cities.json', 'hotels.json', 'hotel_images.json',
+            workers=0, stdout=StringIO(), stderr=StringIO()
+        )
+
+    def dump(self, *args):
+        from django.core.management import call_command
+        call_command('dump_catalog', '--output', self.output, *args, stdout=StringIO())
+        with open(f'{self.output}/manifest.json', encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_sharded_gzip_dump_round_trips_through_fastload(self):
+        import glob
+        from django.core.management import call_command
+        from .models import HotelImage
+        manifest = self.dump('--gzip', '--shard-size', '50', '--chunk-size', '20')
+        self.assertEqual(manifest['models']['hotels.hotelimage']['rows'], 142)
+        self.assertEqual(len(manifest['models']['hotels.hotelimage']['files']), 3)
+        self.assertEqual(manifest['models']['hotels.country']['files'], ['hotels.country-0001.jsonl.gz'])
+
+        models = (Country, City, Hotel, HotelImage)
+        before = [list(model.objects.order_by('pk').values()) for model in models]
+        for model in reversed(models):
+            model.objects.all().delete()
+        out = StringIO()
+        call_command(
+            'fastload', *sorted(glob.glob(f'{self.output}/*.jsonl.gz')),
+            workers=0, stdout=out, stderr=StringIO()
+        )
+        self.assertEqual(out.getvalue(), 'Installed 208 object(s) from 6 fixture(s)\n')
+        self.assertEqual([list(model.objects.order_by('pk').values()) for model in models], before)
+
+    def test_incremental_dump_contains_only_changed_rows(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        since = (timezone.now() + timedelta(minutes=10)).isoformat()
+        Hotel.objects.filter(pk=1).update(updated_at=timezone.now() + timedelta(hours=1))
+        manifest = self.dump('--since', since)
+        self.assertEqual(manifest['models']['hotels.hotel']['rows'], 1)
+        self.assertEqual(manifest['models']['hotels.city']['rows'], 0)
+
+        # инкремент накатывается loaddata поверх существующих строк
+        Hotel.objects.filter(pk=1).update(name='Изменено')
+        call_command('loaddata', f'{self.output}/hotels.hotel.jsonl', stdout=StringIO())
+        self.assertNotEqual(Hotel.objects.get(pk=1).name, 'Изменено')
+
+
+
+class SeedScaleTest(APITestCase):
+    options = {
+        'hotels': 30, 'cities': 6, 'countries': 2, 'users': 25,
+        'reviews': 200, 'bookings': 40, 'favorites': 30, 'seed': 7,
+    }
+
+    def seed(self, **extra):
+        from django.core.management import call_command
+        call_command('seed_scale', **{**self.options, **extra}, stdout=StringIO())
+
+    def snapshot(self, prefix):
+        from .models import Review
+        reviews = Review.objects.filter(user__username__startswith=f'{prefix}-').order_by('pk')
+        return (
+            list(Hotel.objects.filter(pk__in=reviews.values('hotel_id')).order_by('pk').values_list(
+                'name', 'city__name', 'stars', 'price_per_night', 'rating_count', 'rating_avg'
+            )),
+            [
+                (hotel, username.removeprefix(f'{prefix}-'), rating, created_at)
+                for hotel, username, rating, created_at
+                in reviews.values_list('hotel__name', 'user__username', 'rating', 'created_at')
+            ],
+        )
+
+    def test_generates_consistent_reproducible_data(self):
+        from django.db.models import Count, F
+        from .models import Favorite, Review
+        self.seed()
+        self.assertEqual(Hotel.objects.count(), 30)
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 25)
+        self.assertEqual(Review.objects.count(), 200)
+        self.assertEqual(Booking.objects.count(), 40)
+        self.assertEqual(Favorite.objects.count(), 30)
+
+        # денормализованная статистика и поисковый вектор заполнены
+        for hotel in Hotel.objects.annotate(reviews_total=Count('reviews')):
+            self.assertEqual(hotel.rating_count, hotel.reviews_total)
+        self.assertFalse(Hotel.objects.filter(search_vector__isnull=True).exists())
+        self.assertFalse(Hotel.objects.exclude(country=F('city__country')).exists())
+        for booking in Booking.objects.select_related('hotel', 'room_type'):
+            self.assertEqual(booking.room_type.hotel_id, booking.hotel_id)
+            self.assertLessEqual(booking.guests, booking.room_type.capacity)
+            self.assertEqual(booking.total_price, booking.calculate_total_price())
+
+        # индексы и ограничения восстановлены после загрузки
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Review._meta.db_table)
+        self.assertIn('review_hotel_recent_idx', constraints)
+        self.assertTrue(any(
+            item['unique'] and item['columns'] == ['hotel_id', 'user_id'] for item in constraints.values()
+        ))
+
+        # тот же seed - те же данные (поверх существующих, без снятия индексов)
+        self.seed(prefix='again', keep_indexes=True)
+        self.assertEqual(self.snapshot('again'), self.snapshot('seed'))
+
+    def test_distributions_are_skewed(self):
+        from django.core.management.base import CommandError
+        from django.db.models import Count
+        from .models import Review
+        self.seed(hotels=200, cities=20, users=100, reviews=2000)
+        per_user = sorted(Review.objects.values('user').annotate(n=Count('id')).values_list('n', flat=True))
+        self.assertGreater(per_user[-1], 3 * per_user[len(per_user) // 2])
+        per_city = sorted(Hotel.objects.values('city').annotate(n=Count('id')).values_list('n', flat=True))
+        self.assertGreater(per_city[-1], 3 * per_city[len(per_city) // 2])
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+def query_shapes(queries) -> str:
+    """
+    SQL, сгруппированный по форме (литералы заменены на ?), от самых частых:
+    повторяющийся запрос N+1 сразу виден в начале списка
+    """
+    from collections import Counter
+    from metrics.diagnostics import normalize_sql
+    shapes = Counter(normalize_sql(query['sql']) for query in queries)
+    return '\n'.join(f'  {count:>4} x {sql}' for sql, count in shapes.most_common())
+
+
+# Бюджеты SQL-запросов по эндпоинтам: защита от N+1
+class QueryBudgetTest(APITestCase):
+    """
+    Каждый маршрут вызывается на данных seed_scale (много отелей, фото,
+    отзывов, броней и избранного) с холодным кешем. Число запросов должно
+    совпадать с бюджетом и не зависеть ни от размера страницы, ни от
+    количества строк (проверяется на "тяжелых" и "легких" отелях и
+    пользователях). При превышении в сообщении - формы запросов.
+    """
+
+    PAGE_SIZES = (3, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.core.management import call_command
+        from django.db.models import Count
+        from .management.commands.seed_scale import SEED_PASSWORD
+        from .models import Favorite, HotelImage, Review
+        call_command(
+            'seed_scale', hotels=60, cities=8, countries=3, users=30, reviews=600,
+            bookings=90, favorites=150, seed=11, keep_indexes=True, stdout=StringIO(),
+        )
+        HotelImage.objects.bulk_create([
+            HotelImage(hotel=hotel, image=f'hotel_images/{hotel.pk}-{position}.jpg', position=position)
+            for hotel in Hotel.objects.all() for position in range(3)
+        ])
+        Hotel.refresh_cover_images(Hotel.objects.all())
+
+        hotels = Hotel.objects.annotate(n=Count('reviews')).filter(n__gt=0).order_by('-n', 'pk')
+        cls.busy_hotel, cls.quiet_hotel = hotels.first(), hotels.last()
+        users = User.objects.annotate(
+            reviews=Count('review', distinct=True),
+            favorites=Count('favorite', distinct=True),
+            bookings=Count('booking', distinct=True),
+        ).filter(reviews__gt=0, favorites__gt=0, bookings__gt=0).order_by('-reviews', 'pk')
+        cls.heavy_user, cls.light_user = users.first(), users.last()
+        cls.password = SEED_PASSWORD
+        cls.review = Review.objects.filter(user=cls.heavy_user).first()
+        cls.booking = Booking.objects.filter(user=cls.heavy_user).first()
+        cls.favorite = Favorite.objects.filter(user=cls.heavy_user).first()
+        cls.staff = User.objects.create_user(username='budget-admin', password='x', is_staff=True, is_superuser=True)
+
+    def authenticate(self, user=None):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        user = user or self.heavy_user
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def request(self, method, url, data=None):
+        from django.core.cache import cache
+        from django.test.utils import CaptureQueriesContext
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+        return response, context.captured_queries
+
+    def assertQueryBudget(self, budget, *urls, method='get', data=None, expected=200, exact=True):
+        """
+        Запросы к url (варианты одного эндпоинта: мало и много строк)
+        при маленькой и большой странице. Число SQL-запросов во всех
+        вариантах одинаковое и равно budget (exact=False - не больше).
+        Изменяющие запросы выполняются один раз.
+        """
+        from rest_framework.pagination import PageNumberPagination
+        from .api.pagination import ReviewCursorPagination
+        page_sizes = self.PAGE_SIZES if method == 'get' else self.PAGE_SIZES[:1]
+        runs = {}
+        for page_size in page_sizes:
+            with mock.patch.object(PageNumberPagination, 'page_size', page_size), \
+                    mock.patch.object(ReviewCursorPagination, 'page_size', page_size):
+                for url in urls:
+                    response, queries = self.request(method, url, data)
+                    self.assertEqual(
+                        response.status_code, expected,
+                        f'{method.upper()} {url}: {getattr(response, "data", response.content)}'
+                    )
+                    name = f'{method.upper()} {url}'
+                    runs[f'{name} (страница {page_size})' if len(page_sizes) > 1 else name] = queries
+
+        counts = {len(queries) for queries in runs.values()}
+        worst, queries = max(runs.items(), key=lambda item: len(item[1]))
+        if len(counts) > 1 or (len(queries) != budget if exact else len(queries) > budget):
+            self.fail(
+                f'{worst}: {len(queries)} SQL-запросов при бюджете {budget} '
+                f'(по вариантам: {", ".join(f"{name} - {len(q)}" for name, q in runs.items())})\n'
+                f'{query_shapes(queries)}'
+            )
+        return response
+
+    def test_anonymous_catalogue(self):
+        from .models import City
+        city = City.objects.filter(hotel__isnull=False).first()
+        word = self.busy_hotel.name.split()[0]
+        check_in = date.today() + timedelta(days=30)
+        availability = f'check_in={check_in}&check_out={check_in + timedelta(days=3)}&guests=2'
+
+        # У каждого публичного GET первый запрос - валидаторы (max updated_at)
+        # COUNT + страница (страна, город и обложка через JOIN)
+        response = self.assertQueryBudget(
+            3, '/api/hotels/', '/api/hotels/?page=2', '/api/hotels/?ordering=-price_per_night',
+            '/api/hotels/?sort_by=rating_desc', f'/api/hotels/?country={city.country_id}&city={city.pk}',
+        )
+        self.assertTrue(all(hotel['main_image'] for hotel in response.data['results']))
+        self.assertQueryBudget(2, '/api/hotels/?pagination=cursor', '/api/hotels/?pagination=cursor&ordering=-stars')
+        self.assertQueryBudget(3, f'/api/hotels/?search={word}', f'/api/hotels/?search={word}&sort_by=relevance')
+        self.assertQueryBudget(3, f'/api/hotels/?{availability}')
+        self.assertQueryBudget(
+            5, f'/api/hotels/{self.busy_hotel.pk}/', f'/api/hotels/{self.quiet_hotel.pk}/'
+        )
+        self.assertQueryBudget(
+            2, f'/api/hotels/{self.busy_hotel.pk}/reviews/', f'/api/hotels/{self.quiet_hotel.pk}/reviews/',
+            f'/api/hotels/{self.busy_hotel.pk}/reviews/?rating=5',
+        )
+        self.assertQueryBudget(2, '/api/countries/')
+        self.assertQueryBudget(2, '/api/cities/', f'/api/cities/?country={city.country_id}')
+        # порог похожести задается в той же транзакции (SAVEPOINT, set_config, выборка)
+        self.assertQueryBudget(4, f'/api/autocomplete/?q={city.name[:4]}')
+
+    def test_anonymous_reviews_and_pages(self):
+        # все отзывы без пагинации - одним запросом с автором
+        self.assertQueryBudget(
+            1, '/api/reviews/', f'/api/reviews/?user={self.heavy_user.username}',
+            f'/api/reviews/?user={self.light_user.username}',
+        )
+        self.assertQueryBudget(1, f'/api/reviews/{self.review.pk}/')
+        self.assertQueryBudget(0, '/api/bookings/', '/api/favorites/', '/api/auth/current-user/', expected=401)
+
+        self.assertQueryBudget(1, '/')
+        self.assertQueryBudget(3, f'/hotel/{self.busy_hotel.pk}/', f'/hotel/{self.quiet_hotel.pk}/')
+        self.assertQueryBudget(0, '/search/', '/api/auth/profile/')
+
+    def test_auth_endpoints(self):
+        credentials = {'username': self.light_user.username, 'password': self.password}
+        response = self.assertQueryBudget(1, '/api/auth/token/', method='post', data=credentials)
+        self.assertQueryBudget(0, '/api/auth/token/refresh/', method='post', data={'refresh': response.data['refresh']})
+        self.assertQueryBudget(0, '/api/auth/token/verify/', method='post', data={'token': response.data['access']})
+        self.assertQueryBudget(1, '/api/auth/login/', method='post', data=credentials)
+        self.assertQueryBudget(
+            4, '/api/auth/register/', method='post', expected=201,
+            data={'username': 'budget-new', 'email': 'budget@example.com',
+                  'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!'},
+        )
+
+        self.authenticate()
+        self.assertQueryBudget(1, '/api/auth/current-user/', '/api/auth/user-profile/')
+
+    def test_authenticated_lists(self):
+        self.authenticate()
+        heavy, light = self.heavy_user.username, self.light_user.username
+        # пользователь по JWT + одна выборка с отелем, городом, страной и обложкой
+        for endpoint in ('bookings', 'favorites', 'reviews'):
+            response = self.assertQueryBudget(
+                2, f'/api/{endpoint}/?user={heavy}', f'/api/{endpoint}/?user={light}'
+            )
+            self.assertGreater(len(response.data), 0)
+        response = self.assertQueryBudget(2, '/api/favorites/')
+        self.assertTrue(all(item['hotel_image'] for item in response.data))
+        self.assertQueryBudget(2, '/api/bookings/')
+        self.assertQueryBudget(2, f'/api/bookings/{self.booking.pk}/')
+        self.assertQueryBudget(2, f'/api/favorites/{self.favorite.pk}/')
+
+    def test_authenticated_writes(self):
+        from .models import Favorite, Review
+        user = self.light_user
+        self.authenticate(user)
+        hotel = Hotel.objects.exclude(reviews__user=user).exclude(favorite__user=user).first()
+
+        response = self.assertQueryBudget(
+            10, '/api/reviews/', method='post', expected=201,
+            data={'hotel': hotel.pk, 'rating': 4, 'comment': 'Бюджет'},
+        )
+        self.assertQueryBudget(
+            9, f'/api/reviews/{response.data["id"]}/', method='delete', expected=204
+        )
+
+        response = self.assertQueryBudget(
+            8, '/api/favorites/', method='post', data={'hotel': hotel.pk}, expected=201
+        )
+        self.assertQueryBudget(3, f'/api/favorites/{response.data["id"]}/', method='delete', expected=204)
+
+        check_in = date.today() + timedelta(days=200)
+        response = self.assertQueryBudget(
+            12, '/api/bookings/', method='post', expected=201,
+            data={'hotel': hotel.pk, 'check_in': str(check_in),
+                  'check_out': str(check_in + timedelta(days=5)), 'guests': 1},
+        )
+        # ночи возвращает сигнал pre_delete в транзакции удаления
+        self.assertQueryBudget(
+            7, f'/api/bookings/{response.data["id"]}/', method='delete', expected=204
+        )
+        self.assertFalse(Favorite.objects.filter(user=user, hotel=hotel).exists())
+        self.assertFalse(Review.objects.filter(user=user, hotel=hotel).exists())
+
+        # удаление аккаунта: каскад по связанным таблицам, а не по строкам;
+        # ночи броней возвращаются разом (блокировка, UPDATE, отвязка категорий)
+        self.authenticate(self.heavy_user)
+        self.assertQueryBudget(20, '/api/auth/delete-account/', method='delete', exact=False)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.staff)
+        # сессия, пользователь, два COUNT, страница и справочники для фильтров
+        budgets = {'hotel': 7, 'review': 6, 'booking': 5, 'hotelimage': 5, 'country': 5, 'city': 5}
+        for model, budget in budgets.items():
+            self.assertQueryBudget(budget, f'/admin/hotels/{model}/')
+
+
+# Чтение с реплик: реплика - второе соединение к тестовой базе
+class ReplicaRoutingTest(TransactionTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.db import connections
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from . import replicas
+        self.client = APIClient()
+        self.connections = connections
+        self.replicas = replicas
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(replicas.down_until.clear)
+        self.add_alias('replica', connections['default'].settings_dict)
+        self.add_alias('replica-down', {**connections['default'].settings_dict, 'PORT': '1'})
+        override = override_settings(DATABASE_REPLICAS=['replica'])
+        override.enable()
+        self.addCleanup(override.disable)
+
+        country = Country.objects.create(name="Португалия")
+        self.city = City.objects.create(name="Лиссабон", country=country)
+        self.hotel = Hotel.objects.create(
+            name="Алфама", description="-", country=country, city=self.city,
+            stars=4, address="-", price_per_night=90
+        )
+        self.user = User.objects.create_user(username='traveller', password='x')
+        # данные созданы давно: реплика их уже получила
+        cache.clear()
+
+    def add_alias(self, alias, settings_dict):
+        self.connections.settings[alias] = {**settings_dict, 'TEST': {**settings_dict['TEST'], 'MIRROR': 'default'}}
+
+        def remove():
+            self.connections[alias].close()
+            del self.connections[alias]
+            del self.connections.settings[alias]
+        self.addCleanup(remove)
+
+    def queries_by_alias(self, path):
+        """Число запросов к основной базе и к реплике (каждый путь - с холодным кешем)"""
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(self.connections['default']) as primary, \
+                CaptureQueriesContext(self.connections['replica']) as replica:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return len(primary), len(replica)
+
+    def test_public_reads_go_to_replica(self):
+        for path in (
+            '/api/hotels/', f'/api/hotels/{self.hotel.pk}/', f'/api/hotels/{self.hotel.pk}/reviews/',
+            '/api/countries/', f'/api/cities/?country={self.city.country_id}',
+        ):
+            primary, replica = self.queries_by_alias(path)
+            self.assertEqual(primary, 0, path)
+            self.assertGreater(replica, 0, path)
+        # личный кабинет и записи - основная база
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.queries_by_alias('/api/favorites/')[1], 0)
+
+    def test_user_reads_primary_after_write(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')[0], 1)  # пользователь JWT
+
+        response = self.client.post(
+            '/api/reviews/', {'hotel': self.hotel.pk, 'rating': 5, 'comment': 'Вид на Тежу'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        primary, replica = self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 1)
+        # анонимные читатели: отзывы отеля только что менялись - тоже основная база,
+        # остальные ответы - по-прежнему с реплики
+        self.client.credentials()
+        self.assertEqual(self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')[1], 0)
+        self.assertEqual(self.queries_by_alias('/api/countries/')[0], 0)
+
+        # окно REPLICA_STICKY_SECONDS истекло
+        from django.core.cache import cache
+        cache.delete_many([f'db-primary:{self.user.pk}', f'changed:hotel:{self.hotel.pk}'])
+        self.assertEqual(self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')[0], 0)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertGreater(self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')[1], 0)
+
+    def test_recent_change_is_recomputed_from_primary(self):
+        """после изменения ответ пересчитывается с основной базы, а не с отстающей реплики"""
+        from django.core.cache import cache
+        self.assertEqual(self.queries_by_alias('/api/countries/')[0], 0)
+
+        Country.objects.create(name="Испания")
+        primary, replica = self.queries_by_alias('/api/countries/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+        self.assertEqual(len(self.client.get('/api/countries/').data), 2)
+        # другие представления изменение не затронуло
+        self.assertEqual(self.queries_by_alias(f'/api/hotels/{self.hotel.pk}/reviews/')[0], 0)
+
+        # окно REPLICA_STICKY_SECONDS истекло
+        cache.delete('changed:country')
+        self.assertEqual(self.queries_by_alias('/api/countries/')[0], 0)
+
+    def test_unavailable_replica_is_skipped(self):
+        from django.test import override_settings
+        with override_settings(DATABASE_REPLICAS=['replica-down']):
+            with self.assertLogs('hotels.replicas', 'WARNING'):
+                self.assertEqual(self.client.get('/api/hotels/').status_code, 200)
+            self.assertIn('replica-down', self.replicas.down_until)
+            # до истечения REPLICA_RETRY_SECONDS реплика не пробуется
+            with mock.patch.object(self.connections['replica-down'], 'ensure_connection') as ensure:
+                self.assertEqual(self.client.get('/api/countries/').status_code, 200)
+            ensure.assert_not_called()
+
+    def test_migrations_only_on_primary(self):
+        from .replicas import ReplicaRouter
+        self.assertFalse(ReplicaRouter().allow_migrate('replica', 'hotels'))
+        self.assertIsNone(ReplicaRouter().allow_migrate('default', 'hotels'))
+
+
+class AsyncURLConf:
+    """Корневой URLconf как под ASGI (ASYNC_CATALOGUE=1)"""
+    from django.urls import include, path
+    urlpatterns = [path('api/', include('hotels.api.async_urls'))]
+
+
+# Асинхронные представления каталога: те же ответы, что у синхронных
+class AsyncCatalogueTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from .models import HotelImage, Review
+        country = Country.objects.create(name="Испания")
+        other = Country.objects.create(name="Греция")
+        cls.city = City.objects.create(name="Севилья", country=country)
+        City.objects.create(name="Афины", country=other)
+        cls.hotels = [
+            Hotel.objects.create(
+                name=f"Алькасар {i}", description="Патио с апельсиновыми деревьями", country=country,
+                city=cls.city, stars=3 + i % 3, address="-", price_per_night=80 + i * 5
+            )
+            for i in range(12)
+        ]
+        hotel = cls.hotels[0]
+        HotelImage.objects.create(hotel=hotel, image='hotel_images/patio.jpg', position=0)
+        Hotel.refresh_cover_images(Hotel.objects.filter(pk=hotel.pk))
+        RoomType.objects.create(hotel=hotel, name="Стандарт", capacity=2, quantity=3)
+        user = User.objects.create_user(username='guest', password='x')
+        Review.objects.create(hotel=hotel, user=user, rating=5, comment="Оле")
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import AsyncClient
+        cache.clear()
+        self.async_client = AsyncClient()
+
+    async def fetch(self, path, method='get', clear=True, **extra):
+        from django.core.cache import cache
+        from django.test import override_settings
+        if clear:
+            await cache.aclear()
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            return await getattr(self.async_client, method)(path, **extra)
+
+    def paths(self):
+        return [
+            '/api/hotels/', '/api/hotels/?page=2', '/api/hotels/?page=9', '/api/hotels/?stars=4&ordering=-price_per_night',
+            '/api/hotels/?pagination=cursor&sort_by=rating_desc', '/api/hotels/?search=%D0%BF%D0%B0%D1%82%D0%B8%D0%BE',
+            '/api/hotels/?check_in=2030-01-05&check_out=2030-01-01',
+            f'/api/hotels/{self.hotels[0].pk}/', '/api/hotels/0/',
+            '/api/countries/', f'/api/cities/?country={self.city.country_id}',
+            '/api/hotels/?fields=id,name&pagination=cursor', f'/api/hotels/{self.hotels[0].pk}/?omit=images,reviews',
+            '/api/hotels/?fields=bogus',
+        ]
+
+    async def test_same_responses_as_sync_views(self):
+        from asgiref.sync import sync_to_async
+        from django.core.cache import cache
+        for path in self.paths():
+            await cache.aclear()
+            expected = await sync_to_async(self.client.get)(path)
+            response = await self.fetch(path)
+            self.assertEqual(response.status_code, expected.status_code, path)
+            self.assertEqual(response.json(), expected.json(), path)
+            # ETag зависит от версий в кеше, сброшенном между запросами
+            self.assertEqual('ETag' in response, 'ETag' in expected, path)
+            for header in ('Content-Type', 'Cache-Control', 'Surrogate-Key', 'Allow', 'Vary'):
+                self.assertEqual(response.get(header), expected.get(header), (path, header))
+
+        next_page = (await self.fetch('/api/hotels/?pagination=cursor')).json()['next']
+        self.assertEqual(len((await self.fetch(next_page)).json()['results']), 3)
+
+    async def test_query_counts_and_conditional_get(self):
+        response = await self.fetch('/api/hotels/')
+        # валидаторы, COUNT и страница; SQL async ORM учитывается в Server-Timing
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        response = await self.fetch(f'/api/hotels/{self.hotels[0].pk}/')
+        self.assertIn('desc="5 queries"', response['Server-Timing'])
+        self.assertEqual(len(response.json()['reviews']), 1)
+
+        not_modified = await self.fetch(
+            f'/api/hotels/{self.hotels[0].pk}/', clear=False, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('desc="1 queries"', not_modified['Server-Timing'])
+        response = await self.fetch('/api/countries/', method='post')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD, OPTIONS')
+
+    async def test_stale_copy_keeps_its_validators(self):
+        from django.core.cache import cache
+        from .cache import build_key
+        first = await self.fetch('/api/countries/')
+        await Country.objects.acreate(name="Португалия")
+        lock_key = build_key('CountryListView', {}, extra='testserver') + ':lock'
+        await cache.aadd(lock_key, 1)
+        stale = await self.fetch('/api/countries/', clear=False)
+        self.assertEqual(len(stale.json()), 2)
+        self.assertEqual(stale['ETag'], first['ETag'])
+        await cache.adelete(lock_key)
+        fresh = await self.fetch('/api/countries/', clear=False, headers={'If-None-Match': stale['ETag']})
+        self.assertEqual(len(fresh.json()), 3)
+
+    async def test_invalid_token_is_rejected_like_sync_view(self):
+        response = await self.fetch('/api/countries/', headers={'Authorization': 'Bearer broken'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_middleware_runs_without_thread_hop(self):
+        from asgiref.sync import iscoroutinefunction
+        from metrics.middleware import RequestMetricsMiddleware
+        from metrics.profiling import ProfilingMiddleware
+        from .replicas import PrimaryStickinessMiddleware
+
+        async def get_response(request):
+            return None
+
+        for middleware in (RequestMetricsMiddleware, ProfilingMiddleware, PrimaryStickinessMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(get_response)), middleware)
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(get_response).process_view))
@@ -1,20 +1,28 @@
+from django.db.models import Prefetch
 from django.shortcuts import render, get_object_or_404
 from typing import Any, Dict
 
-from .models import Hotel
+from .models import Hotel, Review
 
 
 # главная страница
 def home_page(request) -> Any:
     # Выводится 6 рандомных отелей из базы данных
-    hotels = Hotel.objects.all().order_by('?')[:6]
+    hotels = Hotel.objects.select_related('country', 'city', 'cover_image').order_by('?')[:6]
     context: Dict[str, Any] = {'hotels': hotels}
     return render(request, 'home.html', context)
 
 
 # страница конкретного отеля
 def hotel_detail_page(request, hotel_id: int) -> Any:
-    hotel = get_object_or_404(Hotel, id=hotel_id)
+    # отзывы с авторами одним запросом - иначе по запросу на каждый отзыв
+    reviews = Review.objects.select_related('user').order_by('-created_at', '-id')
+    hotel = get_object_or_404(
+        Hotel.objects.select_related('country', 'city').prefetch_related(
+            'images', Prefetch('reviews', queryset=reviews)
+        ),
+        id=hotel_id
+    )
     context: Dict[str, Any] = {'hotel': hotel}
     return render(request, 'hotel_detail.html', context)
 
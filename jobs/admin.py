@@ -0,0 +1,34 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.action(description='Перезапустить выбранные задачи')
+def retry_jobs(modeladmin, request, queryset) -> None:
+    queryset.exclude(status=Job.RUNNING).update(
+        status=Job.QUEUED, run_at=timezone.now(), attempts=0, finished_at=None
+    )
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Админка для фоновых задач"""
+
+    list_display = [
+        'id',
+        'task',
+        'queue',
+        'status',
+        'attempts',
+        'run_at',
+        'locked_by',
+        'finished_at',
+    ]
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'unique_key']
+    readonly_fields = ['created_at', 'locked_by', 'locked_at', 'finished_at', 'last_error']
+    actions = [retry_jobs]
+    list_per_page = 50
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from typing import Any
+
+from jobs.worker import Supervisor, default_processes
+
+
+class Command(BaseCommand):
+    """Запуск воркеров фоновых задач (останавливается по SIGTERM/Ctrl+C)"""
+
+    help = 'Запускает процессы, выполняющие задачи из очереди jobs'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            help='Количество процессов. По умолчанию - JOBS_PROCESSES или число CPU'
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Очередь (можно указать несколько раз). По умолчанию - default'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Максимальная пауза между проверками очереди без NOTIFY, сек'
+        )
+        parser.add_argument(
+            '--shutdown-timeout',
+            type=float,
+            default=30.0,
+            help='Сколько ждать завершения текущих задач при остановке, сек'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        processes = options['processes'] or default_processes()
+        queues = options['queues'] or ['default']
+        self.stdout.write(self.style.SUCCESS(
+            f'Воркеры: {processes}, очереди: {", ".join(queues)}'
+        ))
+        Supervisor(
+            processes=processes,
+            queues=queues,
+            poll_interval=options['poll_interval'],
+            shutdown_timeout=options['shutdown_timeout'],
+        ).run()
+        self.stdout.write('Воркеры остановлены')
@@ -0,0 +1,118 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from typing import List, Tuple
+
+
+class Job(models.Model):
+    """
+    Фоновая задача. Воркеры забирают готовые к запуску строки через
+    SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько процессов не
+    блокируют друг друга и никогда не берут одну задачу дважды.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES: List[Tuple[str, str]] = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    task: models.CharField = models.CharField(
+        max_length=200,
+        verbose_name='Задача'
+    )
+    args: models.JSONField = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Аргументы'
+    )
+    kwargs: models.JSONField = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Именованные аргументы'
+    )
+    queue: models.CharField = models.CharField(
+        max_length=50,
+        default='default',
+        verbose_name='Очередь'
+    )
+    priority: models.SmallIntegerField = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет'
+    )
+    status: models.CharField = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    run_at: models.DateTimeField = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запуск не раньше'
+    )
+    attempts: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Максимум попыток'
+    )
+    # Задача с ключом ставится один раз (периодические задачи: ключ = слот времени)
+    unique_key: models.CharField = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name='Ключ уникальности'
+    )
+    last_error: models.TextField = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    locked_by: models.CharField = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Воркер'
+    )
+    locked_at: models.DateTimeField = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    created_at: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    finished_at: models.DateTimeField = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата завершения'
+    )
+
+    def __str__(self) -> str:
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name: str = 'Фоновая задача'
+        verbose_name_plural: str = 'Фоновые задачи'
+        ordering: List[str] = ['-id']
+        indexes: List[models.Index] = [
+            # частичные индексы: в них только живые задачи, а не вся история
+            models.Index(
+                fields=['queue', '-priority', 'run_at', 'id'],
+                name='job_ready_idx',
+                condition=Q(status='queued'),
+            ),
+            models.Index(
+                fields=['locked_at'],
+                name='job_running_idx',
+                condition=Q(status='running'),
+            ),
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
@@ -0,0 +1,239 @@
+"""
+Очередь фоновых задач поверх PostgreSQL (без внешнего брокера).
+
+    from jobs.queue import enqueue, task
+
+    @task(max_attempts=5)
+    def send_email(user_id: int) -> None:
+        ...
+
+    enqueue(send_email, user.id)                       # как можно скорее
+    enqueue(send_email, user.id, delay=60)             # через минуту
+    enqueue('hotels.tasks.rebuild_rating_stats', hotel_ids=[1, 2])
+
+Задача ставится в той же транзакции, что и изменения данных: при откате
+запроса она тоже исчезает, а воркер не увидит ее до коммита. Аргументы
+должны сериализоваться в JSON.
+"""
+import logging
+import random
+import select
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Union
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules, import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'jobs'
+
+# имя задачи (module.function) -> функция
+registry: Dict[str, Callable[..., Any]] = {}
+
+
+def task(func: Optional[Callable] = None, *, queue: str = 'default', max_attempts: int = 3):
+    """Зарегистрировать функцию как задачу (модули tasks.py приложений импортируются воркером)"""
+    def register(func: Callable) -> Callable:
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.job_queue = queue
+        func.job_max_attempts = max_attempts
+        registry[func.job_name] = func
+        return func
+
+    return register(func) if func is not None else register
+
+
+def get_task(name: str) -> Callable[..., Any]:
+    """Функция задачи по имени; модуль импортируется, если еще не загружен"""
+    if name not in registry:
+        import_string(name)
+    if name not in registry:
+        raise LookupError(f'Неизвестная задача: {name}')
+    return registry[name]
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+def _notify(queue: str) -> None:
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, queue])
+
+
+def enqueue(
+    func: Union[str, Callable],
+    *args: Any,
+    delay: Optional[float] = None,
+    run_at=None,
+    queue: Optional[str] = None,
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    unique_key: Optional[str] = None,
+    **kwargs: Any,
+) -> Job:
+    """
+    Поставить задачу в очередь. С unique_key повторная постановка
+    возвращает уже существующую задачу.
+    """
+    name = func if isinstance(func, str) else func.job_name
+    target = registry.get(name)
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    fields = {
+        'task': name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'queue': queue or getattr(target, 'job_queue', 'default'),
+        'priority': priority,
+        'run_at': run_at,
+        'max_attempts': max_attempts or getattr(target, 'job_max_attempts', 3),
+    }
+    if unique_key:
+        job, created = Job.objects.get_or_create(unique_key=unique_key, defaults=fields)
+        if not created:
+            return job
+    else:
+        job = Job.objects.create(**fields)
+    # будим ждущие воркеры (LISTEN), но только после коммита
+    transaction.on_commit(lambda: _notify(job.queue))
+    return job
+
+
+def claim(worker_id: str, queues: Sequence[str]) -> Optional[Job]:
+    """
+    Забрать одну готовую задачу. Строки, заблокированные другими воркерами,
+    пропускаются (SKIP LOCKED), а статус running фиксируется коммитом сразу,
+    чтобы сама задача выполнялась уже без блокировок.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, queue__in=queues, run_at__lte=timezone.now())
+            .order_by('-priority', 'run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts = F('attempts') + 1
+        job.locked_by = worker_id
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at'])
+    job.refresh_from_db(fields=['attempts'])
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка с джиттером: base * 2^(n-1), не больше max"""
+    base = _setting('JOBS_RETRY_BASE_DELAY', 5)
+    limit = _setting('JOBS_RETRY_MAX_DELAY', 3600)
+    delay = min(base * 2 ** (attempts - 1), limit)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def execute(job: Job) -> bool:
+    """Выполнить взятую задачу и записать результат. True - успешно"""
+    try:
+        func = get_task(job.task)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed, attempt %s', job.pk, job.task, job.attempts)
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+                last_error=error,
+                locked_by='',
+                locked_at=None,
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=error, finished_at=timezone.now()
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def run_pending(queues: Optional[Iterable[str]] = None, worker_id: str = 'inline') -> int:
+    """Выполнить все готовые задачи в текущем процессе (тесты, отладка)"""
+    queues = list(queues or _setting('JOBS_QUEUES', ['default']))
+    count = 0
+    while True:
+        job = claim(worker_id, queues)
+        if job is None:
+            return count
+        execute(job)
+        count += 1
+
+
+def requeue_stale() -> int:
+    """
+    Вернуть в очередь задачи, "зависшие" в running дольше JOBS_VISIBILITY_TIMEOUT
+    (воркер убит посреди выполнения). Попытка при этом засчитывается.
+    """
+    deadline = timezone.now() - timedelta(seconds=_setting('JOBS_VISIBILITY_TIMEOUT', 600))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Превышено время выполнения', finished_at=timezone.now()
+    )
+    return failed + stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def schedule_periodic(now=None) -> None:
+    """
+    Поставить периодические задачи из JOBS_PERIODIC за текущий слот времени:
+
+        JOBS_PERIODIC = {'purge-jobs': {'task': 'jobs.tasks.purge_finished_jobs', 'every': 3600}}
+
+    Ключ уникальности = имя + номер слота, поэтому при нескольких
+    супервизорах задача все равно ставится один раз за период.
+    """
+    now = now or timezone.now()
+    for name, spec in _setting('JOBS_PERIODIC', {}).items():
+        slot = int(now.timestamp() // spec['every'])
+        key = f'periodic:{name}:{slot}'
+        enqueue(
+            spec['task'],
+            *spec.get('args', ()),
+            unique_key=key,
+            queue=spec.get('queue'),
+            **spec.get('kwargs', {}),
+        )
+
+
+def discover_tasks() -> None:
+    """Импортировать модули tasks.py всех приложений (регистрация задач)"""
+    autodiscover_modules('tasks')
+
+
+def listen() -> None:
+    """Подписаться на уведомления о новых задачах (только PostgreSQL)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+
+
+def wait_for_jobs(timeout: float) -> None:
+    """Ждать NOTIFY о новой задаче, но не дольше timeout (иначе - простой опрос)"""
+    raw = connection.connection
+    if connection.vendor != 'postgresql' or raw is None:
+        time.sleep(timeout)
+        return
+    if select.select([raw], [], [], timeout)[0]:
+        raw.poll()
+        raw.notifies.clear()
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import task
+
+
+@task
+def purge_finished_jobs() -> int:
+    """Удалить историю выполненных задач старше JOBS_KEEP_FINISHED_DAYS (упавшие остаются)"""
+    days = getattr(settings, 'JOBS_KEEP_FINISHED_DAYS', 7)
+    deadline = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=deadline).delete()
+    return deleted
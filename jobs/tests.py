@@ -0,0 +1,111 @@
+import threading
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim, enqueue, requeue_stale, run_pending, schedule_periodic, task
+
+calls = []
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run_in_priority_order(self):
+        enqueue(remember, 'low')
+        enqueue(remember, 'high', priority=10)
+        enqueue(remember, 'later', delay=3600)
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.get(args=['later']).status, Job.QUEUED)
+
+    def test_claimed_job_is_not_requeued(self):
+        enqueue(remember, 'once')
+        job = claim('worker-1', ['default'])
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, 'worker-1'))
+        self.assertIsNone(claim('worker-2', ['default']))
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = enqueue(explode)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    @override_settings(JOBS_PERIODIC={'tick': {'task': 'jobs.tests.remember', 'every': 60, 'args': ['tick']}})
+    def test_periodic_jobs_are_enqueued_once_per_slot(self):
+        now = timezone.now()
+        schedule_periodic(now)
+        schedule_periodic(now)
+        self.assertEqual(Job.objects.filter(task='jobs.tests.remember').count(), 1)
+        schedule_periodic(now + timedelta(seconds=60))
+        self.assertEqual(Job.objects.filter(task='jobs.tests.remember').count(), 2)
+
+    def test_stale_running_jobs_are_requeued(self):
+        enqueue(remember, 'crashed')
+        job = claim('worker-1', ['default'])
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        run_pending()
+        self.assertEqual(calls, ['crashed'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED - только PostgreSQL')
+class ConcurrentClaimTest(TransactionTestCase):
+    def test_locked_job_is_skipped_by_another_worker(self):
+        """пока транзакция первого воркера открыта, второй берет следующую задачу, не дожидаясь"""
+        first_job, second_job = enqueue(remember, 'first'), enqueue(remember, 'second')
+        claimed, released = threading.Event(), threading.Event()
+        result = {}
+
+        def first_worker():
+            try:
+                # внешняя транзакция держит блокировку строки, взятой claim
+                with transaction.atomic():
+                    result['first'] = claim('worker-1', ['default'])
+                    claimed.set()
+                    result['held'] = released.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=first_worker)
+        thread.start()
+        try:
+            self.assertTrue(claimed.wait(10))
+            second = claim('worker-2', ['default'])
+        finally:
+            released.set()
+            thread.join()
+
+        # второй воркер не ждал коммита первого (блокировка была еще открыта)
+        self.assertTrue(result['held'])
+        self.assertEqual(result['first'].pk, first_job.pk)
+        self.assertEqual(second.pk, second_job.pk)
+        self.assertEqual(
+            dict(Job.objects.values_list('pk', 'locked_by')),
+            {first_job.pk: 'worker-1', second_job.pk: 'worker-2'}
+        )
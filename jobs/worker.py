@@ -0,0 +1,137 @@
+"""
+Процессы воркеров и супервизор для manage.py run_workers.
+
+Супервизор запускает N процессов (spawn), перезапускает упавшие, ставит
+периодические задачи и возвращает в очередь зависшие. По SIGTERM/SIGINT
+он выставляет общий флаг остановки: воркеры доделывают текущую задачу
+и выходят, а не обрываются на середине.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+# как часто супервизор планирует периодические задачи и проверяет зависшие
+SUPERVISOR_TICK = 5.0
+
+
+def worker_main(index: int, queues: List[str], poll_interval: float, stop) -> None:
+    """Точка входа процесса воркера"""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+    from .queue import claim, discover_tasks, execute, listen, wait_for_jobs
+
+    # Ctrl+C приходит всей группе процессов - останавливает только супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    terminated = []
+    signal.signal(signal.SIGTERM, lambda *args: terminated.append(True))
+
+    discover_tasks()
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    logger.info('Worker %s started, queues: %s', worker_id, ', '.join(queues))
+    # соединение держим открытым между задачами: на нем висит подписка LISTEN
+    listening = None
+    while not stop.is_set() and not terminated:
+        try:
+            if connection.connection is None or connection.connection is not listening:
+                connection.ensure_connection()
+                listen()
+                listening = connection.connection
+            job = claim(worker_id, queues)
+        except Exception:
+            logger.exception('Worker %s cannot claim a job', worker_id)
+            connection.close()
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            wait_for_jobs(poll_interval)
+            continue
+        execute(job)
+    connection.close()
+    logger.info('Worker %s stopped', worker_id)
+
+
+class Supervisor:
+    """Пул процессов воркеров с плавной остановкой"""
+
+    def __init__(self, processes: int, queues: List[str], poll_interval: float,
+                 shutdown_timeout: float) -> None:
+        self.processes = processes
+        self.queues = queues
+        self.poll_interval = poll_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.context = multiprocessing.get_context('spawn')
+        self.stop = self.context.Event()
+        self.workers: Dict[int, multiprocessing.Process] = {}
+        self.stopping = False
+
+    def start_worker(self, index: int) -> None:
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self.queues, self.poll_interval, self.stop),
+            name=f'job-worker-{index}',
+        )
+        process.start()
+        self.workers[index] = process
+
+    def request_stop(self, *args) -> None:
+        # только флаг: обработчик сигнала не должен трогать блокировки Event
+        self.stopping = True
+
+    def tick(self) -> None:
+        from .queue import requeue_stale, schedule_periodic
+
+        close_old_connections()
+        try:
+            schedule_periodic()
+            requeue_stale()
+        except Exception:
+            logger.exception('Supervisor tick failed')
+            connection.close()
+
+    def sleep(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+
+    def run(self) -> None:
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        # дочерние процессы не должны наследовать соединение с базой
+        connection.close()
+        for index in range(self.processes):
+            self.start_worker(index)
+
+        while not self.stopping:
+            self.tick()
+            for index, process in list(self.workers.items()):
+                if not process.is_alive() and not self.stopping:
+                    logger.warning('Worker %s exited with %s, restarting', index, process.exitcode)
+                    self.start_worker(index)
+            self.sleep(SUPERVISOR_TICK)
+
+        logger.info('Shutting down workers...')
+        self.stop.set()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self.workers.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self.workers.values():
+            if process.is_alive():
+                logger.warning('Worker %s did not stop in time, terminating', process.name)
+                process.terminate()
+                process.join()
+        connection.close()
+
+
+def default_processes() -> int:
+    return getattr(settings, 'JOBS_PROCESSES', os.cpu_count() or 1)
@@ -13,17 +13,19 @@ def load_fixtures():
         'bookings.json',
         'favorites.json',
     ]
+    # одна команда вместо loaddata на каждый файл: fastload сам упорядочит
+    # модели по FK и загрузит все в одной транзакции
+    fixtures = [name for name in fixtures if os.path.exists(os.path.join('fixtures', name))]
 
-    for fixture in fixtures:
-        print(f"Loading {fixture}...")
-        cmd = f'docker-compose exec web python manage.py loaddata {fixture}'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
+    print(f"Loading {', '.join(fixtures)}...")
+    cmd = f'docker-compose exec web python manage.py fastload {" ".join(fixtures)}'
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
 
-        if result.returncode == 0:
-            print(f"✅ {fixture} loaded successfully!")
-        else:
-            print(f"❌ Error loading {fixture}: {result.stderr}")
+    if result.returncode == 0:
+        print(f"✅ {result.stdout.strip()} ({result.stderr.strip()})")
+    else:
+        print(f"❌ Error loading fixtures: {result.stderr}")
 
 
 if __name__ == '__main__':
-    load_fixtures()
\ No newline at end of file
+    load_fixtures()
@@ -0,0 +1,121 @@
+"""
+Минимальный асинхронный HTTP/1.1-клиент на asyncio (только стандартная
+библиотека): keep-alive соединение на виртуального пользователя, тела с
+Content-Length и chunked. Для генератора нагрузки этого достаточно, а
+внешние клиенты (aiohttp, httpx) не нужны ни на CI, ни на стенде.
+"""
+import asyncio
+import json
+import ssl
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+class HTTPClient:
+    """Одно keep-alive соединение; запросы выполняются последовательно"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0) -> None:
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        context = ssl.create_default_context() if self.scheme == 'https' else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """Запрос с одним переподключением, если сервер закрыл keep-alive соединение"""
+        body = b'' if json_body is None else json.dumps(json_body).encode('utf-8')
+        lines = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Content-Length: {len(body)}',
+        ]
+        if json_body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        for attempt in range(2):
+            fresh = self.writer is None
+            if fresh:
+                await self.connect()
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await asyncio.wait_for(self.read_response(method), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if fresh or attempt:
+                    raise
+            except BaseException:
+                # таймаут или отмена посреди ответа: соединение больше не пригодно
+                await self.close()
+                raise
+        raise ConnectionError('unreachable')
+
+    async def read_response(self, method: str) -> Response:
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split(b' ', 2)[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # трейлеры до пустой строки
+                    while await self.reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            # ответ до закрытия соединения
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, headers, body)
@@ -0,0 +1,231 @@
+"""
+Сравнение синхронного (WSGI) и асинхронного (ASGI) пути каталога в одном
+процессе, без сети и HTTP-сервера: замеряется сам Django.
+
+- WSGI: WSGIHandler в concurrency потоках - как gthread-воркер
+  gunicorn с threads=concurrency; синхронные представления hotels/api/views.py.
+- ASGI: ASGIHandler в цикле событий, одновременно не больше concurrency
+  запросов; асинхронные представления hotels/api/async_views.py.
+
+На каждый уровень конкурентности снимаются RPS, перцентили латентности и
+пик числа потоков процесса, затем отдельным коротким прогоном (ровно
+concurrency одновременных запросов под tracemalloc) - прирост памяти Python
+на запрос в обработке. Стеки потоков в tracemalloc не видны: их считает
+число потоков. db_latency добавляет паузу к каждому SQL - задержка сети до
+PostgreSQL, на которой и видна разница моделей.
+"""
+import asyncio
+import threading
+import time
+import tracemalloc
+from queue import Empty, SimpleQueue
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import include, path
+
+from .runner import summarize
+
+MODES = ('wsgi', 'asgi')
+
+
+class SyncURLConf:
+    urlpatterns = [path('api/', include('hotels.api.urls'))]
+
+
+class AsyncURLConf:
+    urlpatterns = [path('api/', include('hotels.api.async_urls'))]
+
+
+URLCONFS = {'wsgi': SyncURLConf, 'asgi': AsyncURLConf}
+
+
+def wsgi_environ(url: str) -> Dict[str, Any]:
+    path_info, _, query = url.partition('?')
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path_info, 'QUERY_STRING': query, 'HTTP_HOST': 'localhost'}
+    setup_testing_defaults(environ)
+    return environ
+
+
+def asgi_scope(url: str) -> Dict[str, Any]:
+    path_info, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path_info,
+        'raw_path': path_info.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+
+
+def wsgi_request(handler: WSGIHandler, url: str) -> Tuple[int, float]:
+    started = time.perf_counter()
+    status: List[int] = []
+    body = handler(wsgi_environ(url), lambda line, headers, exc_info=None: status.append(int(line[:3])))
+    try:
+        b''.join(body)
+    finally:
+        # request_finished: возврат соединения с базой, как у сервера
+        body.close()
+    return status[0], time.perf_counter() - started
+
+
+async def asgi_request(handler: ASGIHandler, url: str) -> Tuple[int, float]:
+    started = time.perf_counter()
+    status: List[int] = []
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()  # клиент не отключается
+        sent = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await handler(asgi_scope(url), receive, send)
+    return status[0], time.perf_counter() - started
+
+
+def run_wsgi(urls: Sequence[str], concurrency: int) -> List[Tuple[int, float]]:
+    handler = WSGIHandler()
+    queue: SimpleQueue = SimpleQueue()
+    for index, url in enumerate(urls):
+        queue.put((index, url))
+    results: List[Tuple[int, float]] = [(0, 0.0)] * len(urls)
+
+    def worker() -> None:
+        try:
+            while True:
+                try:
+                    index, url = queue.get_nowait()
+                except Empty:
+                    return
+                results[index] = wsgi_request(handler, url)
+        finally:
+            # постоянные соединения потока (CONN_MAX_AGE) уходят вместе с ним
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, name=f'wsgi-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_asgi(urls: Sequence[str], concurrency: int) -> List[Tuple[int, float]]:
+    handler = ASGIHandler()
+
+    async def main() -> List[Tuple[int, float]]:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(url: str) -> Tuple[int, float]:
+            async with slots:
+                return await asgi_request(handler, url)
+
+        return await asyncio.gather(*(one(url) for url in urls))
+
+    # как backend/asgi.py: поток запроса живет один запрос, соединение закрывается с ним
+    saved = {alias: options['CONN_MAX_AGE'] for alias, options in connections.settings.items()}
+    for options in connections.settings.values():
+        options['CONN_MAX_AGE'] = 0
+    try:
+        return asyncio.run(main())
+    finally:
+        for alias, max_age in saved.items():
+            connections.settings[alias]['CONN_MAX_AGE'] = max_age
+
+
+RUNNERS: Dict[str, Callable[[Sequence[str], int], List[Tuple[int, float]]]] = {
+    'wsgi': run_wsgi,
+    'asgi': run_asgi,
+}
+
+
+class ThreadWatcher(threading.Thread):
+    """Пик threading.active_count() за время прогона (без самого наблюдателя)"""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        super().__init__(name='thread-watcher', daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+    def stop(self) -> int:
+        self.stopped.set()
+        self.join()
+        return self.peak
+
+
+@contextmanager
+def db_latency(seconds: float) -> Iterator[None]:
+    """Пауза перед каждым SQL в соединениях, открытых внутри блока"""
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def add_delay(sender, connection, **kwargs) -> None:
+        connection.execute_wrappers.append(delay)
+
+    if seconds > 0:
+        connection_created.connect(add_delay, dispatch_uid='loadtest.inprocess')
+    try:
+        yield
+    finally:
+        connection_created.disconnect(dispatch_uid='loadtest.inprocess')
+
+
+def measure(mode: str, urls: Sequence[str], concurrency: int, requests: int) -> Dict[str, Any]:
+    """Прогон requests запросов по кругу urls и замер памяти на concurrency запросах"""
+    run = RUNNERS[mode]
+    batch = [urls[i % len(urls)] for i in range(requests)]
+    with override_settings(ROOT_URLCONF=URLCONFS[mode]):
+        run(urls, min(concurrency, len(urls)))  # прогрев: импорт, соединения, кеш
+        watcher = ThreadWatcher()
+        watcher.start()
+        started = time.perf_counter()
+        results = run(batch, concurrency)
+        elapsed = time.perf_counter() - started
+        threads = watcher.stop()
+
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(batch[:concurrency], concurrency)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    errors = sum(1 for status, _ in results if status >= 400)
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': summarize([latency for _, latency in results]),
+        'peak_threads': threads,
+        'kib_per_request': round((peak - baseline) / 1024 / concurrency, 1),
+    }
@@ -0,0 +1,217 @@
+"""
+Сценарии виртуальных пользователей. Каждый повторяет последовательность
+запросов, которую делают шаблоны фронтенда (home.html, search_results.html,
+hotel_detail.html, profile.html), и регистрируется с весом - долей
+пользователей, выбирающих сценарий:
+
+    @journey(weight=10, auth=True)
+    async def booking(user): ...
+
+Сценарии с записью (избранное, бронирование) удаляют то, что создали,
+чтобы длинный прогон не менял данные стенда.
+"""
+import random
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlencode, urlsplit
+
+if TYPE_CHECKING:
+    from .runner import VirtualUser
+
+Expected = Tuple[int, ...]
+
+HOTEL_ORDERINGS = [
+    {}, {'ordering': 'price_per_night'}, {'ordering': '-price_per_night'},
+    {'ordering': '-stars'}, {'sort_by': 'rating_desc'},
+]
+# сколько id отелей из ответов держать для следующих сценариев
+CATALOG_HOTELS = 5000
+
+
+class Journey(NamedTuple):
+    name: str
+    weight: float
+    auth: bool
+    run: Callable[['VirtualUser'], Awaitable[None]]
+
+
+# имя сценария -> сценарий (порядок объявления)
+JOURNEYS: Dict[str, Journey] = {}
+
+
+def journey(weight: float, auth: bool = False):
+    """Зарегистрировать сценарий. auth - нужен вход (пользователи seed_scale)"""
+    def register(func: Callable[['VirtualUser'], Awaitable[None]]):
+        JOURNEYS[func.__name__] = Journey(func.__name__, weight, auth, func)
+        return func
+
+    return register
+
+
+class Catalog:
+    """Страны, города и id отелей, увиденные в ответах (общие для всех пользователей)"""
+
+    def __init__(self) -> None:
+        self.countries: List[int] = []
+        self.cities: Dict[int, List[Tuple[int, str]]] = {}
+        self.city_names: List[str] = []
+        self.hotels: List[int] = []
+        self.known: Set[int] = set()
+
+    async def load(self, user: 'VirtualUser') -> None:
+        response = await user.call('GET', '/api/countries/')
+        if response is not None and response.status == 200:
+            self.countries = [country['id'] for country in response.json()]
+        response = await user.call('GET', '/api/cities/')
+        if response is not None and response.status == 200:
+            for city in response.json():
+                self.cities.setdefault(city['country'], []).append((city['id'], city['name']))
+                self.city_names.append(city['name'])
+        response = await user.call('GET', '/api/hotels/')
+        if response is not None and response.status == 200:
+            self.remember(response.json()['results'])
+        if not self.hotels:
+            raise RuntimeError('Каталог пуст: заполните базу (manage.py seed_scale)')
+
+    def remember(self, hotels: List[Dict[str, Any]]) -> None:
+        for hotel in hotels:
+            if hotel['id'] not in self.known and len(self.hotels) < CATALOG_HOTELS:
+                self.known.add(hotel['id'])
+                self.hotels.append(hotel['id'])
+
+    def hotel(self, rng: random.Random) -> int:
+        return rng.choice(self.hotels)
+
+
+def page_path(url: Optional[str]) -> Optional[str]:
+    """Ссылка next из ответа API - абсолютный URL; нужен путь с параметрами"""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+
+def stay_dates(rng: random.Random) -> Tuple[date, date]:
+    check_in = date.today() + timedelta(days=rng.randint(7, 180))
+    return check_in, check_in + timedelta(days=rng.randint(1, 7))
+
+
+async def open_hotel(user: 'VirtualUser', hotel_id: int) -> Optional[Dict[str, Any]]:
+    """Карточка отеля: страница, API-детали и первая страница отзывов"""
+    await user.call('GET', f'/hotel/{hotel_id}/', name='GET /hotel/<id>/')
+    response = await user.call('GET', f'/api/hotels/{hotel_id}/', name='GET /api/hotels/<id>/')
+    if user.rng.random() < 0.5:
+        await user.call(
+            'GET', f'/api/hotels/{hotel_id}/reviews/', name='GET /api/hotels/<id>/reviews/'
+        )
+    return response.json() if response is not None and response.status == 200 else None
+
+
+@journey(weight=45)
+async def browse(user: 'VirtualUser') -> None:
+    """Главная -> фильтр по стране и городу -> список (иногда 2-я страница) -> карточки"""
+    rng, catalog = user.rng, user.catalog
+    await user.call('GET', '/api/countries/')
+    params: Dict[str, Any] = dict(rng.choice(HOTEL_ORDERINGS))
+    if catalog.countries:
+        country = rng.choice(catalog.countries)
+        await user.call('GET', f'/api/cities/?country={country}', name='GET /api/cities/?country')
+        params['country'] = country
+        cities = catalog.cities.get(country)
+        if cities and rng.random() < 0.7:
+            params['city'] = rng.choice(cities)[0]
+    response = await user.call('GET', f'/api/hotels/?{urlencode(params)}')
+    if response is None or response.status != 200:
+        return
+    data = response.json()
+    catalog.remember(data['results'])
+    next_page = page_path(data.get('next'))
+    if next_page and rng.random() < 0.3:
+        response = await user.call('GET', next_page, name='GET /api/hotels/?page')
+        if response is not None and response.status == 200:
+            data = response.json()
+            catalog.remember(data['results'])
+    for hotel in rng.sample(data['results'], min(len(data['results']), rng.randint(1, 3))):
+        await open_hotel(user, hotel['id'])
+
+
+@journey(weight=20)
+async def search(user: 'VirtualUser') -> None:
+    """Строка поиска: подсказки по мере ввода -> поиск с датами -> карточка"""
+    rng, catalog = user.rng, user.catalog
+    term = rng.choice(catalog.city_names) if catalog.city_names else 'отель'
+    for length in range(2, min(len(term), 5) + 1):
+        await user.call('GET', f'/api/autocomplete/?{urlencode({"q": term[:length]})}')
+    check_in, check_out = stay_dates(rng)
+    params = {'search': term, 'check_in': check_in, 'check_out': check_out, 'guests': rng.randint(1, 3)}
+    response = await user.call('GET', f'/api/hotels/?{urlencode(params)}', name='GET /api/hotels/?search')
+    if response is not None and response.status == 200:
+        results = response.json()['results']
+        catalog.remember(results)
+        if results:
+            await open_hotel(user, rng.choice(results)['id'])
+
+
+@journey(weight=10, auth=True)
+async def login(user: 'VirtualUser') -> None:
+    """Вход (JWT) и загрузка текущего пользователя, как в base.html"""
+    if await user.login():
+        await user.call('GET', '/api/auth/current-user/', auth=True)
+
+
+@journey(weight=10, auth=True)
+async def favorites(user: 'VirtualUser') -> None:
+    """Кнопка "в избранное" на карточке: список, добавление, удаление"""
+    if not await user.ensure_login():
+        return
+    await user.call('GET', '/api/favorites/', auth=True)
+    response = await user.call(
+        'POST', '/api/favorites/', json_body={'hotel': user.catalog.hotel(user.rng)},
+        auth=True, expect=(201, 400),
+    )
+    if response is not None and response.status == 201:
+        await user.call(
+            'DELETE', f'/api/favorites/{response.json()["id"]}/', name='DELETE /api/favorites/<id>/',
+            auth=True, expect=(204,),
+        )
+
+
+@journey(weight=10, auth=True)
+async def booking(user: 'VirtualUser') -> None:
+    """Бронирование с карточки отеля и его отмена из профиля"""
+    if not await user.ensure_login():
+        return
+    hotel = await open_hotel(user, user.catalog.hotel(user.rng))
+    if hotel is None:
+        return
+    check_in, check_out = stay_dates(user.rng)
+    payload = {
+        'hotel': hotel['id'],
+        'check_in': check_in.isoformat(),
+        'check_out': check_out.isoformat(),
+        'guests': user.rng.randint(1, 2),
+    }
+    # 400 - нет свободных номеров на даты: штатный ответ, не ошибка
+    response = await user.call('POST', '/api/bookings/', json_body=payload, auth=True, expect=(201, 400))
+    await user.call('GET', '/api/bookings/', auth=True)
+    if response is not None and response.status == 201:
+        await user.call(
+            'DELETE', f'/api/bookings/{response.json()["id"]}/', name='DELETE /api/bookings/<id>/',
+            auth=True, expect=(204,),
+        )
+
+
+@journey(weight=5, auth=True)
+async def profile(user: 'VirtualUser') -> None:
+    """Личный кабинет (profile.html): пользователь, брони, избранное, отзывы"""
+    if not await user.ensure_login():
+        return
+    response = await user.call('GET', '/api/auth/current-user/', auth=True)
+    await user.call('GET', '/api/bookings/', auth=True)
+    await user.call('GET', '/api/favorites/', auth=True)
+    if response is not None and response.status == 200:
+        username = response.json()['username']
+        await user.call(
+            'GET', f'/api/reviews/?{urlencode({"user": username})}', name='GET /api/reviews/?user',
+            auth=True,
+        )
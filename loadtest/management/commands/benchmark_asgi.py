@@ -0,0 +1,82 @@
+import json
+from typing import Any, Dict, List
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from hotels.models import Hotel
+from loadtest.inprocess import MODES, db_latency, measure
+
+
+class Command(BaseCommand):
+    """
+    Синхронный и асинхронный путь каталога в одном процессе (см.
+    loadtest/inprocess.py): RPS, латентность, пик потоков и память на
+    запрос в обработке при одинаковой конкурентности. Нужен каталог в базе
+    (seed_scale или фикстуры).
+    """
+
+    help = 'Сравнивает WSGI и ASGI (async ORM) для публичного каталога'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            action='append',
+            help='Одновременных запросов (можно несколько раз). По умолчанию: 1, 8 и 32'
+        )
+        parser.add_argument('--requests', type=int, default=300, help='Запросов на уровень')
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=0.0,
+            help='Добавить задержку к каждому SQL, мс (сеть до базы)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Без кеша ответов и версий (DummyCache): каждый запрос идет в базу'
+        )
+        parser.add_argument('--mode', choices=MODES, action='append', help='Только этот путь')
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+
+    def get_urls(self) -> List[str]:
+        hotel_ids = list(Hotel.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        if not hotel_ids:
+            raise CommandError('Каталог пуст: загрузите данные (seed_scale или loaddata)')
+        return [
+            '/api/hotels/', '/api/hotels/?page=2', '/api/hotels/?sort_by=rating_desc',
+            *(f'/api/hotels/{pk}/' for pk in hotel_ids),
+            '/api/countries/', '/api/cities/',
+        ]
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        urls = self.get_urls()
+        levels = options['concurrency'] or [1, 8, 32]
+        modes = options['mode'] or MODES
+        caches = (
+            {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+            if options['no_cache'] else None
+        )
+        results: List[Dict[str, Any]] = []
+        with override_settings(CACHES=caches) if caches else override_settings():
+            cache.clear()
+            with db_latency(options['db_latency'] / 1000):
+                for concurrency in levels:
+                    for mode in modes:
+                        results.append(measure(mode, urls, concurrency, options['requests']))
+                        self.print_row(results[-1])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def print_row(self, row: Dict[str, Any]) -> None:
+        latency = row['latency_ms']
+        self.stdout.write(
+            f'{row["mode"]:<5} x{row["concurrency"]:<4} {row["rps"]:>8.1f} RPS  '
+            f'p50 {latency["p50"]:>7.1f}  p95 {latency["p95"]:>7.1f} мс  '
+            f'потоков {row["peak_threads"]:>4}  {row["kib_per_request"]:>7.1f} КиБ/запрос  '
+            f'ошибок {row["errors"]}'
+        )
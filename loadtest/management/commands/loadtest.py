@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from hotels.management.commands.seed_scale import SEED_PASSWORD
+from loadtest.journeys import JOURNEYS
+from loadtest.runner import compare, run_load
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный прогон API по сценариям фронтенда (см. loadtest/journeys.py)
+    с отчетом RPS и p50/p95/p99. Учетные записи берутся из базы - это
+    пользователи, созданные seed_scale (общий пароль). Отчет можно сохранить
+    как базовую линию и сравнивать с ней следующие прогоны: при регрессии
+    больше --threshold команда завершается с ошибкой (удобно для CI).
+    """
+
+    help = 'Нагрузочный тест API: RPS, перцентили латентности, сравнение с базовой линией'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Одновременных виртуальных пользователей (соединений)'
+        )
+        parser.add_argument('--duration', type=float, default=30.0, help='Длительность замера, сек')
+        parser.add_argument('--warmup', type=float, default=5.0, help='Прогрев без записи, сек')
+        parser.add_argument(
+            '--think',
+            type=float,
+            default=0.0,
+            help='Средняя пауза пользователя между сценариями, сек (0 - без пауз)'
+        )
+        parser.add_argument(
+            '--journey',
+            action='append',
+            metavar='NAME=WEIGHT',
+            help='Вес сценария (можно несколько раз; 0 отключает). '
+                 f'Сценарии: {", ".join(f"{j.name}={j.weight:g}" for j in JOURNEYS.values())}'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Префикс пользователей seed_scale, под которыми выполняется вход'
+        )
+        parser.add_argument('--password', default=SEED_PASSWORD, help='Пароль этих пользователей')
+        parser.add_argument(
+            '--accounts',
+            type=int,
+            default=None,
+            help='Сколько учетных записей использовать (по умолчанию - по одной на пользователя)'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Зерно выбора сценариев')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Таймаут запроса, сек')
+        parser.add_argument('--output', help='Сохранить отчет в JSON')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Сохранить отчет как базовую линию')
+        parser.add_argument('--baseline', metavar='PATH', help='Сравнить с базовой линией')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Допустимое ухудшение RPS и p95/p99 относительно базовой линии, %%'
+        )
+        parser.add_argument(
+            '--start-server',
+            action='store_true',
+            help='Запустить локальный сервер (runserver --noreload) на адресе --url на время прогона'
+        )
+
+    @staticmethod
+    def parse_weights(values: Optional[List[str]]) -> Optional[Dict[str, float]]:
+        if not values:
+            return None
+        weights = {name: journey.weight for name, journey in JOURNEYS.items()}
+        for value in values:
+            name, _, weight = value.partition('=')
+            if name not in JOURNEYS:
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Неверный вес: {value}')
+        weights = {name: weight for name, weight in weights.items() if weight > 0}
+        if not weights:
+            raise CommandError('Все сценарии отключены')
+        return weights
+
+    def get_credentials(self, prefix: str, password: str, count: int) -> List[Tuple[str, str]]:
+        usernames = get_user_model()._default_manager.filter(
+            username__startswith=f'{prefix}-'
+        ).order_by('pk').values_list('username', flat=True)[:count]
+        return [(username, password) for username in usernames]
+
+    def start_server(self, url: str) -> subprocess.Popen:
+        parts = urlsplit(url)
+        host, port = parts.hostname or '127.0.0.1', parts.port or 80
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'runserver',
+             '--noreload', f'{host}:{port}'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Сервер не запустился (код {process.returncode})')
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'Сервер не начал принимать соединения на {host}:{port}')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        weights = self.parse_weights(options['journey'])
+        credentials = self.get_credentials(
+            options['prefix'], options['password'], options['accounts'] or options['users']
+        )
+        if not credentials:
+            self.stderr.write(
+                f"Нет пользователей {options['prefix']}-*: сценарии со входом пропускаются"
+            )
+
+        server = self.start_server(options['url']) if options['start_server'] else None
+        try:
+            report = asyncio.run(run_load(
+                options['url'],
+                users=options['users'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                weights=weights,
+                credentials=credentials,
+                think=options['think'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            ))
+        except (OSError, RuntimeError) as error:
+            raise CommandError(f'Прогон не выполнен: {error}')
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        self.print_report(report)
+        if not report['requests']:
+            raise CommandError('За время замера не завершилось ни одного запроса')
+        for path in (options['output'], options['save_baseline']):
+            if path:
+                with open(path, 'w', encoding='utf-8') as file:
+                    json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            problems = compare(baseline, report, options['threshold'])
+            if problems:
+                for problem in problems:
+                    self.stderr.write(f'  {problem}')
+                raise CommandError(f'Регрессия относительно {options["baseline"]}: {len(problems)}')
+            self.stdout.write(self.style.SUCCESS(f'Регрессий относительно {options["baseline"]} нет'))
+
+    def print_report(self, report: Dict[str, Any]) -> None:
+        header = f'{"Эндпоинт":<38} {"запр.":>7} {"RPS":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"ошибки":>7}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['endpoints'].items()) + [('Итого', report)]
+        for name, row in rows:
+            latency = row['latency_ms']
+            self.stdout.write(
+                f'{name:<38} {row["requests"]:>7} {row["rps"]:>8.1f} {latency["p50"]:>8.1f} '
+                f'{latency["p95"]:>8.1f} {latency["p99"]:>8.1f} {row["errors"]:>7}'
+            )
+        self.stdout.write(
+            f'Сценарии: {", ".join(f"{name}={count}" for name, count in report["journeys"].items())}; '
+            f'латентность в мс, замер {report["duration"]} с'
+        )
@@ -0,0 +1,251 @@
+"""
+Генератор нагрузки: N виртуальных пользователей (корутины) в цикле выбирают
+сценарий по весам и выполняют его, каждый на своем keep-alive соединении.
+Модель замкнутая: следующий запрос пользователь шлет после ответа на
+предыдущий (плюс пауза --think), поэтому RPS - это пропускная способность
+сервера при заданной конкурентности.
+
+Отчет - словарь, который сохраняется как JSON-базовая линия:
+
+    {'rps': 812.4, 'requests': 24372, 'errors': 0, 'error_rate': 0.0,
+     'latency_ms': {'p50': 9.1, 'p95': 31.0, 'p99': 55.2, 'max': 120.3},
+     'endpoints': {'GET /api/hotels/': {'requests': ..., 'rps': ..., 'latency_ms': {...}}},
+     'journeys': {'browse': 11203, ...}, 'meta': {...}}
+"""
+import asyncio
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .client import HTTPClient, Response
+from .journeys import JOURNEYS, Catalog, Expected
+
+PERCENTILES = (50, 95, 99)
+# p99 по нескольким десяткам запросов - это почти максимум, сравнивать бессмысленно
+MIN_ENDPOINT_REQUESTS = 50
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Перцентиль методом ближайшего ранга (values отсортированы)"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    summary = {f'p{p}': round(percentile(values, p) * 1000, 2) for p in PERCENTILES}
+    summary['max'] = round(values[-1] * 1000, 2) if values else 0.0
+    return summary
+
+
+class Stats:
+    """Латентности и ошибки по эндпоинтам (только после прогрева)"""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.journeys: Counter = Counter()
+        self.recording = False
+        self.started = 0.0
+        self.finished = 0.0
+
+    def start(self) -> None:
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording = False
+        self.finished = time.perf_counter()
+
+    def record(self, name: str, elapsed: float, status: Optional[int], ok: bool) -> None:
+        if not self.recording:
+            return
+        self.latencies[name].append(elapsed)
+        self.statuses[name][str(status) if status is not None else 'error'] += 1
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self) -> Dict[str, Any]:
+        duration = max(self.finished - self.started, 1e-9)
+        everything = [value for values in self.latencies.values() for value in values]
+        total = len(everything)
+        errors = sum(self.errors.values())
+        return {
+            'duration': round(duration, 2),
+            'requests': total,
+            'rps': round(total / duration, 1),
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'latency_ms': summarize(everything),
+            'endpoints': {
+                name: {
+                    'requests': len(values),
+                    'rps': round(len(values) / duration, 1),
+                    'errors': self.errors[name],
+                    'statuses': dict(self.statuses[name]),
+                    'latency_ms': summarize(values),
+                }
+                for name, values in sorted(self.latencies.items())
+            },
+            'journeys': dict(self.journeys),
+        }
+
+
+class VirtualUser:
+    """Пользователь сценария: соединение, JWT-токен и учетные данные"""
+
+    def __init__(self, base_url: str, stats: Stats, catalog: Catalog, rng: random.Random,
+                 credentials: Optional[Tuple[str, str]], timeout: float) -> None:
+        self.client = HTTPClient(base_url, timeout=timeout)
+        self.stats = stats
+        self.catalog = catalog
+        self.rng = rng
+        self.credentials = credentials
+        self.token: Optional[str] = None
+
+    async def call(
+        self,
+        method: str,
+        path: str,
+        name: Optional[str] = None,
+        json_body: Any = None,
+        auth: bool = False,
+        expect: Expected = (200,),
+    ) -> Optional[Response]:
+        """
+        Запрос с замером. name - метка эндпоинта в отчете (без id: 'GET /api/hotels/<id>/').
+        Ответ вне expect считается ошибкой; None - сетевая ошибка или таймаут.
+        """
+        headers = {'Authorization': f'Bearer {self.token}'} if auth and self.token else None
+        name = name or f'{method} {path.split("?")[0]}'
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, json_body=json_body, headers=headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            self.stats.record(name, time.perf_counter() - started, None, False)
+            return None
+        self.stats.record(name, time.perf_counter() - started, response.status, response.status in expect)
+        return response
+
+    async def login(self) -> bool:
+        """Вход как во фронтенде: JWT-пара по логину и паролю"""
+        if self.credentials is None:
+            return False
+        username, password = self.credentials
+        response = await self.call(
+            'POST', '/api/auth/token/', json_body={'username': username, 'password': password}
+        )
+        if response is None or response.status != 200:
+            self.token = None
+            return False
+        self.token = response.json()['access']
+        return True
+
+    async def ensure_login(self) -> bool:
+        return self.token is not None or await self.login()
+
+
+def pick_journey(rng: random.Random, weights: Dict[str, float]) -> str:
+    names = list(weights)
+    return rng.choices(names, weights=[weights[name] for name in names])[0]
+
+
+async def user_loop(user: VirtualUser, weights: Dict[str, float], think: float, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        name = pick_journey(user.rng, weights)
+        if user.stats.recording:
+            user.stats.journeys[name] += 1
+        await JOURNEYS[name].run(user)
+        if think:
+            # экспоненциальная пауза со средним think
+            await asyncio.sleep(user.rng.expovariate(1 / think))
+    await user.client.close()
+
+
+async def run_load(
+    base_url: str,
+    users: int,
+    duration: float,
+    warmup: float = 0.0,
+    weights: Optional[Dict[str, float]] = None,
+    credentials: Sequence[Tuple[str, str]] = (),
+    think: float = 0.0,
+    seed: int = 1,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Прогнать нагрузку и вернуть отчет (см. docstring модуля)"""
+    weights = weights or {name: journey.weight for name, journey in JOURNEYS.items()}
+    if not credentials:
+        # без пользователей сценарии с авторизацией не выполнить
+        weights = {name: weight for name, weight in weights.items() if not JOURNEYS[name].auth}
+    stats = Stats()
+    catalog = Catalog()
+    bootstrap = VirtualUser(base_url, stats, catalog, random.Random(seed), None, timeout)
+    await catalog.load(bootstrap)
+    await bootstrap.client.close()
+
+    loop_started = time.perf_counter()
+    deadline = loop_started + warmup + duration
+    virtual_users = [
+        VirtualUser(
+            base_url, stats, catalog, random.Random(f'{seed}:{index}'),
+            credentials[index % len(credentials)] if credentials else None, timeout,
+        )
+        for index in range(users)
+    ]
+    tasks = [asyncio.create_task(user_loop(user, weights, think, deadline)) for user in virtual_users]
+    await asyncio.sleep(warmup)
+    stats.start()
+    await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+    stats.stop()
+    # сценарии, начатые до дедлайна, доигрываются без записи
+    await asyncio.gather(*tasks)
+
+    report = stats.report()
+    report['meta'] = {
+        'url': base_url,
+        'users': users,
+        'warmup': warmup,
+        'think': think,
+        'seed': seed,
+        'weights': weights,
+    }
+    return report
+
+
+def compare(
+    baseline: Dict[str, Any],
+    report: Dict[str, Any],
+    threshold: float,
+    min_delta_ms: float = 2.0,
+) -> List[str]:
+    """
+    Регрессии относительно базовой линии: падение RPS или рост p95/p99
+    (в целом и по эндпоинтам) больше threshold процентов, рост доли ошибок.
+    Изменения латентности меньше min_delta_ms игнорируются - на быстрых
+    эндпоинтах это шум, как и эндпоинты с малым числом запросов.
+    """
+    problems: List[str] = []
+    limit = 1 + threshold / 100
+
+    if report['rps'] * limit < baseline['rps']:
+        problems.append(f"RPS: {report['rps']} < {baseline['rps']} (-{threshold:g}%)")
+    if report['error_rate'] > baseline['error_rate'] + 0.01:
+        problems.append(f"Доля ошибок: {report['error_rate']:.2%} > {baseline['error_rate']:.2%}")
+
+    def latency(name: str, old: Dict[str, float], new: Dict[str, float]) -> None:
+        for key in ('p95', 'p99'):
+            if new[key] > old[key] * limit and new[key] - old[key] >= min_delta_ms:
+                problems.append(f'{name} {key}: {new[key]} мс > {old[key]} мс (+{threshold:g}%)')
+
+    latency('Все запросы', baseline['latency_ms'], report['latency_ms'])
+    for name, old in baseline.get('endpoints', {}).items():
+        new = report['endpoints'].get(name)
+        if new is not None and min(old['requests'], new['requests']) >= MIN_ENDPOINT_REQUESTS:
+            latency(name, old['latency_ms'], new['latency_ms'])
+    return problems
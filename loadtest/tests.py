@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, SimpleTestCase, TransactionTestCase
+
+from hotels.management.commands.seed_scale import SEED_PASSWORD
+
+from .runner import compare, percentile, run_load, summarize
+
+
+def make_report(rps, p95, requests=100, error_rate=0.0):
+    latency = {'p50': p95 / 2, 'p95': p95, 'p99': p95 * 1.5, 'max': p95 * 2}
+    return {
+        'rps': rps, 'error_rate': error_rate, 'latency_ms': latency,
+        'endpoints': {'GET /api/hotels/': {'requests': requests, 'latency_ms': latency}},
+    }
+
+
+class StatsTest(SimpleTestCase):
+    def test_percentiles(self):
+        values = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 0.05)
+        self.assertEqual(percentile(values, 99), 0.099)
+        self.assertEqual(summarize(values), {'p50': 50.0, 'p95': 95.0, 'p99': 99.0, 'max': 100.0})
+        self.assertEqual(summarize([])['p95'], 0.0)
+
+    def test_compare_with_baseline(self):
+        baseline = make_report(rps=100, p95=50)
+        self.assertEqual(compare(baseline, make_report(rps=95, p95=54), threshold=10), [])
+        problems = compare(baseline, make_report(rps=80, p95=70), threshold=10)
+        self.assertEqual(len(problems), 5)  # RPS, p95/p99 в целом и по эндпоинту
+        # шум: малая абсолютная разница и эндпоинты с несколькими запросами
+        self.assertEqual(compare(make_report(100, 1.0), make_report(100, 1.5), threshold=10), [])
+        self.assertEqual(len(compare(
+            make_report(100, 50, requests=10), make_report(100, 80, requests=10), threshold=10
+        )), 2)
+        self.assertTrue(compare(baseline, make_report(100, 50, error_rate=0.05), threshold=10))
+
+
+class LoadRunTest(LiveServerTestCase):
+    def setUp(self):
+        call_command(
+            'seed_scale', hotels=20, cities=4, countries=2, users=3,
+            reviews=40, bookings=5, favorites=5, stdout=StringIO(),
+        )
+
+    def test_journeys_run_against_live_server(self):
+        credentials = [
+            (username, SEED_PASSWORD)
+            for username in get_user_model().objects.values_list('username', flat=True)
+        ]
+        report = asyncio.run(run_load(
+            self.live_server_url, users=3, duration=1.5, credentials=credentials, seed=3,
+        ))
+        self.assertGreater(report['requests'], 0)
+        self.assertEqual(report['errors'], 0, report['endpoints'])
+        self.assertIn('GET /api/hotels/<id>/', report['endpoints'])
+        self.assertEqual(report['meta']['users'], 3)
+        # созданное сценариями удалено
+        from hotels.models import Booking, Favorite
+        self.assertEqual(Booking.objects.count(), 5)
+        self.assertEqual(Favorite.objects.count(), 5)
+
+    def test_command_fails_on_regression(self):
+        directory = tempfile.mkdtemp()
+        baseline = os.path.join(directory, 'baseline.json')
+        options = {
+            'url': self.live_server_url, 'users': 2, 'duration': 1.5, 'warmup': 0,
+            'journey': ['browse=1', 'search=0'], 'stdout': StringIO(), 'stderr': StringIO(),
+        }
+        call_command('loadtest', save_baseline=baseline, **options)
+        with open(baseline, encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertEqual(set(report['meta']['weights']), {'browse', 'login', 'favorites', 'booking', 'profile'})
+
+        self.assertGreater(report['requests'], 0)
+        report['rps'] *= 100
+        with open(baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+        with self.assertRaises(CommandError):
+            call_command('loadtest', baseline=baseline, **options)
+
+
+class InProcessBenchmarkTest(TransactionTestCase):
+    def test_wsgi_and_asgi_paths(self):
+        call_command('seed_scale', hotels=20, cities=4, countries=2, users=1, reviews=20, stdout=StringIO())
+        output = os.path.join(tempfile.mkdtemp(), 'asgi.json')
+        call_command('benchmark_asgi', concurrency=[4], requests=16, output=output, stdout=StringIO())
+        with open(output, encoding='utf-8') as file:
+            results = json.load(file)
+        self.assertEqual([row['mode'] for row in results], ['wsgi', 'asgi'])
+        for row in results:
+            self.assertEqual(row['errors'], 0, row)
+            self.assertGreater(row['rps'], 0)
+            self.assertGreaterEqual(row['peak_threads'], 4)
+            self.assertGreater(row['kib_per_request'], 0)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'metrics'
+    verbose_name = 'Метрики запросов'
+
+    def ready(self) -> None:
+        from .timing import install_query_timing, install_serializer_timing
+        install_query_timing()
+        install_serializer_timing()
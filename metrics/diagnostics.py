@@ -0,0 +1,163 @@
+"""
+Диагностика SQL в запросах: медленные запросы и вероятные N+1.
+
+- Медленный запрос (дольше SQL_SLOW_QUERY_MS) проверяется в каждом
+  запросе: время и так замеряется, форма SQL и место вызова вычисляются
+  только для медленных.
+- N+1 ищется в доле запросов SQL_DIAGNOSTICS_SAMPLE_RATE: для каждого SQL
+  считается форма (литералы заменены на ?), и форма, повторившаяся
+  SQL_N_PLUS_ONE_THRESHOLD раз, попадает в отчет. Стек разбирается один
+  раз на форму - при достижении порога.
+
+Место вызова - ближайший кадр кода проекта (HotelListSerializer.get_main_image)
+или объекта проекта, из которого вызван код Django/DRF: поле сериализатора
+с source='hotel.city.name' (FavoriteSerializer.hotel_city), ленивый queryset,
+выполненный в ListModelMixin.list (FavoriteViewSet.list).
+
+События пишутся JSON-строками в логгер metrics.diagnostics:
+
+    {"event": "n_plus_one", "view": "favorites", "method": "GET", "path": "/api/favorites/",
+     "shape": "SELECT ... WHERE \\"hotels_city\\".\\"id\\" = ? LIMIT ?", "count": 30,
+     "duration_ms": 12.4, "origin": "FavoriteSerializer.hotel_city", "location": null, ...}
+"""
+import json
+import logging
+import random
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+SAVEPOINT_RE = re.compile(r'"s\d+_x\d+"')
+LIST_RE = re.compile(r'\(\?(?:, \?)+\)')
+# кадры, которые не считаются местом вызова
+SKIP_MODULES = {__name__, 'metrics.timing', 'metrics.middleware'}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Форма запроса: параметры (%s), строки и числа -> ?, списки IN (?, ?, ...) -> (?, ...).
+    Принимает и SQL до подстановки параметров (execute_wrapper), и после (connection.queries).
+    """
+    sql = sql.replace('%s', '?')
+    sql = STRING_RE.sub('?', sql)
+    sql = SAVEPOINT_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return LIST_RE.sub('(?, ...)', sql)
+
+
+@lru_cache(maxsize=1)
+def project_packages() -> FrozenSet[str]:
+    """Пакеты проекта: приложения из BASE_DIR и пакет настроек"""
+    base = str(settings.BASE_DIR)
+    packages = {
+        config.name.split('.')[0] for config in apps.get_app_configs() if config.path.startswith(base)
+    }
+    packages.add(settings.ROOT_URLCONF.split('.')[0])
+    return frozenset(packages)
+
+
+def is_project(module: str) -> bool:
+    return module.split('.')[0] in project_packages() and module not in SKIP_MODULES
+
+
+def find_origin(frame) -> Dict[str, Optional[str]]:
+    """Ближайшее к SQL место в коде проекта (см. docstring модуля)"""
+    base = str(settings.BASE_DIR).rstrip('/') + '/'
+    while frame is not None:
+        code = frame.f_code
+        if is_project(frame.f_globals.get('__name__', '')):
+            return {
+                'origin': getattr(code, 'co_qualname', code.co_name),
+                'location': f'{code.co_filename.removeprefix(base)}:{frame.f_lineno}',
+            }
+        owner = frame.f_locals.get('self') if 'self' in code.co_varnames else None
+        if owner is not None:
+            parent = getattr(owner, 'parent', None)
+            field_name = getattr(owner, 'field_name', None)
+            if field_name and parent is not None and is_project(type(parent).__module__):
+                # поле сериализатора DRF (source='hotel.city.name')
+                return {'origin': f'{type(parent).__name__}.{field_name}', 'location': None}
+            if is_project(type(owner).__module__):
+                return {'origin': f'{type(owner).__name__}.{code.co_name}', 'location': None}
+        frame = frame.f_back
+    return {'origin': None, 'location': None}
+
+
+class QueryDiagnostics:
+    """Медленные и повторяющиеся запросы одного HTTP-запроса"""
+
+    def __init__(self, slow_threshold: Optional[float], repeat_threshold: Optional[int]) -> None:
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.slow: List[Dict[str, Any]] = []
+        # форма -> [количество, время]
+        self.shapes: Dict[str, List[float]] = {}
+        self.origins: Dict[str, Dict[str, Optional[str]]] = {}
+
+    @classmethod
+    def for_request(cls) -> Optional['QueryDiagnostics']:
+        """Диагностика по настройкам; None - для этого запроса выключена"""
+        slow_ms = settings.SQL_SLOW_QUERY_MS
+        rate = settings.SQL_DIAGNOSTICS_SAMPLE_RATE
+        sampled = rate > 0 and (rate >= 1 or random.random() < rate)
+        if not slow_ms and not sampled:
+            return None
+        return cls(
+            slow_ms / 1000 if slow_ms else None,
+            settings.SQL_N_PLUS_ONE_THRESHOLD if sampled else None,
+        )
+
+    def query(self, sql: str, elapsed: float) -> None:
+        shape = None
+        if self.repeat_threshold:
+            shape = normalize_sql(sql)
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = [0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            if stats[0] == self.repeat_threshold:
+                self.origins[shape] = find_origin(sys._getframe(2))
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self.slow.append({
+                'event': 'slow_query',
+                'shape': shape or normalize_sql(sql),
+                'duration_ms': round(elapsed * 1000, 2),
+                **find_origin(sys._getframe(2)),
+            })
+
+    def events(self) -> List[Dict[str, Any]]:
+        events = list(self.slow)
+        for shape, origin in self.origins.items():
+            count, elapsed = self.shapes[shape]
+            events.append({
+                'event': 'n_plus_one',
+                'shape': shape,
+                'count': count,
+                'duration_ms': round(elapsed * 1000, 2),
+                **origin,
+            })
+        return events
+
+    def report(self, request, view: str, status: int) -> List[Dict[str, Any]]:
+        """Записать события в лог (JSON lines) с данными запроса"""
+        events = self.events()
+        context = {
+            'ts': timezone.now().isoformat(),
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+        }
+        for event in events:
+            logger.warning(json.dumps({'event': event['event'], **context, **event}, ensure_ascii=False))
+        return events
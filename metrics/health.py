@@ -0,0 +1,53 @@
+"""
+Проверки для оркестратора (healthcheck docker compose, пробы Kubernetes):
+- /healthz (живость): процесс отвечает и база принимает соединения;
+- /readyz (готовность): то же плюс применены все миграции - новый
+  контейнер не получает трафик, пока migrate_if_needed не закончил.
+Обе проверки - SELECT 1; граф миграций читается только до первого
+успешного /readyz в процессе.
+"""
+from typing import Dict, Optional
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# миграции уже были применены: без повторного чтения графа
+migrated = False
+
+
+def check_database(alias: str = DEFAULT_DB_ALIAS) -> Optional[str]:
+    """None - база отвечает, иначе класс ошибки"""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as error:
+        return type(error).__name__
+    return None
+
+
+def pending_migrations(alias: str = DEFAULT_DB_ALIAS) -> list:
+    """Неприменённые миграции (app_label, name) по порядку применения"""
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [(migration.app_label, migration.name) for migration, _ in plan]
+
+
+def liveness() -> Dict[str, str]:
+    error = check_database()
+    return {'status': 'ok'} if error is None else {'status': 'error', 'database': error}
+
+
+def readiness() -> Dict[str, str]:
+    global migrated
+    checks = liveness()
+    if checks['status'] != 'ok' or migrated:
+        return checks
+    try:
+        pending = pending_migrations()
+    except DatabaseError as error:
+        return {'status': 'error', 'database': type(error).__name__}
+    if pending:
+        return {'status': 'error', 'migrations': f'{len(pending)} pending'}
+    migrated = True
+    return checks
@@ -0,0 +1,45 @@
+import time
+from typing import Any
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from metrics.health import pending_migrations
+
+
+class Command(BaseCommand):
+    """
+    Шаг перед запуском сервера (entrypoint.sh) в одном процессе Django:
+    дождаться базы, затем migrate - только если есть неприменённые
+    миграции. Обычный рестарт контейнера обходится одним чтением графа
+    миграций вместо нескольких запусков migrate.
+    """
+
+    help = 'Дождаться базы и применить миграции, если есть неприменённые'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--timeout', type=float, default=60, help='Сколько ждать базу, секунд')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        alias = options['database']
+        self.wait_for_database(alias, options['timeout'])
+        pending = pending_migrations(alias)
+        if not pending:
+            self.stdout.write('Неприменённых миграций нет')
+            return
+        self.stdout.write(f'Неприменённых миграций: {len(pending)}')
+        call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+
+    def wait_for_database(self, alias: str, timeout: float) -> None:
+        connection = connections[alias]
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                connection.ensure_connection()
+                return
+            except OperationalError as error:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f'База недоступна {timeout:g} с: {error}')
+                time.sleep(0.2)
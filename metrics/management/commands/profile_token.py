@@ -0,0 +1,22 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from metrics.profiling import make_token
+
+
+class Command(BaseCommand):
+    """
+    Подписанный токен для профилирования запроса в проде:
+
+        curl -H "X-Profile-Token: $(python manage.py profile_token)" https://.../api/hotels/
+
+    Профиль появится в админке (/admin/profiles/), его id - в заголовке X-Profile-Id.
+    """
+
+    help = 'Токен для заголовка X-Profile-Token (профилирование запроса)'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.stdout.write(make_token())
+        self.stderr.write(f'Действует {settings.PROFILE_TOKEN_MAX_AGE} с')
@@ -0,0 +1,79 @@
+import time
+from typing import Any, Callable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .diagnostics import QueryDiagnostics
+from .registry import record_request, registry
+from .timing import RequestTiming, current_timing
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеряет запрос: полное время, число и время SQL-запросов, время
+    сериализации и размер ответа. Отдает их в заголовке Server-Timing
+    (видно во вкладке Network браузера) и добавляет в гистограммы по имени
+    маршрута ('hotel-list', 'bookings', 'token_obtain_pair', ...) -
+    метки не зависят от id в URL. Ставится первым в MIDDLEWARE, чтобы
+    учитывать время остальных middleware. Медленные запросы и N+1 - см.
+    metrics/diagnostics.py. Работает и под ASGI без перехода в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming(QueryDiagnostics.for_request())
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing, time.perf_counter() - started)
+
+    async def __acall__(self, request) -> Any:
+        timing = RequestTiming(QueryDiagnostics.for_request())
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing, time.perf_counter() - started)
+
+    def finish(self, request, response, timing: RequestTiming, total: float) -> Any:
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timing.server_timing(total)
+        view = self.view_name(request)
+        if timing.diagnostics is not None:
+            for event in timing.diagnostics.report(request, view, response.status_code):
+                registry.inc(f"sql_{event['event']}_total", (('view', view),))
+        record_request(
+            view, request.method, response.status_code, total,
+            timing.queries, timing.db, timing.serialize, self.response_size(response),
+        )
+        return response
+
+    @staticmethod
+    def view_name(request) -> str:
+        """Имя маршрута; нераспознанные пути (404) - одной меткой, чтобы не плодить серии"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.url_name or match.view_name or 'unnamed'
+
+    @staticmethod
+    def response_size(response) -> Optional[int]:
+        if not response.streaming:
+            return len(response.content)
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
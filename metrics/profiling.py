@@ -0,0 +1,276 @@
+"""
+Профилирование отдельных запросов в проде - по запросу.
+
+Запрос профилируется, если:
+- у него заголовок X-Profile-Token с подписанным токеном
+  (manage.py profile_token, действует PROFILE_TOKEN_MAX_AGE секунд);
+- или маршрут есть в PROFILE_SAMPLE_RATES ({'hotel-list': 0.01}) и
+  выпала доля.
+
+Во время профилирования работают cProfile (точное число вызовов и
+собственное время функций) и поток, снимающий стек запроса каждые
+PROFILE_SAMPLE_INTERVAL секунд (реальное время, включая ожидание базы).
+Результат - три файла в PROFILE_DIR: <id>.pstats (pstats / snakeviz),
+<id>.folded (свернутые стеки для flamegraph.pl / speedscope) и <id>.json
+с описанием запроса. Хранятся последние PROFILE_MAX_PROFILES профилей.
+Одновременно профилируется один запрос на процесс: cProfile не допускает
+двух активных профилировщиков.
+
+Выключенный хук (нет заголовка, PROFILE_SAMPLE_RATES пуст) - это одна
+проверка словаря в process_view.
+"""
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'metrics.profiling'
+TOKEN_VALUE = 'profile'
+EXTENSIONS = ('.pstats', '.folded', '.json')
+
+# один профилировщик на процесс
+active = threading.Lock()
+
+
+def make_token() -> str:
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(token: str) -> bool:
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def frame_label(code) -> str:
+    filename = code.co_filename
+    base = str(settings.BASE_DIR).rstrip('/') + '/'
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    else:
+        # site-packages/django/db/... -> django/db/...
+        marker = filename.rfind('-packages/')
+        filename = filename[marker + len('-packages/'):] if marker >= 0 else os.path.basename(filename)
+    return f'{getattr(code, "co_qualname", code.co_name)} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока target раз в interval секунд (свернутые стеки)"""
+
+    def __init__(self, target: int, interval: float) -> None:
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target = target
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            labels: List[str] = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+    def folded(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """cProfile и сэмплер стеков на время одного запроса"""
+
+    def __init__(self, trigger: str) -> None:
+        self.trigger = trigger
+        self.id = f'{timezone.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}'
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        # ValueError, если активен другой профилировщик (coverage, отладчик)
+        self.profiler.enable()
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+
+    def save(self, request, view: str, status: int) -> str:
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.id)
+        self.profiler.dump_stats(f'{path}.pstats')
+        with open(f'{path}.folded', 'w', encoding='utf-8') as file:
+            file.write(self.sampler.folded())
+        meta = {
+            'id': self.id,
+            'created': timezone.now().isoformat(),
+            'view': view,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': status,
+            'duration_ms': round(self.duration * 1000, 2),
+            'samples': sum(self.sampler.stacks.values()),
+            'trigger': self.trigger,
+            'pid': os.getpid(),
+        }
+        # .json пишется последним: по нему профиль считается готовым
+        with open(f'{path}.json', 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False)
+        prune(directory, settings.PROFILE_MAX_PROFILES)
+        return self.id
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Описания сохраненных профилей, от новых к старым"""
+    directory = settings.PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id: str, extension: str) -> Optional[str]:
+    """Путь к файлу профиля; None - нет такого (id проверяется, без выхода из каталога)"""
+    if extension not in EXTENSIONS or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f'{profile_id}{extension}')
+    return path if os.path.isfile(path) else None
+
+
+def prune(directory: str, keep: int) -> None:
+    """Кольцевой буфер: удалить все, кроме keep последних профилей (id начинается с времени)"""
+    ids = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in ids[:max(0, len(ids) - keep)]:
+        for extension in EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}{extension}'))
+            except FileNotFoundError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует представление (process_view - после разбора URL, когда
+    известно имя маршрута) и отдачу ответа. Идентификатор профиля
+    возвращается в заголовке X-Profile-Id.
+
+    Под ASGI профилируется поток, в котором Django выполняет синхронный
+    код запроса (sync_to_async с thread_sensitive): синхронные представления
+    DRF и SQL асинхронных. Профилировщик включается и выключается в этом же
+    потоке; запросы без профилирования в поток не переходят.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django оборачивает синхронный process_view в sync_to_async на каждый запрос
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile = self.stop(request)
+        return self.save(request, response, profile) if profile is not None else response
+
+    async def __acall__(self, request) -> Any:
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile = getattr(request, '_profile', None)
+            if profile is not None:
+                await sync_to_async(self.stop)(request)
+        if profile is None:
+            return response
+        return await sync_to_async(self.save)(request, response, profile)
+
+    @staticmethod
+    def stop(request) -> Optional[RequestProfile]:
+        profile: Optional[RequestProfile] = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.stop()
+            active.release()
+        return profile
+
+    @staticmethod
+    def save(request, response, profile: RequestProfile) -> Any:
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        response['X-Profile-Id'] = profile.save(request, view, response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs) -> None:
+        rates = settings.PROFILE_SAMPLE_RATES
+        if HEADER not in request.META and not rates:
+            return None
+        self.start(request, rates)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs) -> None:
+        rates = settings.PROFILE_SAMPLE_RATES
+        if HEADER not in request.META and not rates:
+            return None
+        await sync_to_async(self.start)(request, rates)
+        return None
+
+    def start(self, request, rates: Dict[str, float]) -> None:
+        trigger = self.trigger(request, rates)
+        if trigger is None or not active.acquire(blocking=False):
+            return
+        profile = RequestProfile(trigger)
+        try:
+            profile.start()
+        except ValueError:
+            active.release()
+            return
+        request._profile = profile
+
+    @staticmethod
+    def trigger(request, rates: Dict[str, float]) -> Optional[str]:
+        token = request.META.get(HEADER)
+        if token and valid_token(token):
+            return 'token'
+        rate = rates.get(request.resolver_match.url_name) if rates else None
+        if rate and random.random() < rate:
+            return 'sample'
+        return None
@@ -0,0 +1,193 @@
+"""
+Гистограммы и счетчики запросов в памяти процесса и их вывод в текстовом
+формате Prometheus.
+
+Под gunicorn с несколькими воркерами у каждого процесса своя память, и
+/metrics, попавший в один воркер, видел бы только его долю запросов. Если
+задан METRICS_DIR, каждый процесс не чаще раза в METRICS_FLUSH_INTERVAL
+секунд сохраняет снимок своих метрик в <METRICS_DIR>/<pid>.json (атомарно,
+через os.replace), а /metrics суммирует снимки всех процессов. Файлы
+завершившихся воркеров остаются, поэтому счетчики не уменьшаются при
+перезапуске воркеров; каталог очищается при старте сервера.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# имя -> (описание, границы корзин)
+HISTOGRAMS: Dict[str, Tuple[str, Sequence[float]]] = {
+    'http_request_duration_seconds': ('Полное время обработки запроса', DURATION_BUCKETS),
+    'http_request_db_queries': ('SQL-запросов на запрос', QUERY_BUCKETS),
+    'http_request_db_duration_seconds': ('Время SQL-запросов за запрос', DURATION_BUCKETS),
+    'http_request_serialize_duration_seconds': ('Время сериализации DRF за запрос', DURATION_BUCKETS),
+    'http_response_size_bytes': ('Размер тела ответа', SIZE_BUCKETS),
+}
+COUNTERS: Dict[str, str] = {
+    'http_requests_total': 'Запросы по представлению, методу и коду ответа',
+    'sql_slow_query_total': 'Медленные SQL-запросы (SQL_SLOW_QUERY_MS)',
+    'sql_n_plus_one_total': 'Вероятные N+1 в выборке запросов (SQL_DIAGNOSTICS_SAMPLE_RATE)',
+}
+
+
+class Registry:
+    """Метрики процесса; потокобезопасно"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # (имя, метки) -> [счетчики корзин..., сумма, количество]
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.flushed = 0.0
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.flushed = 0.0
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            series = self.histograms.get((name, labels))
+            if series is None:
+                series = self.histograms[(name, labels)] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def inc(self, name: str, labels: Labels, amount: float = 1) -> None:
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def snapshot(self) -> Dict[str, list]:
+        """Метрики процесса в виде, пригодном для JSON"""
+        with self.lock:
+            return {
+                'histograms': [
+                    [name, [list(pair) for pair in labels], list(series)]
+                    for (name, labels), series in self.histograms.items()
+                ],
+                'counters': [
+                    [name, [list(pair) for pair in labels], value]
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        """Сохранить снимок в METRICS_DIR (не чаще METRICS_FLUSH_INTERVAL без force)"""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        data = self.snapshot()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            with os.fdopen(fd, 'w') as file:
+                json.dump(data, file)
+            os.replace(path, os.path.join(directory, f'{os.getpid()}.json'))
+        except OSError:
+            logger.exception('Не удалось сохранить метрики в %s', directory)
+
+    def collect(self) -> Dict[str, list]:
+        """Метрики всех процессов: свои из памяти, остальные из снимков METRICS_DIR"""
+        snapshots = [self.snapshot()]
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if directory and os.path.isdir(directory):
+            own = f'{os.getpid()}.json'
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.json') or name == own:
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        counters: Dict[Tuple[str, Labels], float] = {}
+        for snapshot in snapshots:
+            for name, labels, series in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                total = histograms.setdefault(key, [0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+        return {'histograms': histograms, 'counters': counters}
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (version 0.0.4)"""
+        collected = self.collect()
+        lines: List[str] = []
+        for name, (description, buckets) in HISTOGRAMS.items():
+            series = sorted(
+                (labels, values) for (metric, labels), values in collected['histograms'].items()
+                if metric == name
+            )
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+            for labels, values in series:
+                for bound, count in zip(list(buckets) + ['+Inf'], values[:-2] + [values[-1]]):
+                    le = bound if bound == '+Inf' else format_number(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {format_number(count)}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_number(values[-2])}')
+                lines.append(f'{name}_count{format_labels(labels)} {format_number(values[-1])}')
+        for name, description in COUNTERS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for (metric, labels), value in sorted(collected['counters'].items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = Registry()
+
+# gunicorn с --preload форкает воркеры из мастера: метрики мастера не наследуем
+os.register_at_fork(after_in_child=registry.reset)
+atexit.register(registry.flush, True)
+
+
+def record_request(view: str, method: str, status: int, total: float, queries: int,
+                   db: float, serialize: float, size: Optional[int]) -> None:
+    labels: Labels = (('view', view), ('method', method))
+    registry.inc('http_requests_total', labels + (('status', str(status)),))
+    registry.observe('http_request_duration_seconds', labels, total)
+    registry.observe('http_request_db_queries', labels, queries)
+    registry.observe('http_request_db_duration_seconds', labels, db)
+    registry.observe('http_request_serialize_duration_seconds', labels, serialize)
+    if size is not None:
+        registry.observe('http_response_size_bytes', labels, size)
+    registry.flush()
@@ -0,0 +1,324 @@
+import json
+import os
+import pstats
+import re
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from hotels.models import City, Country, Hotel
+
+from . import health
+from .diagnostics import normalize_sql
+from .middleware import RequestMetricsMiddleware
+from .profiling import list_profiles, make_token
+from .registry import Registry, registry
+
+User = get_user_model()
+
+def sample(text, name, **labels):
+    """Значение серии из текстового вывода /metrics (None - серии нет)"""
+    for line in text.splitlines():
+        if line.startswith(f'{name}{{') and all(f'{key}="{value}"' in line for key, value in labels.items()):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class RequestMetricsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        country = Country.objects.create(name="Норвегия")
+        city = City.objects.create(name="Берген", country=country)
+        Hotel.objects.bulk_create([
+            Hotel(name=f"Фьорд {i}", description="-", country=country, city=city,
+                  stars=3, address="-", price_per_night=90 + i)
+            for i in range(3)
+        ])
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/hotels/')
+        header = response['Server-Timing']
+        # валидаторы (max updated_at), COUNT и страница отелей
+        self.assertIn('db;dur=', header)
+        self.assertIn('desc="3 queries"', header)
+        self.assertRegex(header, r'serialize;dur=\d+\.\d+')
+        total = float(re.search(r'total;dur=([\d.]+)', header).group(1))
+        db = float(re.search(r'db;dur=([\d.]+)', header).group(1))
+        self.assertGreaterEqual(total, db)
+
+        # ответ из кеша: только валидаторы, без сериализации
+        header = self.client.get('/api/hotels/')['Server-Timing']
+        self.assertIn('desc="1 queries"', header)
+        self.assertIn('serialize;dur=0.00', header)
+
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/countries/'))
+
+    def test_histograms_by_route_name(self):
+        hotel = Hotel.objects.first()
+        self.client.get('/api/hotels/')
+        self.client.get('/api/hotels/')
+        self.client.get(f'/api/hotels/{hotel.pk}/')
+        self.client.get('/api/bookings/')
+        self.client.get('/no-such-page/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view='hotel-list'), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', view='hotel-list', le='+Inf'), 2)
+        # оба ответа читают валидаторы; из кеша - только они, второй - еще COUNT + страница
+        self.assertEqual(sample(text, 'http_request_db_queries_bucket', view='hotel-list', le='1'), 1)
+        self.assertEqual(sample(text, 'http_request_db_queries_sum', view='hotel-list'), 4)
+        self.assertGreater(sample(text, 'http_response_size_bytes_sum', view='hotel-list'), 0)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view='hotel-detail-api'), 1)
+        self.assertEqual(sample(text, 'http_requests_total', view='bookings', status='401'), 1)
+        self.assertEqual(sample(text, 'http_requests_total', view='unmatched', status='404'), 1)
+
+    def test_token(self):
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+
+class MultiProcessTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        registry.reset()
+
+    def test_snapshots_of_all_processes_are_summed(self):
+        labels = (('view', 'hotel-list'), ('method', 'GET'))
+        # "другой воркер" со своим реестром и снимком
+        other = Registry()
+        other.observe('http_request_duration_seconds', labels, 0.02)
+        other.observe('http_request_duration_seconds', labels, 3.0)
+        other.inc('http_requests_total', labels + (('status', '200'),), 2)
+        with open(os.path.join(self.directory, '999999.json'), 'w') as file:
+            json.dump(other.snapshot(), file)
+        # недописанный или чужой файл не мешает
+        with open(os.path.join(self.directory, '999998.json'), 'w') as file:
+            file.write('{"histo')
+
+        with override_settings(METRICS_DIR=self.directory):
+            registry.observe('http_request_duration_seconds', labels, 0.02)
+            registry.inc('http_requests_total', labels + (('status', '200'),))
+            text = self.client.get('/metrics').content.decode()
+            self.assertTrue(os.path.exists(os.path.join(self.directory, f'{os.getpid()}.json')))
+
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view='hotel-list'), 3)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', view='hotel-list', le='0.025'), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', view='hotel-list', le='5'), 3)
+        self.assertAlmostEqual(sample(text, 'http_request_duration_seconds_sum', view='hotel-list'), 3.04)
+        self.assertEqual(sample(text, 'http_requests_total', view='hotel-list', status='200'), 3)
+
+
+class CityNamesSerializer(serializers.ModelSerializer):
+    """Намеренный N+1: город через метод, страна через source"""
+
+    city_name = serializers.SerializerMethodField()
+    country_name = serializers.CharField(source='country.name')
+
+    class Meta:
+        model = Hotel
+        fields = ('id', 'city_name', 'country_name')
+
+    def get_city_name(self, obj):
+        return obj.city.name
+
+
+def n_plus_one_view(request):
+    return JsonResponse(CityNamesSerializer(Hotel.objects.order_by('id'), many=True).data, safe=False)
+
+
+def slow_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_sleep(0.03)')
+    return JsonResponse({})
+
+
+class QueryDiagnosticsTest(APITestCase):
+    def setUp(self):
+        registry.reset()
+        country = Country.objects.create(name="Исландия")
+        cities = City.objects.bulk_create([City(name=f"Город {i}", country=country) for i in range(6)])
+        Hotel.objects.bulk_create([
+            Hotel(name=f"Гейзер {i}", description="-", country=country, city=city,
+                  stars=3, address="-", price_per_night=100)
+            for i, city in enumerate(cities)
+        ])
+
+    def run_view(self, view, path='/diagnostics/'):
+        request = RequestFactory().get(path)
+        with self.assertLogs('metrics.diagnostics') as logs:
+            RequestMetricsMiddleware(view)(request)
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 15 AND b = 'x''y' AND c IN (1, 2, 3) LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?, ...) LIMIT ?'
+        )
+        self.assertEqual(normalize_sql('SAVEPOINT "s1403547_x7"'), 'SAVEPOINT ?')
+
+    @override_settings(SQL_DIAGNOSTICS_SAMPLE_RATE=1, SQL_N_PLUS_ONE_THRESHOLD=4)
+    def test_repeated_shapes_are_reported_with_origin(self):
+        events = self.run_view(n_plus_one_view)
+        origins = {event['origin']: event for event in events}
+        self.assertEqual(set(origins), {'CityNamesSerializer.get_city_name', 'CityNamesSerializer.country_name'})
+
+        event = origins['CityNamesSerializer.get_city_name']
+        self.assertEqual(event['event'], 'n_plus_one')
+        self.assertEqual(event['count'], 6)
+        self.assertIn('FROM "hotels_city" WHERE "hotels_city"."id" = ? LIMIT ?', event['shape'])
+        self.assertTrue(event['location'].startswith('metrics/tests.py:'))
+        self.assertEqual(event['path'], '/diagnostics/')
+        self.assertEqual(registry.counters[('sql_n_plus_one_total', (('view', 'unmatched'),))], 2)
+
+    @override_settings(SQL_DIAGNOSTICS_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        with self.assertNoLogs('metrics.diagnostics'):
+            RequestMetricsMiddleware(n_plus_one_view)(RequestFactory().get('/'))
+
+    @override_settings(SQL_SLOW_QUERY_MS=20, SQL_DIAGNOSTICS_SAMPLE_RATE=0)
+    def test_slow_query(self):
+        [event] = self.run_view(slow_view)
+        self.assertEqual(event['event'], 'slow_query')
+        self.assertEqual(event['shape'], 'SELECT pg_sleep(?)')
+        self.assertGreaterEqual(event['duration_ms'], 20)
+        self.assertEqual(event['origin'], 'slow_view')
+
+    @override_settings(SQL_DIAGNOSTICS_SAMPLE_RATE=1, SQL_N_PLUS_ONE_THRESHOLD=3)
+    def test_api_without_n_plus_one(self):
+        with self.assertNoLogs('metrics.diagnostics'):
+            self.client.get('/api/hotels/')
+            self.client.get('/api/cities/')
+
+
+@override_settings(PROFILE_SAMPLE_INTERVAL=0.001)
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(PROFILE_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        country = Country.objects.create(name="Мальта")
+        Hotel.objects.create(
+            name="Валлетта", description="-", country=country, stars=4, address="-", price_per_night=120
+        )
+
+    def profile(self, path='/api/hotels/', **extra):
+        cache.clear()
+        return self.client.get(path, HTTP_X_PROFILE_TOKEN=make_token(), **extra)
+
+    def test_off_by_default(self):
+        response = self.client.get('/api/hotels/', HTTP_X_PROFILE_TOKEN='forged:token')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_signed_header_profiles_request(self):
+        response = self.profile()
+        profile_id = response['X-Profile-Id']
+        [meta] = list_profiles()
+        self.assertEqual(meta['id'], profile_id)
+        self.assertEqual((meta['view'], meta['status'], meta['trigger']), ('hotel-list', 200, 'token'))
+
+        stats = pstats.Stats(os.path.join(self.directory, f'{profile_id}.pstats'))
+        self.assertTrue(any(func[2] == 'list' for func in stats.stats))
+        with open(os.path.join(self.directory, f'{profile_id}.folded')) as file:
+            for line in file:
+                stack, count = line.rsplit(' ', 1)
+                self.assertGreater(int(count), 0)
+                self.assertIn(';', stack)
+
+        with override_settings(PROFILE_TOKEN_MAX_AGE=-1):
+            self.assertNotIn('X-Profile-Id', self.profile())
+
+    def test_sample_rate_per_route(self):
+        with override_settings(PROFILE_SAMPLE_RATES={'country-list': 1.0}):
+            self.assertIn('X-Profile-Id', self.client.get('/api/countries/'))
+            self.assertNotIn('X-Profile-Id', self.client.get('/api/cities/'))
+        self.assertEqual([meta['trigger'] for meta in list_profiles()], ['sample'])
+
+    def test_ring_buffer(self):
+        with override_settings(PROFILE_MAX_PROFILES=2):
+            ids = [self.profile()['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual([meta['id'] for meta in list_profiles()], sorted(ids[1:], reverse=True))
+        self.assertEqual(len(os.listdir(self.directory)), 6)
+
+    def test_admin_view_for_staff_only(self):
+        profile_id = self.profile()['X-Profile-Id']
+        self.assertEqual(self.client.get('/admin/profiles/').status_code, 302)
+        user = User.objects.create_user(username='visitor', password='x')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(f'/admin/profiles/{profile_id}.pstats').status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get('/admin/profiles/')
+        self.assertContains(response, profile_id)
+        response = self.client.get(f'/admin/profiles/{profile_id}.folded')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(self.client.get(f'/admin/profiles/{profile_id}.json').status_code, 404)
+        self.assertEqual(self.client.get('/admin/profiles/missing.pstats').status_code, 404)
+
+
+class HealthTest(APITestCase):
+    def setUp(self):
+        patcher = mock.patch.object(health, 'migrated', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ok(self):
+        for path in ('/healthz', '/readyz'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {'status': 'ok'})
+        # граф миграций больше не читается
+        with mock.patch.object(health, 'pending_migrations') as pending:
+            self.assertEqual(self.client.get('/readyz').status_code, 200)
+        pending.assert_not_called()
+
+    def test_database_unavailable(self):
+        with mock.patch.object(connection, 'cursor', side_effect=OperationalError('connection refused')):
+            for path in ('/healthz', '/readyz'):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response.json(), {'status': 'error', 'database': 'OperationalError'})
+
+    def test_pending_migrations(self):
+        with mock.patch.object(health, 'pending_migrations', return_value=[('hotels', '0099_new')]):
+            self.assertEqual(self.client.get('/healthz').status_code, 200)
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'error', 'migrations': '1 pending'})
+
+    def test_migrate_if_needed(self):
+        out = StringIO()
+        with mock.patch('metrics.management.commands.migrate_if_needed.call_command') as migrate:
+            call_command('migrate_if_needed', stdout=out)
+            migrate.assert_not_called()
+            with mock.patch(
+                'metrics.management.commands.migrate_if_needed.pending_migrations',
+                return_value=[('hotels', '0099_new')],
+            ):
+                call_command('migrate_if_needed', stdout=out)
+        migrate.assert_called_once()
+        self.assertIn('Неприменённых миграций: 1', out.getvalue())
@@ -0,0 +1,100 @@
+"""
+Замеры одного запроса: время SQL (через connection.execute_wrapper) и
+время сериализации DRF. Текущий замер хранится в contextvar, поэтому код
+представлений менять не нужно: обертки сами находят, куда записать время.
+contextvar копируется в потоки sync_to_async, поэтому запросы асинхронных
+представлений (async ORM выполняет SQL в отдельном потоке) тоже считаются.
+"""
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, List, Optional
+
+if TYPE_CHECKING:
+    from .diagnostics import QueryDiagnostics
+
+
+class RequestTiming:
+    """Накопленные за запрос SQL-запросы и время (секунды)"""
+
+    def __init__(self, diagnostics: Optional['QueryDiagnostics'] = None) -> None:
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.serializing = False
+        self.diagnostics = diagnostics
+
+    def __call__(self, execute, sql, params, many, context) -> Any:
+        """execute_wrapper: считает каждый запрос, включая SAVEPOINT и executemany"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db += elapsed
+            self.queries += 1
+            if self.diagnostics is not None:
+                self.diagnostics.query(sql, elapsed)
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing (длительности в миллисекундах)"""
+        parts: List[str] = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        return ', '.join(parts)
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('current_timing', default=None)
+
+
+def timed_execute(execute, sql, params, many, context) -> Any:
+    """Постоянная обертка соединений: передает запрос замеру текущего запроса, если он есть"""
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install_query_timing() -> None:
+    """
+    Поставить timed_execute на каждое соединение при подключении. У каждого
+    потока свои объекты соединений, поэтому обертка, поставленная на время
+    запроса в потоке middleware, не увидела бы SQL из потоков sync_to_async.
+    """
+    from django.db.backends.signals import connection_created
+
+    def install(sender, connection, **kwargs) -> None:
+        if timed_execute not in connection.execute_wrappers:
+            connection.execute_wrappers.append(timed_execute)
+
+    connection_created.connect(install, weak=False, dispatch_uid='metrics.timing')
+
+
+def install_serializer_timing() -> None:
+    """
+    Обернуть BaseSerializer.data: на него опираются и Serializer.data, и
+    ListSerializer.data. Вложенные вызовы (сериализатор внутри
+    SerializerMethodField) не считаются повторно. Время включает ленивые
+    SQL-запросы, выполненные во время сериализации.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, 'timed', False):
+        return
+
+    def data(self) -> Any:
+        timing = current_timing.get()
+        if timing is None or timing.serializing:
+            return original.fget(self)
+        timing.serializing = True
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            timing.serialize += time.perf_counter() - started
+            timing.serializing = False
+
+    data.timed = True
+    BaseSerializer.data = property(data)
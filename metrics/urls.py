@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    # Профили запросов (только для персонала, через вход в админку)
+    path('', admin.site.admin_view(views.profile_list), name='profile-list'),
+    path(
+        '<str:profile_id>.<str:kind>',
+        admin.site.admin_view(views.profile_download),
+        name='profile-download'
+    ),
+]
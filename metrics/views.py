@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import health, profiling
+from .registry import registry
+
+
+# метрики для Prometheus: /metrics
+def metrics_view(request) -> HttpResponse:
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return HttpResponse(status=401)
+    # свой снимок - сразу, чтобы остальные процессы видели свежие данные
+    registry.flush(force=True)
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+# живость процесса и базы: /healthz
+def healthz(request) -> JsonResponse:
+    checks = health.liveness()
+    return JsonResponse(checks, status=200 if checks['status'] == 'ok' else 503)
+
+
+# готовность принимать трафик (база и миграции): /readyz
+def readyz(request) -> JsonResponse:
+    checks = health.readiness()
+    return JsonResponse(checks, status=200 if checks['status'] == 'ok' else 503)
+
+
+# список профилей запросов в админке: /admin/profiles/
+def profile_list(request) -> HttpResponse:
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': profiling.list_profiles(),
+        'limit': settings.PROFILE_MAX_PROFILES,
+    }
+    return render(request, 'metrics/profiles.html', context)
+
+
+# скачать профиль: /admin/profiles/<id>.pstats или <id>.folded
+def profile_download(request, profile_id: str, kind: str) -> FileResponse:
+    path = profiling.profile_path(profile_id, f'.{kind}') if kind in ('pstats', 'folded') else None
+    if path is None:
+        raise Http404('Профиль не найден')
+    content_type = 'text/plain; charset=utf-8' if kind == 'folded' else 'application/octet-stream'
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.{kind}', content_type=content_type
+    )